@@ -1,24 +1,17 @@
-from fastapi import APIRouter, HTTPException
+import logging
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from core.db import SessionLocal
+from api.responses import OrjsonResponse
+from core.config import settings
+from core.db import get_db
 from services.snapshot_service import create_draft_run, fetch_cluster_rows, warmup_to_redis, activate_run, run_stats
-from services.cluster_batch import run_full_cycle
-from sqlalchemy import text
-from core.db import SessionLocal
-from services.dirty_recompute import recompute_dirty_bits
+from pydantic import BaseModel
+from typing import List
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/campuses/{campus_id}/runs")
-def create_run(campus_id: int, algo: str = "baseline-v0", note: str | None = None):
-    db: Session = next(get_db())
+def create_run(campus_id: int, algo: str = "baseline-v0", note: str | None = None, db: Session = Depends(get_db)):
     try:
         rid = create_draft_run(db, campus_id, algo, {"note": note} if note else None)
         return {"campus_id": campus_id, "run_id": rid, "status": "draft", "algo": algo}
@@ -26,8 +19,7 @@ def create_run(campus_id: int, algo: str = "baseline-v0", note: str | None = Non
         raise HTTPException(500, f"create draft failed: {e}")
 
 @router.post("/runs/{run_id}/warmup")
-def warmup(run_id: int):
-    db: Session = next(get_db())
+def warmup(run_id: int, db: Session = Depends(get_db)):
     try:
         warmup_to_redis(run_id, fetch_cluster_rows(db, run_id))
         return {"run_id": run_id, "redis": "warmed"}
@@ -35,8 +27,7 @@ def warmup(run_id: int):
         raise HTTPException(500, f"warmup failed: {e}")
 
 @router.post("/campuses/{campus_id}/activate/{run_id}")
-def activate(campus_id: int, run_id: int):
-    db: Session = next(get_db())
+def activate(campus_id: int, run_id: int, db: Session = Depends(get_db)):
     try:
         activate_run(db, campus_id, run_id)
         return {"campus_id": campus_id, "active_run_id": run_id, "status": "active"}
@@ -44,28 +35,146 @@ def activate(campus_id: int, run_id: int):
         raise HTTPException(500, f"activate failed: {e}")
 
 @router.get("/runs/{run_id}/stats")
-def stats(run_id: int):
-    db: Session = next(get_db())
+def stats(run_id: int, db: Session = Depends(get_db)):
     try:
-        return run_stats(db, run_id)
+        out = run_stats(db, run_id)
     except Exception as e:
         raise HTTPException(500, f"stats failed: {e}")
+    return OrjsonResponse(out) if settings.FAST_JSON else out
 
 @router.post("/campuses/{campus_id}/autocycle")
-def autocycle(campus_id: int, note: str | None = None):
-    # 0) dirty 남아 있으면 재계산
-    with SessionLocal() as db:
-        dirty = db.execute(text("SELECT COUNT(*) FROM timetable_bit WHERE is_dirty=1")).scalar_one()
-    if dirty:
-        recompute_dirty_bits()
-
-    # 1) 기존 풀사이클 실행
+def autocycle(campus_id: int, note: str | None = None, profile: str | None = None):
+    """
+    profile=cprofile|sample: 이번 사이클을 프로파일해 PROFILE_DIR에 남김 (GET /admin/profiles)
+    CYCLE_EXECUTOR=queue: 배치 워커 큐에 넣고 202 + job_id 반환 (GET /admin/jobs/{job_id})
+    """
+    from services.cycle_profile import MODES
+
+    if profile and profile not in MODES:
+        raise HTTPException(400, f"profile must be one of {MODES}")
+
+    if settings.CYCLE_EXECUTOR == "queue":
+        from services.cycle_queue import enqueue_cycle
+
+        job = enqueue_cycle(campus_id, note=note, profile=profile, skip_if_done=False)
+        return OrjsonResponse({"campus_id": campus_id, **job}, status_code=202)
+
+    # 배치 모듈(pandas/sklearn)은 호출 시점에 로드 — API 워커 기동 시에는 불러오지 않는다
+    from services.cycle_lock import run_cycle_with_dirty
+    from services.snapshot_service import StaleFenceError
+
+    # dirty 재계산 후 풀사이클 (다른 레플리카가 같은 캠퍼스 사이클을 돌리는 중이면 409)
+    try:
+        result = run_cycle_with_dirty(campus_id, algo="kmeans-v1", note=note, skip_if_done=False,
+                                      profile=profile)
+    except StaleFenceError as e:
+        raise HTTPException(409, f"autocycle superseded: {e}")
+    except Exception as e:
+        raise HTTPException(500, f"autocycle failed: {e}")
+    if result["status"] == "locked":
+        raise HTTPException(409, "cycle already running for this campus")
+    if result["status"] == "lost":
+        raise HTTPException(409, f"leader lease lost during cycle (run_id={result['run_id']})")
+    out = {
+        "campus_id": campus_id,
+        "active_run_id": result["run_id"],
+        "status": "active"
+    }
+    if "profile" in result:
+        out["profile"] = result["profile"]
+    return out
+
+class ReassignRequest(BaseModel):
+    userIds: List[int]
+
+@router.post("/campuses/{campus_id}/reassign")
+def reassign(campus_id: int, req: ReassignRequest):
+    """입력(위치/시간표)이 바뀐 사용자를 활성 run의 가장 가까운 군집으로 즉시 배정"""
+    from services.cycle_lock import leader_lock
+    from services.stream_assign import reassign_users
+
+    # 스케줄러 스트림 틱(dirty 재계산 → 증분 배정)과 같은 락: 동시에 cm/cl 키를 고치지 않도록
+    with leader_lock("dirty_recompute") as lease:
+        if lease is None:
+            raise HTTPException(409, "dirty recompute / reassign already running")
+        try:
+            return reassign_users(campus_id, req.userIds)
+        except Exception as e:
+            raise HTTPException(500, f"reassign failed: {e}")
+
+@router.post("/retention/purge")
+def retention_purge():
+    from services.retention_service import run_retention
+
+    try:
+        return run_retention()
+    except Exception as e:
+        raise HTTPException(500, f"retention failed: {e}")
+
+@router.get("/metrics/redis")
+def redis_metrics(reset: bool = False):
+    """공유 Redis 풀 상태 + ping + 명령별 지연 히스토그램 (reset=true면 조회 후 초기화)"""
+    from core import metrics
+    from core.redis_client import METRIC_PREFIX, ping_ms, pool_stats
+
     try:
-        rid = run_full_cycle(campus_id, algo="kmeans-v1", note=note)
-        return {
-            "campus_id": campus_id,
-            "active_run_id": rid,
-            "status": "active"
-        }
+        ping = ping_ms()
+        ok = True
     except Exception as e:
-        raise HTTPException(500, f"autocycle failed: {e}")
\ No newline at end of file
+        ping, ok = None, False
+        logging.warning(f"[REDIS] ping failed: {e}")
+    out = {"ok": ok, "ping_ms": ping, "pool": pool_stats(), "commands": metrics.snapshot(METRIC_PREFIX)}
+    if reset:
+        metrics.reset(METRIC_PREFIX)
+    return out
+
+@router.get("/metrics/db")
+def db_metrics():
+    """MySQL 커넥션 풀 상태 + 체크아웃 대기시간 히스토그램"""
+    from core.db import pool_stats
+
+    return pool_stats()
+
+@router.get("/jobs")
+def jobs(limit: int = 50):
+    """배치 워커 잡 목록 (최근 순): status, run_id, queue_wait_sec, duration_sec, error"""
+    from services.cycle_queue import list_jobs, queue_stats
+
+    return {**queue_stats(), "jobs": list_jobs(min(max(1, limit), 500))}
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    from services.cycle_queue import get_job
+
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(404, "job not found")
+    return job
+
+@router.get("/profiles")
+def profiles():
+    """사이클 프로파일 목록 (최신순): name, run_id, mode, elapsed_sec, files"""
+    from services.cycle_profile import list_profiles
+
+    return list_profiles()
+
+@router.get("/profiles/{name}/{filename}")
+def profile_file(name: str, filename: str):
+    """프로파일 파일 다운로드 (cycle.pstats / cycle.txt / cycle.collapsed)"""
+    from fastapi.responses import FileResponse
+    from services.cycle_profile import profile_file_path
+
+    path = profile_file_path(name, filename)
+    if path is None:
+        raise HTTPException(404, "profile file not found")
+    return FileResponse(path, filename=f"{name}_{filename}")
+
+@router.get("/metrics/requests")
+def request_metrics(reset: bool = False):
+    """샘플링된 요청 중 가장 느린 N건의 구간별 시간 (redis/db/span/other). reset=true면 조회 후 초기화"""
+    from core.request_profile import slow_requests
+
+    out = {"sample": settings.REQUEST_PROFILE_SAMPLE, "keep": slow_requests.keep, **slow_requests.snapshot()}
+    if reset:
+        slow_requests.reset()
+    return out
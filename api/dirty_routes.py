@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import List
 from sqlalchemy import text
-from core.db import SessionLocal
+from sqlalchemy.orm import Session
+from api.responses import OrjsonResponse
+from core.config import settings
+from core.db import get_db
+from services.dirty_writer import dirty_coalescer
 
 router = APIRouter(tags=["timetable-bit"])
 
@@ -12,40 +17,45 @@ class DirtyRequest(BaseModel):
 class DirtyBulkRequest(BaseModel):
     user_ids: List[int]
 
+# 코얼레싱 flush 대기 상한(초). 이 안에 커밋되지 않으면 503
+_DIRTY_WAIT_SEC = 10
+
+async def _wait_flushed(user_ids: List[int]) -> None:
+    # 이벤트 루프에서 flush를 기다린다 (동기 핸들러였을 때는 대기 동안 스레드풀 스레드를 하나씩 붙잡았다)
+    try:
+        fut = dirty_coalescer.submit(user_ids)
+    except RuntimeError:
+        raise HTTPException(503, "dirty writer is shutting down")  # stop() 이후 (종료 중)
+    try:
+        # shield: 타임아웃이 코얼레서의 Future까지 취소하면 flush 스레드의 set_result가 실패한다
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), timeout=_DIRTY_WAIT_SEC)
+    except asyncio.TimeoutError:
+        raise HTTPException(503, "dirty flush timed out")
+    except Exception as e:
+        raise HTTPException(500, f"dirty flush failed: {e}")
+
 @router.post("/dirty")
-def mark_dirty(req: DirtyRequest):
-    with SessionLocal() as db:
-        vals = ",".join(f"({req.user_id},{d},1)" for d in range(7))
-        db.execute(text(f"""
-          INSERT INTO timetable_bit (user_id, day_of_week, is_dirty)
-          VALUES {vals}
-          ON DUPLICATE KEY UPDATE is_dirty=1, updated_at=CURRENT_TIMESTAMP
-        """))
-        db.commit()
+async def mark_dirty(req: DirtyRequest):
+    await _wait_flushed([req.user_id])
     return {"ok": True, "user_id": req.user_id, "days": list(range(7))}
 
 @router.post("/dirty/bulk")
-def mark_dirty_bulk(req: DirtyBulkRequest):
+async def mark_dirty_bulk(req: DirtyBulkRequest):
     if not req.user_ids:
         return {"ok": True, "user_ids": []}
-    with SessionLocal() as db:
-        vals = ",".join(f"({uid},{d},1)" for uid in req.user_ids for d in range(7))
-        db.execute(text(f"""
-          INSERT INTO timetable_bit (user_id, day_of_week, is_dirty)
-          VALUES {vals}
-          ON DUPLICATE KEY UPDATE is_dirty=1, updated_at=CURRENT_TIMESTAMP
-        """))
-        db.commit()
+    if len(req.user_ids) > settings.DIRTY_BULK_MAX:
+        raise HTTPException(413, f"too many user_ids (max {settings.DIRTY_BULK_MAX})")
+    await _wait_flushed(req.user_ids)
     return {"ok": True, "user_ids": req.user_ids, "days": list(range(7))}
 
 @router.get("/bits/{user_id}/{day_of_week}")
-def get_bits(user_id: int, day_of_week: int):
-    with SessionLocal() as db:
-        row = db.execute(text("""
-            SELECT slot1,slot2,slot3,slot4,slot5,slot6,slot7,slot8,slot9,is_dirty
-            FROM timetable_bit WHERE user_id=:u AND day_of_week=:d
-        """), {"u": user_id, "d": day_of_week}).first()
+def get_bits(user_id: int, day_of_week: int, db: Session = Depends(get_db)):
+    row = db.execute(text("""
+        SELECT slot1,slot2,slot3,slot4,slot5,slot6,slot7,slot8,slot9,is_dirty
+        FROM timetable_bit WHERE user_id=:u AND day_of_week=:d
+    """), {"u": user_id, "d": day_of_week}).first()
     if not row:
         raise HTTPException(404, "not found")
-    return {"user_id": user_id, "day_of_week": day_of_week,
-            "slots": list(row[:9]), "is_dirty": row[9]}
+    body = {"user_id": user_id, "day_of_week": day_of_week,
+            "slots": [int(v) for v in row[:9]], "is_dirty": int(row[9])}
+    return OrjsonResponse(body) if settings.FAST_JSON else body
@@ -0,0 +1,25 @@
+# api/responses.py
+"""
+orjson 기반 응답 클래스.
+
+핸들러가 dict/list를 그냥 반환하면 FastAPI가 jsonable_encoder로 한 번 훑은 뒤 json.dumps로 직렬화한다.
+핫 엔드포인트는 이미 JSON 기본 타입만 담긴 값을 OrjsonResponse로 바로 감싸 반환해 그 단계를 건너뛴다.
+미리 인코딩된 bytes(me:run:{rid})는 json_bytes_response로 그대로 내려보낸다.
+(fastapi.responses.ORJSONResponse는 deprecated라 같은 동작을 여기 둔다)
+"""
+from typing import Any
+
+import orjson
+from starlette.responses import Response
+
+
+class OrjsonResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def json_bytes_response(raw) -> Response:
+    """이미 JSON으로 인코딩된 값(bytes 또는 decode_responses 클라이언트가 준 str)"""
+    return Response(content=raw, media_type="application/json")
@@ -1,13 +1,12 @@
+import orjson
 from fastapi import APIRouter, HTTPException, Query
-import redis
 from core.config import settings
+from core.redis_client import get_redis
+from core.request_profile import span
+from api.responses import OrjsonResponse, json_bytes_response
+from services.active_run import active_run_id
+from services.snapshot_service import ME_PAYLOAD_MAX
 
-r = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    password=settings.REDIS_PASSWORD,
-    decode_responses=True,
-)
 router = APIRouter(prefix="/campuses", tags=["clusters"])
 
 from pydantic import BaseModel
@@ -16,6 +15,12 @@ from fastapi import Body
 from pydantic import BaseModel
 from fastapi import Body
 
+def _active_run_id(campus_id: int) -> int:
+    run_id = active_run_id(campus_id)  # 워커 로컬 캐시 + pub/sub 무효화
+    if run_id is None:
+        raise HTTPException(404, "Active snapshot not found")
+    return run_id
+
 class ClusterRequest(BaseModel):
     userId: int
     topK: int = 5   # 기본값 5, 유효범위는 1~100으로 검증할 수도 있음
@@ -30,10 +35,20 @@ def my_cluster_post(payload: ClusterRequest = Body(...)):
         raise HTTPException(400, "topK must be between 1 and 100")
 
     # 1) 활성 run
-    run_key = r.get(f"active:campus:{campus_id}")
-    if not run_key or not run_key.startswith("run:"):
-        raise HTTPException(404, "Active snapshot not found")
-    run_id = run_key.split(":")[1]
+    run_id = _active_run_id(campus_id)
+    r = get_redis()
+
+    # 1.5) 워밍업 때 미리 인코딩한 응답(정렬·본인 제외 완료)이 있으면 그대로 반환
+    if settings.FAST_JSON:
+        raw = r.hget(f"me:run:{run_id}", str(user_id))
+        if raw is not None:
+            with span("members"):
+                if top_k >= ME_PAYLOAD_MAX:
+                    return json_bytes_response(raw)
+                members = orjson.loads(raw)
+                if len(members) <= top_k:
+                    return json_bytes_response(raw)
+                return OrjsonResponse(members[:top_k])
 
     # 2) 내 클러스터
     cluster_seq = r.hget(f"cm:run:{run_id}", str(user_id))
@@ -48,12 +63,55 @@ def my_cluster_post(payload: ClusterRequest = Body(...)):
     else:
         members = [int(uid) for uid in r.smembers(cl_key)]
 
-    # 정렬
-    members.sort()
+    with span("members"):
+        # 정렬
+        members.sort()
 
-    # 본인 제외 + Top-K 적용
-    members = [uid for uid in members if uid != user_id]
-    if top_k:
-        members = members[:top_k]
+        # 본인 제외 + Top-K 적용
+        members = [uid for uid in members if uid != user_id]
+        if top_k:
+            members = members[:top_k]
 
+    if settings.FAST_JSON:
+        return OrjsonResponse(members)
     return [uid for uid in members]
+
+@router.post("/cluster-member/neighbors")
+def my_neighbors_post(payload: ClusterRequest = Body(...)):
+    """활성 run 특징 공간(위치·선호도)에서 나와 가장 가까운 사용자 topK (거리 오름차순)"""
+    from services.neighbor_index import nearest_neighbors
+
+    if not (1 <= payload.topK <= settings.KNN_MAX_K):
+        raise HTTPException(400, f"topK must be between 1 and {settings.KNN_MAX_K}")
+
+    run_id = _active_run_id(settings.CAMPUS_ID)
+    try:
+        neighbors = nearest_neighbors(int(run_id), payload.userId, payload.topK)
+    except FileNotFoundError:
+        raise HTTPException(404, "Neighbor index not found for active snapshot")
+    if neighbors is None:
+        raise HTTPException(404, "User not assigned in this snapshot")
+    return [uid for uid, _dist in neighbors]
+
+class NearbyRequest(BaseModel):
+    latitude: float
+    longitude: float
+    radiusM: float = 300
+    limit: int = 50
+
+@router.post("/nearby")
+def nearby_post(payload: NearbyRequest = Body(...)):
+    """활성 run 후보 중 지점(건물 등) 반경 radiusM 안의 사용자 (거리 오름차순, 최대 limit명)"""
+    from services.spatial_index import within_radius
+
+    if not (0 < payload.radiusM <= settings.GEO_MAX_RADIUS_M):
+        raise HTTPException(400, f"radiusM must be between 0 and {settings.GEO_MAX_RADIUS_M}")
+    if not (1 <= payload.limit <= 500):
+        raise HTTPException(400, "limit must be between 1 and 500")
+
+    run_id = _active_run_id(settings.CAMPUS_ID)
+    try:
+        hits = within_radius(int(run_id), payload.latitude, payload.longitude, payload.radiusM, payload.limit)
+    except FileNotFoundError:
+        raise HTTPException(404, "Spatial index not found for active snapshot")
+    return [uid for uid, _dist in hits]
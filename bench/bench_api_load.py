@@ -0,0 +1,251 @@
+# bench/bench_api_load.py
+"""
+읽기/dirty 엔드포인트 부하 테스트 (p50/p99 지연, RPS)
+
+  # 앱을 프로세스 안에서 구동 (fakeredis + SQLite 대체, docker 불필요; pip install fakeredis)
+  python -m bench.bench_api_load --concurrency 1,8,32 --cluster-sizes 4,32,256
+
+  # 떠 있는 서버(uvicorn)에 요청 (데이터는 이미 적재돼 있어야 함)
+  python -m bench.bench_api_load --url http://localhost:8081 --users 20000
+
+  # 기준선 저장 / 비교 (p99가 tolerance 이상 느려지거나 RPS가 그만큼 줄면 exit 1)
+  python -m bench.bench_api_load --save-baseline bench/baseline_api.json
+  python -m bench.bench_api_load --check-baseline bench/baseline_api.json --tolerance 0.3
+
+대상: POST /campuses/cluster-member/me, POST /dirty, POST /dirty/bulk, GET /bits/{user_id}/{day_of_week}
+cluster-size는 /me 응답(군집 ZSet 크기)에만 영향이 있어, 나머지 엔드포인트는 크기별로 반복하지 않는다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+ENDPOINTS = ("me", "dirty", "dirty_bulk", "bits")
+
+
+# ───────────────────────── 프로세스 내 대체 백엔드 ─────────────────────────
+
+def _install_fake_backends(db_path: str) -> None:
+    """core.redis_client / core.db 를 fakeredis / SQLite로 교체 (get_redis·get_engine 첫 호출 전)"""
+    import fakeredis
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+
+    import core.db
+    from core import redis_client
+    from services import dirty_writer
+
+    server = fakeredis.FakeServer()
+    build_pool = redis_client._build_pool
+
+    def _fake_pool():
+        pool = build_pool()
+        pool.connection_class = fakeredis.FakeConnection
+        pool.connection_kwargs["server"] = server
+        return pool
+
+    redis_client._build_pool = _fake_pool
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"timeout": 30, "check_same_thread": False},
+                           pool_size=16, max_overflow=16, future=True)
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS timetable_bit (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              user_id BIGINT NOT NULL, day_of_week TINYINT NOT NULL,
+              slot1 INT NOT NULL DEFAULT 0, slot2 INT NOT NULL DEFAULT 0, slot3 INT NOT NULL DEFAULT 0,
+              slot4 INT NOT NULL DEFAULT 0, slot5 INT NOT NULL DEFAULT 0, slot6 INT NOT NULL DEFAULT 0,
+              slot7 INT NOT NULL DEFAULT 0, slot8 INT NOT NULL DEFAULT 0, slot9 INT NOT NULL DEFAULT 0,
+              is_dirty TINYINT NOT NULL DEFAULT 1,
+              updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+              UNIQUE (user_id, day_of_week)
+            )
+        """))
+    from core import request_profile
+    if request_profile.enabled():
+        core.db._profile_cursor_time(engine)
+    core.db._engine = engine
+    core.db._session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    # MySQL ON DUPLICATE KEY → SQLite ON CONFLICT (동작 동일: 없으면 INSERT, 있으면 is_dirty=1)
+    dirty_writer._UPSERT_DIRTY_SQL = text("""
+        INSERT INTO timetable_bit (user_id, day_of_week, is_dirty) VALUES (:u, :d, :dirty)
+        ON CONFLICT(user_id, day_of_week) DO UPDATE SET is_dirty=1, updated_at=CURRENT_TIMESTAMP
+    """)
+
+
+def _seed(n_users: int, cluster_size: int, run_id: int) -> None:
+    """활성 run 포인터 + cm/cl 키 + timetable_bit 행"""
+    from sqlalchemy import text
+
+    from core.config import settings
+    from core.db import SessionLocal
+    from core.redis_client import get_redis
+    from services import active_run
+    from services.snapshot_service import warmup_to_redis
+
+    # 사이클과 같은 워밍업 경로 (FAST_JSON=1이면 me:run 응답도 미리 인코딩)
+    rows = ((u, (u - 1) // cluster_size + 1, None, float(u % 97)) for u in range(1, n_users + 1))
+    warmup_to_redis(run_id, rows)
+    get_redis().set(f"active:campus:{settings.CAMPUS_ID}", f"run:{run_id}")
+    active_run.invalidate()
+
+    with SessionLocal() as db:
+        if not db.execute(text("SELECT COUNT(*) FROM timetable_bit")).scalar():
+            rows = [{"u": u, "d": d} for u in range(1, n_users + 1) for d in range(7)]
+            db.execute(text("INSERT INTO timetable_bit (user_id, day_of_week, is_dirty) VALUES (:u, :d, 0)"), rows)
+            db.commit()
+
+
+# ───────────────────────── 부하 생성 ─────────────────────────
+
+def _request_factory(endpoint: str, n_users: int, bulk_size: int) -> Callable[[httpx.AsyncClient], "asyncio.Future"]:
+    rnd = random.Random(0)
+
+    def make(client: httpx.AsyncClient):
+        uid = rnd.randint(1, n_users)
+        if endpoint == "me":
+            return client.post("/campuses/cluster-member/me", json={"userId": uid, "topK": 10})
+        if endpoint == "dirty":
+            return client.post("/dirty", json={"user_id": uid})
+        if endpoint == "dirty_bulk":
+            return client.post("/dirty/bulk", json={"user_ids": [rnd.randint(1, n_users) for _ in range(bulk_size)]})
+        if endpoint == "bits":
+            return client.get(f"/bits/{uid}/{rnd.randint(0, 6)}")
+        raise ValueError(endpoint)
+
+    return make
+
+
+async def _drive(client: httpx.AsyncClient, make, total: int, concurrency: int) -> Tuple[List[float], int, float]:
+    lat: List[float] = []
+    errors = 0
+    it = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in it:
+            t0 = time.perf_counter()
+            try:
+                resp = await make(client)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            lat.append(time.perf_counter() - t0)
+            errors += 0 if ok else 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return lat, errors, time.perf_counter() - t0
+
+
+def _percentile_ms(sorted_sec: List[float], q: float) -> float:
+    if not sorted_sec:
+        return float("nan")
+    i = min(len(sorted_sec) - 1, max(0, int(round(q * (len(sorted_sec) - 1)))))
+    return sorted_sec[i] * 1000
+
+
+async def _run(args) -> Dict[str, dict]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+        cluster_sizes = [0]  # 외부 서버: 데이터 구성은 알 수 없음
+    else:
+        from main import app  # 대체 백엔드 설치 후 임포트
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+        cluster_sizes = [int(x) for x in args.cluster_sizes.split(",")]
+
+    results: Dict[str, dict] = {}
+    async with client:
+        for size in cluster_sizes:
+            if not args.url:
+                _seed(args.users, size, run_id=size)  # 크기별로 다른 run → 포인터 교체
+            for endpoint in args.endpoints.split(","):
+                if endpoint != "me" and size != cluster_sizes[0]:
+                    continue
+                for conc in (int(x) for x in args.concurrency.split(",")):
+                    make = _request_factory(endpoint, args.users, args.bulk_size)
+                    await _drive(client, make, min(args.warmup, args.requests), conc)  # 워밍업
+                    lat, errors, elapsed = await _drive(client, make, args.requests, conc)
+                    lat.sort()
+                    key = f"{endpoint}/c{conc}" + (f"/s{size}" if endpoint == "me" and size else "")
+                    results[key] = {
+                        "p50_ms": round(_percentile_ms(lat, 0.50), 3),
+                        "p99_ms": round(_percentile_ms(lat, 0.99), 3),
+                        "rps": round(len(lat) / elapsed, 1),
+                        "errors": errors,
+                    }
+                    print(f"{key:<22} p50={results[key]['p50_ms']:8.2f}ms  p99={results[key]['p99_ms']:8.2f}ms  "
+                          f"rps={results[key]['rps']:9.1f}  errors={errors}")
+    return results
+
+
+def _check_baseline(results: Dict[str, dict], path: str, tolerance: float) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    failures = []
+    for key, cur in results.items():
+        ref = base.get(key)
+        if ref is None:
+            continue
+        if cur["p99_ms"] > ref["p99_ms"] * (1 + tolerance):
+            failures.append(f"{key}: p99 {cur['p99_ms']}ms > baseline {ref['p99_ms']}ms (+{tolerance:.0%})")
+        if cur["rps"] < ref["rps"] * (1 - tolerance):
+            failures.append(f"{key}: rps {cur['rps']} < baseline {ref['rps']} (-{tolerance:.0%})")
+        if cur["errors"] > ref.get("errors", 0):
+            failures.append(f"{key}: errors {cur['errors']} > baseline {ref.get('errors', 0)}")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=None, help="외부 서버 주소 (없으면 프로세스 내 구동)")
+    ap.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    ap.add_argument("--concurrency", default="1,8,32")
+    ap.add_argument("--cluster-sizes", default="4,32,256")
+    ap.add_argument("--users", type=int, default=20_000)
+    ap.add_argument("--bulk-size", type=int, default=100)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=200)
+    ap.add_argument("--save-baseline", default=None)
+    ap.add_argument("--check-baseline", default=None)
+    ap.add_argument("--tolerance", type=float, default=0.3)
+    args = ap.parse_args()
+
+    tmpdir = None
+    if not args.url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="solmeal-bench-")
+        _install_fake_backends(os.path.join(tmpdir.name, "bench.db"))
+
+    try:
+        results = asyncio.run(_run(args))
+    finally:
+        if not args.url:
+            from services.dirty_writer import dirty_coalescer
+            dirty_coalescer.stop()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    meta = {"url": args.url, "users": args.users, "requests": args.requests, "python": sys.version.split()[0]}
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"baseline saved: {args.save_baseline}")
+    if args.check_baseline:
+        failures = _check_baseline(results, args.check_baseline, args.tolerance)
+        for line in failures:
+            print(f"REGRESSION {line}")
+        if failures:
+            sys.exit(1)
+        print("baseline check passed")
+
+
+if __name__ == "__main__":
+    main()
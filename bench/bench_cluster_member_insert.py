@@ -0,0 +1,74 @@
+# bench/bench_cluster_member_insert.py
+"""
+cluster_member 적재 경로 벤치마크 (실제 MySQL 필요: .env 설정 사용)
+
+  python -m bench.bench_cluster_member_insert --rows 100000 --modes legacy,batch,infile
+
+- legacy: 기존 경로 (list[dict] 한 번에 executemany + 단일 커밋)
+- batch : 청크 multi-row INSERT + 청크별 커밋
+- infile: 청크 CSV → LOAD DATA LOCAL INFILE (CM_INSERT_MODE=infile 로 엔진을 띄워야 함)
+각 모드는 별도 draft run에 적재하고, 끝나면 해당 run의 행을 지운다.
+"""
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from core.db import SessionLocal
+from services.cluster_batch import bulk_insert_cluster_member
+from services.cluster_job import to_cluster_member_columns
+from services.snapshot_service import create_draft_run
+
+
+def _legacy_insert(db, run_id: int, cols) -> None:
+    rows = [
+        {"run_id": run_id, "cluster_seq": int(c), "user_id": int(u),
+         "rank_in_cluster": int(r), "distance_to_center": float(d)}
+        for c, u, r, d in zip(cols["cluster_seq"], cols["user_id"],
+                              cols["rank_in_cluster"], cols["distance_to_center"])
+    ]
+    db.execute(text("""
+        INSERT INTO cluster_member (run_id, cluster_seq, user_id, rank_in_cluster, distance_to_center)
+        VALUES (:run_id, :cluster_seq, :user_id, :rank_in_cluster, :distance_to_center)
+    """), rows)
+    db.commit()
+
+
+def _synthetic_columns(n: int, group: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.permutation(n * 10)[:n] + 1
+    labels = rng.integers(1, max(2, n // group) + 1, size=n)
+    dists = rng.random(n)
+    return to_cluster_member_columns(user_ids, labels, dists)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--group", type=int, default=4)
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--campus", type=int, default=0, help="벤치 전용 campus_id (기본 0)")
+    ap.add_argument("--modes", default="legacy,batch")
+    args = ap.parse_args()
+
+    cols = _synthetic_columns(args.rows, args.group)
+    print(f"rows={args.rows} chunk={args.chunk}")
+    with SessionLocal() as db:
+        for mode in args.modes.split(","):
+            run_id = create_draft_run(db, args.campus, "bench", {"note": f"bench:{mode}"})
+            t0 = time.perf_counter()
+            if mode == "legacy":
+                _legacy_insert(db, run_id, cols)
+            else:
+                bulk_insert_cluster_member(db, run_id, cols, mode=mode, chunk_rows=args.chunk)
+            dt = time.perf_counter() - t0
+            print(f"{mode:>7}: {dt:8.3f}s  {args.rows / dt:10.0f} rows/s")
+
+            db.execute(text("DELETE FROM cluster_member WHERE run_id=:rid"), {"rid": run_id})
+            db.execute(text("DELETE FROM run WHERE run_id=:rid"), {"rid": run_id})
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench/bench_import_time.py
+"""
+프로세스 기동(임포트) 비용 벤치마크 — 역할별로 새 인터프리터에서 측정 (연결 불필요, .env만 필요)
+
+  python -m bench.bench_import_time --repeat 5
+
+- api      : SOLMEAL_ROLE=api 로 `import main` (API 워커)
+- all      : SOLMEAL_ROLE=all 로 `import main` (기존 단일 프로세스; 스케줄러 잡은 startup에서 로드)
+- scheduler: `import scheduler` (배치 프로세스)
+각 역할의 임포트 시간 중앙값, 최대 RSS, 로드된 무거운 모듈을 출력한다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_HEAVY = ("numpy", "pandas", "sklearn", "scipy", "pyarrow", "sqlalchemy", "pymysql", "redis", "apscheduler")
+
+_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t0
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({{"sec": dt, "maxrss_mb": rss_mb,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_ROLES = {
+    "api": ("main", {"SOLMEAL_ROLE": "api"}),
+    "all": ("main", {"SOLMEAL_ROLE": "all"}),
+    "scheduler": ("scheduler", {}),
+}
+
+
+def _probe(module: str, env_extra: dict) -> dict:
+    env = dict(os.environ, **env_extra)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=_HEAVY)],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--roles", default="api,all,scheduler")
+    args = ap.parse_args()
+
+    for role in args.roles.split(","):
+        module, env_extra = _ROLES[role]
+        runs = [_probe(module, env_extra) for _ in range(args.repeat)]
+        secs = [r["sec"] for r in runs]
+        print(
+            f"{role:>9}: import {statistics.median(secs) * 1000:8.1f}ms (median of {len(secs)})  "
+            f"maxrss={max(r['maxrss_mb'] for r in runs):7.1f}MB  heavy={runs[-1]['heavy']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
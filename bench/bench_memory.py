@@ -0,0 +1,74 @@
+# bench/bench_memory.py
+"""
+후보 DataFrame 파이프라인 메모리 벤치마크 (MySQL/Redis 불필요, 합성 데이터)
+
+  python -m bench.bench_memory --users 100000,1000000
+
+normalize_user_id → enrich_df_with_locations → build_feature_matrix 구간의
+tracemalloc 최대 할당량과 프로세스 최대 RSS(ru_maxrss)를 사이즈별로 출력한다.
+ru_maxrss는 프로세스 누적 최대값이므로 작은 사이즈부터 실행한다.
+"""
+import argparse
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from services.backend_client import PREF_KEY_MAP
+from services.cluster_batch import enrich_df_with_locations
+from services.cluster_job import build_feature_matrix
+from services.data_util import normalize_user_id
+
+
+def _synthetic(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.permutation(n * 2)[:n] + 1
+    cols = {"user_id": user_ids.astype(np.int64)}
+    for name in PREF_KEY_MAP.values():
+        cols[name] = rng.random(n, dtype=np.float32)
+    df = pd.DataFrame(cols)
+    # 위치 응답은 backend와 같은 dict 리스트 (일부 사용자는 위치 없음)
+    has_loc = user_ids[rng.random(n) < 0.9]
+    lon = 127.0 + rng.random(len(has_loc)) * 0.05
+    lat = 37.5 + rng.random(len(has_loc)) * 0.05
+    locations = [
+        {"userId": int(u), "longitude": float(x), "latitude": float(y)}
+        for u, x, y in zip(has_loc.tolist(), lon.tolist(), lat.tolist())
+    ]
+    return df, locations
+
+
+def _maxrss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # macOS는 bytes
+
+
+def run_once(n: int) -> None:
+    df, locations = _synthetic(n)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = normalize_user_id(df, copy=False)
+    df = enrich_df_with_locations(df, locations)
+    X, pref_cols = build_feature_matrix(df, w_loc=0.5, w_pref=1.5)
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"users={n:>9}  rows={len(df):>9}  X={X.shape} {X.dtype}  "
+        f"time={dt:7.3f}s  tracemalloc_peak={peak / 2**20:8.1f}MB  maxrss={_maxrss_mb():8.1f}MB"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", default="100000,1000000")
+    args = ap.parse_args()
+    for n in sorted(int(x) for x in args.users.split(",")):
+        run_once(n)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,15 @@ def _optional_int(key: str, default: int) -> int:
     except ValueError:
         raise RuntimeError(f"Invalid integer for {key}: {v}")
 
+def _optional_float(key: str, default: float) -> float:
+    v = os.getenv(key)
+    if v is None or v.strip() == "":
+        return default
+    try:
+        return float(v)
+    except ValueError:
+        raise RuntimeError(f"Invalid number for {key}: {v}")
+
 class Settings(BaseModel):
     # MySQL
     MYSQL_HOST: str
@@ -53,6 +62,93 @@ class Settings(BaseModel):
     BACKEND_API_KEY: str = ""
     BACKEND_TIMEOUT: int = 5
 
+    # dirty 쓰기 경로 (코얼레싱)
+    DIRTY_FLUSH_MS: int = 50
+    DIRTY_BATCH_USERS: int = 500
+    DIRTY_BULK_MAX: int = 10000
+
+    # cluster_member 적재 (batch: multi-row INSERT / infile: LOAD DATA LOCAL INFILE)
+    CM_INSERT_MODE: str = "batch"
+    CM_INSERT_CHUNK: int = 5000
+
+    # 스냅샷 보존 (cluster_member 파티션 단위 삭제)
+    RETENTION_HOURS: int = 48
+    RETENTION_PARTITION_RUNS: int = 144
+    RETENTION_PARTITIONS_AHEAD: int = 2
+
+    # 오프라인 분석용 스냅샷 파일 (Arrow IPC)
+    SNAPSHOT_DIR: str = "snapshots"
+    SNAPSHOT_EXPORT: int = 1
+    SNAPSHOT_COMPRESSION: str = "zstd"
+
+    # k-최근접 이웃 인덱스
+    KNN_MAX_K: int = 20
+
+    # 위치 격자 인덱스 (반경 조회)
+    GEO_CELL_M: int = 200
+    GEO_MAX_RADIUS_M: int = 3000
+
+    # 증분 배정 주기(초). 0이면 끔 → 풀 사이클만
+    STREAM_INTERVAL_SEC: int = 60
+
+    # MySQL 커넥션 풀 (워커 프로세스당; 합계가 MySQL max_connections를 넘지 않게)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: int = 10
+    DB_POOL_RECYCLE_SEC: int = 3600
+
+    # Redis 공유 풀 / 클라이언트 캐시 / 지연 메트릭
+    REDIS_MAX_CONNECTIONS: int = 64
+    REDIS_POOL_TIMEOUT_MS: int = 2000
+    REDIS_SOCKET_TIMEOUT_MS: int = 1000
+    REDIS_CONNECT_TIMEOUT_MS: int = 1000
+    REDIS_HEALTH_CHECK_SEC: int = 30
+    REDIS_CLIENT_CACHE: int = 0
+    REDIS_CLIENT_CACHE_SIZE: int = 10000
+    REDIS_METRICS: int = 1
+
+    # 활성 run 포인터 로컬 캐시(ms, 0이면 매 요청 GET) / keyspace 알림 구독
+    ACTIVE_RUN_CACHE_MS: int = 1000
+    ACTIVE_RUN_KEYSPACE: int = 0
+
+    # 레플리카 간 사이클 리더 락 (Redis)
+    CYCLE_LOCK_TTL_MS: int = 120000
+    CYCLE_DONE_TTL_SEC: int = 3600
+    # 입력 지문이 활성 run과 같으면 새 run을 만들지 않고 재사용
+    CYCLE_REUSE_UNCHANGED: int = 1
+
+    # 특징 표준화 (위치 km 투영 + 캠퍼스별 스케일러 재사용). 0이면 원시 위경도 특징
+    FEATURE_SCALER: int = 1
+    FEATURE_SCALER_REFIT_HOURS: int = 24
+
+    # 다음 앵커 입력 미리 계산 (0이면 끔)
+    LOOKAHEAD_ANCHORS: int = 2
+    LOOKAHEAD_KEEP_VERSIONS: int = 1000
+
+    # 사이클 실행 위치: inline(스케줄러/API 프로세스 안) / queue(Redis 큐 → 배치 워커 `python worker.py`)
+    CYCLE_EXECUTOR: str = "inline"
+    CYCLE_WORKERS: int = 2            # 워커 프로세스당 동시에 도는 사이클 잡(자식 프로세스) 상한
+    CYCLE_WORKER_MAX_TASKS: int = 20  # 자식 프로세스 재생성 주기 (pandas/sklearn 메모리 누적 방지)
+    CYCLE_JOB_TTL_SEC: int = 86400
+    CYCLE_JOB_KEEP: int = 200
+
+    # 빠른 직렬화: orjson 응답 + /me 응답을 워밍업 때 미리 인코딩(me:run:{rid})
+    FAST_JSON: int = 1
+
+    # 사이클 프로파일: 스케줄러 기본 모드(""=끔 / cprofile / sample), 샘플 간격, 결과 디렉터리, 보관 개수
+    CYCLE_PROFILE: str = ""
+    CYCLE_PROFILE_SAMPLE_MS: int = 5
+    PROFILE_DIR: str = "profiles"
+    PROFILE_KEEP: int = 50
+
+    # 요청 샘플링 프로파일러: 샘플 비율(0~1, 0이면 끔) / 보관할 느린 요청 수
+    REQUEST_PROFILE_SAMPLE: float = 0.0
+    REQUEST_PROFILE_SLOW_KEEP: int = 50
+
+    # 프로세스 역할: all(API+스케줄러, 기존 동작) / api(읽기 API만, 스케줄러 없음)
+    # 스케줄러 전용 프로세스는 `python scheduler.py`로 띄운다
+    SOLMEAL_ROLE: str = "all"
+
 # ⚠️ 기존 변수명/사용 패턴(settings.MYSQL_HOST 등) 유지
 settings = Settings(
     # MySQL (모두 필수)
@@ -74,4 +170,89 @@ settings = Settings(
     BACKEND_API_BASE=_require_str("BACKEND_API_BASE"),
     BACKEND_API_KEY=_optional_str("BACKEND_API_KEY", ""),
     BACKEND_TIMEOUT=_optional_int("BACKEND_TIMEOUT", 5),
+
+    # dirty 쓰기 경로
+    DIRTY_FLUSH_MS=_optional_int("DIRTY_FLUSH_MS", 50),
+    DIRTY_BATCH_USERS=_optional_int("DIRTY_BATCH_USERS", 500),
+    DIRTY_BULK_MAX=_optional_int("DIRTY_BULK_MAX", 10000),
+
+    # cluster_member 적재
+    CM_INSERT_MODE=_optional_str("CM_INSERT_MODE", "batch"),
+    CM_INSERT_CHUNK=_optional_int("CM_INSERT_CHUNK", 5000),
+
+    # 스냅샷 보존
+    RETENTION_HOURS=_optional_int("RETENTION_HOURS", 48),
+    RETENTION_PARTITION_RUNS=_optional_int("RETENTION_PARTITION_RUNS", 144),
+    RETENTION_PARTITIONS_AHEAD=_optional_int("RETENTION_PARTITIONS_AHEAD", 2),
+
+    # 스냅샷 파일
+    SNAPSHOT_DIR=_optional_str("SNAPSHOT_DIR", "snapshots"),
+    SNAPSHOT_EXPORT=_optional_int("SNAPSHOT_EXPORT", 1),
+    SNAPSHOT_COMPRESSION=_optional_str("SNAPSHOT_COMPRESSION", "zstd"),
+
+    # k-최근접 이웃 인덱스
+    KNN_MAX_K=_optional_int("KNN_MAX_K", 20),
+
+    # 위치 격자 인덱스
+    GEO_CELL_M=_optional_int("GEO_CELL_M", 200),
+    GEO_MAX_RADIUS_M=_optional_int("GEO_MAX_RADIUS_M", 3000),
+
+    # 증분 배정
+    STREAM_INTERVAL_SEC=_optional_int("STREAM_INTERVAL_SEC", 60),
+
+    # MySQL 커넥션 풀
+    DB_POOL_SIZE=_optional_int("DB_POOL_SIZE", 10),
+    DB_MAX_OVERFLOW=_optional_int("DB_MAX_OVERFLOW", 10),
+    DB_POOL_TIMEOUT_SEC=_optional_int("DB_POOL_TIMEOUT_SEC", 10),
+    DB_POOL_RECYCLE_SEC=_optional_int("DB_POOL_RECYCLE_SEC", 3600),
+
+    # Redis 공유 풀 / 클라이언트 캐시 / 지연 메트릭
+    REDIS_MAX_CONNECTIONS=_optional_int("REDIS_MAX_CONNECTIONS", 64),
+    REDIS_POOL_TIMEOUT_MS=_optional_int("REDIS_POOL_TIMEOUT_MS", 2000),
+    REDIS_SOCKET_TIMEOUT_MS=_optional_int("REDIS_SOCKET_TIMEOUT_MS", 1000),
+    REDIS_CONNECT_TIMEOUT_MS=_optional_int("REDIS_CONNECT_TIMEOUT_MS", 1000),
+    REDIS_HEALTH_CHECK_SEC=_optional_int("REDIS_HEALTH_CHECK_SEC", 30),
+    REDIS_CLIENT_CACHE=_optional_int("REDIS_CLIENT_CACHE", 0),
+    REDIS_CLIENT_CACHE_SIZE=_optional_int("REDIS_CLIENT_CACHE_SIZE", 10000),
+    REDIS_METRICS=_optional_int("REDIS_METRICS", 1),
+
+    # 활성 run 포인터 캐시
+    ACTIVE_RUN_CACHE_MS=_optional_int("ACTIVE_RUN_CACHE_MS", 1000),
+    ACTIVE_RUN_KEYSPACE=_optional_int("ACTIVE_RUN_KEYSPACE", 0),
+
+    # 레플리카 간 사이클 리더 락
+    CYCLE_LOCK_TTL_MS=_optional_int("CYCLE_LOCK_TTL_MS", 120000),
+    CYCLE_DONE_TTL_SEC=_optional_int("CYCLE_DONE_TTL_SEC", 3600),
+    CYCLE_REUSE_UNCHANGED=_optional_int("CYCLE_REUSE_UNCHANGED", 1),
+
+    # 특징 표준화
+    FEATURE_SCALER=_optional_int("FEATURE_SCALER", 1),
+    FEATURE_SCALER_REFIT_HOURS=_optional_int("FEATURE_SCALER_REFIT_HOURS", 24),
+
+    # 다음 앵커 입력 미리 계산
+    LOOKAHEAD_ANCHORS=_optional_int("LOOKAHEAD_ANCHORS", 2),
+    LOOKAHEAD_KEEP_VERSIONS=_optional_int("LOOKAHEAD_KEEP_VERSIONS", 1000),
+
+    # 사이클 실행 위치 / 배치 워커
+    CYCLE_EXECUTOR=_optional_str("CYCLE_EXECUTOR", "inline"),
+    CYCLE_WORKERS=_optional_int("CYCLE_WORKERS", 2),
+    CYCLE_WORKER_MAX_TASKS=_optional_int("CYCLE_WORKER_MAX_TASKS", 20),
+    CYCLE_JOB_TTL_SEC=_optional_int("CYCLE_JOB_TTL_SEC", 86400),
+    CYCLE_JOB_KEEP=_optional_int("CYCLE_JOB_KEEP", 200),
+
+    # 빠른 직렬화
+    FAST_JSON=_optional_int("FAST_JSON", 1),
+
+    # 사이클 프로파일
+    CYCLE_PROFILE=_optional_str("CYCLE_PROFILE", ""),
+    CYCLE_PROFILE_SAMPLE_MS=_optional_int("CYCLE_PROFILE_SAMPLE_MS", 5),
+    PROFILE_DIR=_optional_str("PROFILE_DIR", "profiles"),
+    PROFILE_KEEP=_optional_int("PROFILE_KEEP", 50),
+
+    # 요청 샘플링 프로파일러
+    REQUEST_PROFILE_SAMPLE=_optional_float("REQUEST_PROFILE_SAMPLE", 0.0),
+    REQUEST_PROFILE_SLOW_KEEP=_optional_int("REQUEST_PROFILE_SLOW_KEEP", 50),
+
+    # 프로세스 역할
+    SOLMEAL_ROLE=_optional_str("SOLMEAL_ROLE", "all"),
 )
@@ -1,5 +1,13 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from core import metrics, request_profile
 from core.config import settings
 
 DATABASE_URL = (
@@ -8,10 +16,96 @@ DATABASE_URL = (
     "?charset=utf8mb4"
 )
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    future=True,
-)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+POOL_WAIT_METRIC = "db.pool_wait"
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool + 체크아웃 대기시간(풀 대기 + 필요 시 신규 연결 생성) 히스토그램 / 타임아웃 횟수"""
+
+    timeouts = 0
+    _timeouts_lock = threading.Lock()  # 여러 요청 스레드가 동시에 올린다 (+= 는 원자적이지 않음)
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with TimedQueuePool._timeouts_lock:
+                TimedQueuePool.timeouts += 1
+            raise
+        finally:
+            metrics.observe(POOL_WAIT_METRIC, time.perf_counter() - t0)
+
+
+def _profile_cursor_time(engine: Engine) -> None:
+    """샘플링된 요청(core.request_profile)의 "db" 구간: 커서 실행 시간 (샘플링이 켜진 경우에만 등록)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_profile_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        request_profile.add_span("db", time.perf_counter() - conn.info["_profile_t0"].pop())
+
+
+# 엔진/세션 팩토리는 첫 사용 시 생성 (임포트만으로는 DB 드라이버 로드/풀 생성 없음)
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = create_engine(
+                    DATABASE_URL,
+                    poolclass=TimedQueuePool,
+                    pool_size=settings.DB_POOL_SIZE,
+                    max_overflow=settings.DB_MAX_OVERFLOW,
+                    pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+                    pool_pre_ping=True,
+                    pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+                    future=True,
+                    # LOAD DATA LOCAL INFILE 적재 모드에서만 클라이언트 측 허용
+                    connect_args={"local_infile": settings.CM_INSERT_MODE == "infile"},
+                )
+                if request_profile.enabled():
+                    _profile_cursor_time(engine)
+                _session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+                _engine = engine
+    return _engine
+
+
+def SessionLocal() -> Session:
+    """기존 sessionmaker와 같은 사용법: SessionLocal() / with SessionLocal() as db"""
+    get_engine()
+    return _session_factory()
+
+
+def get_db() -> Iterator[Session]:
+    """FastAPI 의존성: Depends(get_db). 요청이 끝나면(예외 포함) 세션을 항상 닫는다"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_stats() -> dict:
+    """엔진 풀 상태 (엔진이 아직 없으면 created=False)"""
+    if _engine is None:
+        return {"created": False}
+    pool = _engine.pool
+    return {
+        "created": True,
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "timeouts": TimedQueuePool.timeouts,
+        "checkout_wait": metrics.histogram(POOL_WAIT_METRIC).snapshot(),
+    }
@@ -0,0 +1,89 @@
+# core/metrics.py
+"""
+프로세스 내 경량 지연시간 히스토그램.
+
+고정 버킷(µs 상한)에 카운트만 올리므로 기록 비용은 락 한 번 + bisect.
+분위수는 버킷 상한으로 근사한다 (튜닝/비교용; 정밀 측정은 외부 APM 사용).
+"""
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# 버킷 상한 (µs). 마지막은 +inf
+BUCKETS_US: List[int] = [50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000]
+
+
+class LatencyHistogram:
+    __slots__ = ("_lock", "counts", "count", "total_sec", "max_sec")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_US) + 1)
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+
+    def observe(self, sec: float) -> None:
+        i = bisect_left(BUCKETS_US, sec * 1e6)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_sec += sec
+            if sec > self.max_sec:
+                self.max_sec = sec
+
+    def _quantile_ms(self, counts: List[int], total: int, q: float) -> Optional[float]:
+        if not total:
+            return None
+        rank = q * total
+        acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= rank:
+                return BUCKETS_US[i] / 1000 if i < len(BUCKETS_US) else None  # +inf 버킷
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, total_sec, max_sec = self.count, self.total_sec, self.max_sec
+        return {
+            "count": total,
+            "mean_ms": (total_sec / total * 1000) if total else None,
+            "max_ms": max_sec * 1000 if total else None,
+            "p50_ms": self._quantile_ms(counts, total, 0.50),
+            "p95_ms": self._quantile_ms(counts, total, 0.95),
+            "p99_ms": self._quantile_ms(counts, total, 0.99),
+            # 누적 아님: "le_{상한µs}" 별 개수
+            "buckets": {
+                (f"le_{BUCKETS_US[i]}us" if i < len(BUCKETS_US) else "inf"): c
+                for i, c in enumerate(counts) if c
+            },
+        }
+
+
+_registry: Dict[str, LatencyHistogram] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str) -> LatencyHistogram:
+    h = _registry.get(name)
+    if h is None:
+        with _registry_lock:
+            h = _registry.setdefault(name, LatencyHistogram())
+    return h
+
+
+def observe(name: str, sec: float) -> None:
+    histogram(name).observe(sec)
+
+
+def snapshot(prefix: str = "") -> Dict[str, dict]:
+    """prefix로 시작하는 히스토그램 스냅샷 {이름(prefix 제외): {...}}"""
+    return {name[len(prefix):]: h.snapshot() for name, h in sorted(_registry.items()) if name.startswith(prefix)}
+
+
+def reset(prefix: str = "") -> None:
+    with _registry_lock:
+        for name in [n for n in _registry if n.startswith(prefix)]:
+            del _registry[name]
@@ -0,0 +1,159 @@
+# core/request_profile.py
+"""
+요청 단위 샘플링 프로파일러 (느린 요청 분석용).
+
+REQUEST_PROFILE_SAMPLE 비율의 요청만 프로파일 객체를 contextvar에 올리고, 그 요청 동안
+  - Redis 명령 / 파이프라인 (core.redis_client.InstrumentedRedis)
+  - DB 커서 실행 (core.db 엔진 이벤트)
+  - 핸들러가 span("...")으로 감싼 구간 (벽시계 + 스레드 CPU)
+의 누적 시간을 모은다. 끝나면 전체 시간 기준 가장 느린 REQUEST_PROFILE_SLOW_KEEP 건만 남긴다.
+
+샘플링이 꺼져 있으면(0) 미들웨어는 바로 통과하고, 계측 지점은 contextvar 조회 한 번만 한다.
+"other_ms" = 응답 시작까지 걸린 시간 - (redis + db + span): 검증/직렬화/프레임워크 오버헤드.
+(span 안에서 Redis/DB를 호출하면 중복 집계되므로 span은 순수 파이썬 구간에만 쓴다)
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from core.config import settings
+
+
+class RequestProfile:
+    __slots__ = ("method", "path", "started_at", "t0", "spans")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.spans: Dict[str, list] = {}  # name -> [count, wall_sec, cpu_sec]
+
+    def add(self, name: str, wall_sec: float, cpu_sec: float = 0.0) -> None:
+        s = self.spans.get(name)
+        if s is None:
+            self.spans[name] = [1, wall_sec, cpu_sec]
+        else:
+            s[0] += 1
+            s[1] += wall_sec
+            s[2] += cpu_sec
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def add_span(name: str, wall_sec: float) -> None:
+    """계측 지점(Redis/DB)에서 호출: 샘플링된 요청이 아니면 아무것도 하지 않음"""
+    prof = _current.get()
+    if prof is not None:
+        prof.add(name, wall_sec)
+
+
+@contextmanager
+def span(name: str):
+    """핸들러 코드 구간 계측: with span("members"): ... (벽시계 + 현재 스레드 CPU)"""
+    prof = _current.get()
+    if prof is None:
+        yield
+        return
+    t0, c0 = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        prof.add(f"span.{name}", time.perf_counter() - t0, time.thread_time() - c0)
+
+
+# ───────────────────────── 느린 요청 보관 ─────────────────────────
+
+class _SlowRequests:
+    """전체 시간 상위 N건 (min-heap, 가장 빠른 항목을 밀어냄)"""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.sampled = 0
+
+    def offer(self, total_sec: float, record: dict) -> None:
+        item = (total_sec, next(self._seq), record)
+        with self._lock:
+            self.sampled += 1
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, item)
+            elif total_sec > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = sorted(self._heap, reverse=True)
+            sampled = self.sampled
+        return {"sampled": sampled, "slowest": [rec for _, _, rec in items]}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self.sampled = 0
+
+
+slow_requests = _SlowRequests(max(1, settings.REQUEST_PROFILE_SLOW_KEEP))
+
+
+def _record(prof: RequestProfile, status: Optional[int], first_byte_sec: Optional[float], total_sec: float) -> dict:
+    handler_sec = first_byte_sec if first_byte_sec is not None else total_sec
+    spans = {
+        name: {"count": c, "ms": round(w * 1000, 3), **({"cpu_ms": round(cpu * 1000, 3)} if cpu else {})}
+        for name, (c, w, cpu) in sorted(prof.spans.items())
+    }
+    accounted = sum(w for _, w, _ in prof.spans.values())
+    return {
+        "method": prof.method,
+        "path": prof.path,
+        "status": status,
+        "started_at": prof.started_at,
+        "total_ms": round(total_sec * 1000, 3),
+        "first_byte_ms": round(handler_sec * 1000, 3),
+        "other_ms": round(max(0.0, handler_sec - accounted) * 1000, 3),
+        "spans": spans,
+    }
+
+
+class RequestProfileMiddleware:
+    """순수 ASGI 미들웨어 (BaseHTTPMiddleware의 스트림 래핑 비용 없음)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.sample = settings.REQUEST_PROFILE_SAMPLE
+
+    async def __call__(self, scope, receive, send):
+        if self.sample <= 0 or scope["type"] != "http" or random.random() >= self.sample:
+            await self.app(scope, receive, send)
+            return
+
+        prof = RequestProfile(scope.get("method", ""), scope.get("path", ""))
+        status: Optional[int] = None
+        first_byte: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal status, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = time.perf_counter() - prof.t0
+            await send(message)
+
+        token = _current.set(prof)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - prof.t0
+            slow_requests.offer(total, _record(prof, status, first_byte, total))
+
+
+def enabled() -> bool:
+    return settings.REQUEST_PROFILE_SAMPLE > 0
@@ -0,0 +1,9 @@
+USE solmeal;
+
+-- 다음 공강 창 인덱스: 주간 공강 구간 (start,end) 쌍을 uint16 LE로 직렬화
+CREATE TABLE IF NOT EXISTS meal_window_index (
+  user_id      BIGINT     NOT NULL PRIMARY KEY,
+  free_runs    BLOB       NOT NULL,
+  all_free     TINYINT(1) NOT NULL DEFAULT 0,
+  updated_at   DATETIME   NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,15 @@
+USE solmeal;
+
+-- cluster_member를 run_id 범위로 파티셔닝 → 만료 스냅샷은 DROP PARTITION으로 O(1) 삭제
+-- MySQL 파티션 테이블은 FK를 지원하지 않으므로 fk_cm_run 제거 (정합성은 retention_service가 보장)
+-- 기존 DB에도 그대로 실행 가능한 마이그레이션 (pmax에 기존 행이 모두 들어감)
+ALTER TABLE cluster_member DROP FOREIGN KEY fk_cm_run;
+
+-- 파티션 키(run_id)는 모든 UNIQUE/PK에 포함되어야 함
+ALTER TABLE cluster_member DROP PRIMARY KEY, ADD PRIMARY KEY (id, run_id);
+
+ALTER TABLE cluster_member
+  PARTITION BY RANGE (run_id) (
+    PARTITION p0   VALUES LESS THAN (1),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+  );
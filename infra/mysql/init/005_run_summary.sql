@@ -0,0 +1,11 @@
+USE solmeal;
+
+-- run_summary: 클러스터링 시점에 한 번 계산한 run 통계 (/admin/runs/{id}/stats 용)
+CREATE TABLE IF NOT EXISTS run_summary (
+  run_id        BIGINT   NOT NULL PRIMARY KEY,
+  total_members INT      NOT NULL,
+  cluster_count INT      NOT NULL,
+  summary_json  JSON     NOT NULL,
+  created_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT fk_summary_run FOREIGN KEY (run_id) REFERENCES run(run_id) ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,5 @@
+USE solmeal;
+
+-- 리더 락 펜싱 토큰: 더 작은 토큰을 가진(락을 잃은) 이전 리더의 활성화를 거부
+ALTER TABLE campus_latest
+  ADD COLUMN fence_token BIGINT NOT NULL DEFAULT 0 AFTER active_run_id;
@@ -1,55 +1,46 @@
 from fastapi import FastAPI
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from zoneinfo import ZoneInfo
 
 from api.routes import router as clusters_router
 from api.admin_routes import router as admin_router
 from api.dirty_routes import router as dirty_router
+from api.responses import OrjsonResponse
 from core.config import settings
-from services.cluster_batch import run_full_cycle
-from services.dirty_recompute import recompute_dirty_bits
-from sqlalchemy import text
-from core.db import SessionLocal
+from core.request_profile import RequestProfileMiddleware
+from services.dirty_writer import dirty_coalescer
 
-app = FastAPI(title="SOLMEAL API", version="0.1.0")
+# FAST_JSON=1: 응답 렌더링을 orjson으로 (핫 엔드포인트는 api.responses로 인코딩 단계까지 생략)
+app = FastAPI(title="SOLMEAL API", version="0.1.0",
+              **({"default_response_class": OrjsonResponse} if settings.FAST_JSON else {}))
+
+# 요청 샘플링 프로파일러 (REQUEST_PROFILE_SAMPLE=0이면 그대로 통과)
+app.add_middleware(RequestProfileMiddleware)
 
 # 라우터
 app.include_router(clusters_router)
 app.include_router(admin_router)
 app.include_router(dirty_router)
 
-# 10분 오토사이클
-sched = BackgroundScheduler(timezone=ZoneInfo("Asia/Seoul"))
-
-def _auto_cycle_tick():
-    # 1) 더티 있으면 재계산
-    with SessionLocal() as db:
-        dirty = db.execute(text("SELECT COUNT(*) FROM timetable_bit WHERE is_dirty=1")).scalar_one()
-    if dirty:
-        recompute_dirty_bits()
-    # 2) 스냅샷 사이클
-    run_full_cycle(settings.CAMPUS_ID, algo="kmeans-v1", note="scheduler")
+# 10분 오토사이클: SOLMEAL_ROLE=all 일 때만 API 프로세스 안에서 실행
+# (api 모드는 배치 모듈을 임포트하지 않음 → 스케줄러는 `python scheduler.py`로 별도 기동)
+sched = None
 
 @app.on_event("startup")
 def on_startup():
-    # ⬇️ interval 대신 cron으로 교체 (정각 기준 10분 간격)
-    trigger = CronTrigger(minute="0,10,20,30,40,50")
-    sched.add_job(
-        _auto_cycle_tick,
-        trigger=trigger,
-        id="cluster_cycle",
-        replace_existing=True,
-        max_instances=1,       # 겹치기 방지: 이전 실행이 끝나지 않았으면 중복 실행 금지
-        coalesce=True,         # 지연된 여러 트리거를 한 번으로 합치기
-        misfire_grace_time=120 # 일시 장애 시 120초 내 보정 허용
-    )
+    global sched
+    if settings.SOLMEAL_ROLE != "all":
+        return
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from scheduler import SCHED_TZ, register_jobs
+
+    sched = register_jobs(BackgroundScheduler(timezone=SCHED_TZ))
     sched.start()
 
 
 @app.on_event("shutdown")
 def on_shutdown():
-    sched.shutdown(wait=False)
+    if sched is not None:
+        sched.shutdown(wait=False)
+    dirty_coalescer.stop()  # 남은 dirty mark flush 후 종료
 
 @app.get("/")
 def root():
@@ -0,0 +1,122 @@
+# scheduler.py
+"""
+배치/스케줄러 프로세스.
+
+  python scheduler.py            # 스케줄러 전용 프로세스 (BlockingScheduler)
+
+API 워커(SOLMEAL_ROLE=api)와 분리해 띄우면 pandas/sklearn 등 배치 의존성은 이 프로세스만 로드한다.
+SOLMEAL_ROLE=all(기본)이면 main.py가 startup에서 같은 잡을 BackgroundScheduler로 등록한다.
+여러 프로세스/레플리카에서 돌아도 각 잡은 Redis 리더 락(services.cycle_lock)으로 한 곳에서만 실행된다.
+"""
+import logging
+from zoneinfo import ZoneInfo
+
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from core.config import settings
+from services.cycle_lock import leader_lock, run_cycle_with_dirty
+from services.cycle_queue import enqueue_cycle
+from services.dirty_recompute import recompute_dirty_bits
+from services.lookahead import stage_upcoming
+from services.retention_service import run_retention
+from services.stream_assign import reassign_users
+
+SCHED_TZ = ZoneInfo("Asia/Seoul")
+
+
+def _auto_cycle_tick():
+    # CYCLE_EXECUTOR=queue: 잡만 넣고 실행은 배치 워커(worker.py) 프로세스에서
+    if settings.CYCLE_EXECUTOR == "queue":
+        job = enqueue_cycle(settings.CAMPUS_ID, note="scheduler", profile=settings.CYCLE_PROFILE or None)
+        logging.info(f"[CYCLE] enqueued {job}")
+        return
+    # 더티 재계산 → 스냅샷 사이클: 앵커당 한 레플리카만 (나머지는 즉시 skip)
+    result = run_cycle_with_dirty(settings.CAMPUS_ID, algo="kmeans-v1", note="scheduler",
+                                  profile=settings.CYCLE_PROFILE or None)
+    logging.info(f"[CYCLE] {result}")
+
+
+def _stream_tick():
+    # 풀 사이클 사이: dirty 사용자만 재계산해 활성 run에 증분 배정
+    with leader_lock("dirty_recompute") as lease:
+        if lease is None:
+            return
+        users = recompute_dirty_bits()
+        if users:
+            reassign_users(settings.CAMPUS_ID, users)
+
+
+def _lookahead_tick():
+    # 틱 사이(:05, :15, ...)에 다음 앵커들의 후보/요청 바디를 미리 스테이징
+    with leader_lock("lookahead") as lease:
+        if lease is None:
+            return
+        staged = stage_upcoming(settings.CAMPUS_ID)
+        if staged:
+            logging.info(f"[LOOKAHEAD] staged {staged}")
+
+
+def _retention_tick():
+    with leader_lock("retention") as lease:
+        if lease is not None:
+            run_retention()
+
+
+def register_jobs(sched: BaseScheduler) -> BaseScheduler:
+    # 정각 기준 10분 간격 (cron)
+    sched.add_job(
+        _auto_cycle_tick,
+        trigger=CronTrigger(minute="0,10,20,30,40,50"),
+        id="cluster_cycle",
+        replace_existing=True,
+        max_instances=1,       # 겹치기 방지: 이전 실행이 끝나지 않았으면 중복 실행 금지
+        coalesce=True,         # 지연된 여러 트리거를 한 번으로 합치기
+        misfire_grace_time=120 # 일시 장애 시 120초 내 보정 허용
+    )
+    if settings.STREAM_INTERVAL_SEC > 0:
+        sched.add_job(
+            _stream_tick,
+            trigger=IntervalTrigger(seconds=settings.STREAM_INTERVAL_SEC),
+            id="stream_assign",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+    if settings.LOOKAHEAD_ANCHORS > 0:
+        sched.add_job(
+            _lookahead_tick,
+            trigger=CronTrigger(minute="5,15,25,35,45,55"),
+            id="lookahead_stage",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=120,
+        )
+    # 스냅샷 보존: 매시 35분 (사이클 틱과 겹치지 않게)
+    sched.add_job(
+        _retention_tick,
+        trigger=CronTrigger(minute="35"),
+        id="snapshot_retention",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=600,
+    )
+    return sched
+
+
+def main():
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    logging.basicConfig(level=logging.INFO)
+    sched = register_jobs(BlockingScheduler(timezone=SCHED_TZ))
+    try:
+        sched.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# services/active_run.py
+"""
+활성 run 포인터(active:campus:{cid} = "run:{id}") 읽기 경로 캐시.
+
+포인터는 activate_run에서만 바뀌므로 워커 로컬 dict에 ACTIVE_RUN_CACHE_MS 동안 두고,
+바뀌는 즉시 다음 두 경로로 갱신한다.
+  - activate_run이 같은 MULTI 안에서 SET + PUBLISH active:changed "{cid}:{run_id}"
+  - (선택) ACTIVE_RUN_KEYSPACE=1: Redis keyspace 알림(notify-keyspace-events에 K$ 필요)
+구독 스레드가 끊겨도 TTL이 지연 상한을 보장한다.
+
+반쯤 워밍된 run은 보이지 않는다: run_full_cycle은 cm:run/cl:run 워밍업을 끝낸 뒤에만
+activate_run을 호출하므로, 포인터(캐시 포함)에 등장하는 run은 항상 워밍 완료 상태다.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+from core.redis_client import get_redis
+
+ACTIVE_CHANNEL = "active:changed"
+_KEYSPACE_PATTERN = "__keyspace@*__:active:campus:*"
+
+_cache: Dict[int, Tuple[Optional[int], float]] = {}  # campus_id → (run_id, 만료 monotonic)
+_lock = threading.Lock()
+_listener = None
+
+
+def active_key(campus_id: int) -> str:
+    return f"active:campus:{campus_id}"
+
+
+def parse_run_pointer(value: Optional[str]) -> Optional[int]:
+    if not value or not value.startswith("run:"):
+        return None
+    return int(value.split(":", 1)[1])
+
+
+def _on_changed(message) -> None:
+    try:
+        campus, run = str(message["data"]).split(":", 1)
+        with _lock:
+            _cache[int(campus)] = (int(run), time.monotonic() + settings.ACTIVE_RUN_CACHE_MS / 1000)
+    except (ValueError, KeyError):
+        logging.warning(f"[ACTIVE] bad message: {message!r}")
+
+
+def _on_keyspace(message) -> None:
+    # 채널 "__keyspace@0__:active:campus:{cid}" → 해당 캠퍼스 캐시 무효화 (다음 조회에서 GET)
+    try:
+        campus = int(str(message["channel"]).rsplit(":", 1)[1])
+    except (ValueError, KeyError):
+        return
+    with _lock:
+        _cache.pop(campus, None)
+
+
+def _on_listener_error(exc, pubsub, thread) -> None:
+    logging.warning(f"[ACTIVE] pointer subscription error: {exc}")
+    with _lock:
+        _cache.clear()  # 놓친 알림이 있을 수 있음 → 다음 조회는 Redis에서
+    time.sleep(1.0)
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    with _lock:
+        if _listener is not None:
+            return
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{ACTIVE_CHANNEL: _on_changed})
+        if settings.ACTIVE_RUN_KEYSPACE:
+            pubsub.psubscribe(**{_KEYSPACE_PATTERN: _on_keyspace})
+        _listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=_on_listener_error)
+
+
+def active_run_id(campus_id: int) -> Optional[int]:
+    """활성 run_id (없으면 None). 캐시 적중 시 Redis 명령 없음, 미스 시 GET 1번"""
+    campus_id = int(campus_id)
+    ttl = settings.ACTIVE_RUN_CACHE_MS / 1000
+    if ttl <= 0:
+        return parse_run_pointer(get_redis().get(active_key(campus_id)))
+
+    now = time.monotonic()
+    hit = _cache.get(campus_id)
+    if hit is not None and hit[1] > now:
+        return hit[0]
+
+    try:
+        _ensure_listener()
+    except Exception as e:
+        logging.warning(f"[ACTIVE] subscribe failed, TTL-only cache: {e}")
+    run_id = parse_run_pointer(get_redis().get(active_key(campus_id)))
+    with _lock:
+        _cache[campus_id] = (run_id, now + ttl)
+    return run_id
+
+
+def invalidate(campus_id: Optional[int] = None) -> None:
+    with _lock:
+        if campus_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(campus_id), None)
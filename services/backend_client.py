@@ -1,11 +1,16 @@
 # services/backend_client.py
-from typing import List, Dict, Any, DefaultDict
-from collections import defaultdict
+import logging
+from typing import List, Dict, Any
+from dataclasses import dataclass
+import orjson
 import requests
 from core.config import settings  # settings.BACKEND_API_BASE 사용
+from core.db import SessionLocal
 from services.data_util import normalize_user_id
 from services.timetable_bits import SLOTS_PER_DAY, SLOT_MIN
 from services.timetable_service import fetch_allweek_slots_for_users, meal_anchor_or_last_end_allweek
+from services.meal_window_index import fetch_indexes_for_users, query_meal_anchor, build_free_runs, upsert_indexes
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
@@ -14,36 +19,83 @@ def _hhmmss_to_min(hhmmss: str) -> int:
     h, m, s = hhmmss.split(":")
     return int(h) * 60 + int(m) + (int(s) // 60)
 
-def _clamp_minute(m: int) -> int:
-    return max(0, min(SLOTS_PER_DAY * SLOT_MIN, m))
+@dataclass
+class IntervalColumns:
+    """
+    시간표 구간의 컬럼형 표현. 같은 index끼리 한 구간.
+    merge_intervals_columnar를 거치면 (user_id, dow, start_min) 순으로 정렬·병합되어 있다.
+    """
+    user_id: np.ndarray    # int64
+    dow: np.ndarray        # int8 (0=Mon ... 6=Sun)
+    start_min: np.ndarray  # int16
+    end_min: np.ndarray    # int16
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+def _empty_interval_columns() -> IntervalColumns:
+    return IntervalColumns(
+        user_id=np.empty(0, dtype=np.int64),
+        dow=np.empty(0, dtype=np.int8),
+        start_min=np.empty(0, dtype=np.int16),
+        end_min=np.empty(0, dtype=np.int16),
+    )
 
-def _merge_intervals(intervals: List[Dict[str, int]]) -> List[Dict[str, int]]:
+def _hhmmss_to_min_vec(values: List[str]) -> np.ndarray:
     """
-    같은 요일 내에서 겹치거나 인접(예: 10:00~10:30, 10:30~11:00)한 구간을 병합하여
-    비트 채우기 부담을 줄인다.
+    "HH:MM:SS" 문자열 배열 → 분(int64). 고정폭이 아닌 값만 _hhmmss_to_min으로 처리.
     """
-    if not intervals:
-        return []
-    ints = sorted(intervals, key=lambda x: x["start_min"])
-    merged = [ints[0]]
-    for cur in ints[1:]:
-        prev = merged[-1]
-        if cur["start_min"] <= prev["end_min"]:  # 겹침 또는 인접(끝==시작) 허용하려면 < 대신 <=
-            prev["end_min"] = max(prev["end_min"], cur["end_min"])
-        else:
-            merged.append(cur)
-    return merged
-
-def get_intervals_bulk(user_ids: List[int]) -> Dict[int, Dict[int, list]]:
+    raw = np.array(values, dtype="S8")
+    lens = np.char.str_len(raw)
+    d = raw.view(np.uint8).reshape(-1, 8).astype(np.int64) - ord("0")
+    out = (d[:, 0] * 10 + d[:, 1]) * 60 + (d[:, 3] * 10 + d[:, 4]) + (d[:, 6] * 10 + d[:, 7]) // 60
+    odd = np.flatnonzero(lens != 8)
+    for i in odd:
+        out[i] = _hhmmss_to_min(values[i])
+    return out
+
+def merge_intervals_columnar(cols: IntervalColumns) -> IntervalColumns:
+    """
+    (user_id, dow, start_min)로 정렬 후, 같은 (user_id, dow) 안에서 겹치거나 인접한 구간을 병합.
+    다음 구간의 시작이 직전(병합된) 구간의 끝 이하이면(cur.start <= prev.end) 하나로 합친다 — 벡터 연산.
+    """
+    if len(cols) == 0:
+        return cols
+    order = np.lexsort((cols.start_min, cols.dow, cols.user_id))
+    uid = cols.user_id[order]
+    dow = cols.dow[order]
+    s = cols.start_min[order].astype(np.int64)
+    e = cols.end_min[order].astype(np.int64)
+
+    new_group = np.empty(len(uid), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = (uid[1:] != uid[:-1]) | (dow[1:] != dow[:-1])
+
+    # 그룹별 누적 최대 end: 그룹 번호를 큰 오프셋으로 더해 한 번의 maximum.accumulate로 처리
+    g = np.cumsum(new_group) - 1
+    big = SLOTS_PER_DAY * SLOT_MIN + 1
+    run_max = np.maximum.accumulate(g * big + e) - g * big
+
+    new_run = new_group.copy()
+    new_run[1:] |= s[1:] > run_max[:-1]
+    idx = np.flatnonzero(new_run)
+    return IntervalColumns(
+        user_id=uid[idx],
+        dow=dow[idx],
+        start_min=s[idx].astype(np.int16),
+        end_min=np.maximum.reduceat(e, idx).astype(np.int16),
+    )
+
+def get_intervals_columnar(user_ids: List[int]) -> IntervalColumns:
     """
     POST /api/timetable/users
     Body: [1,2,3]
     Response: { success, message, timetables: [ { userId, lectures:[{dayOfWeek, startTime, endTime}, ...] }, ... ] }
 
-    반환 형식: { uid: { dow: [ {start_min, end_min}, ... ] } }
+    응답을 orjson으로 디코드해 user_id/dow/start/end 배열로 모은 뒤 한 번에 정렬·병합한다.
     """
     if not user_ids:
-        return {}
+        return _empty_interval_columns()
 
     url = f"{settings.BACKEND_API_BASE}/api/timetable/users"
     headers = {"Accept": "application/json"}
@@ -52,47 +104,57 @@ def get_intervals_bulk(user_ids: List[int]) -> Dict[int, Dict[int, list]]:
 
     resp = requests.post(url, json=user_ids, headers=headers, timeout=getattr(settings, "BACKEND_TIMEOUT", 5))
     resp.raise_for_status()
-    data: Dict[str, Any] = resp.json() or {}
-    timetables = data.get("timetables") or []
-
-    # uid → dow → intervals
-    buckets: DefaultDict[int, DefaultDict[int, list]] = defaultdict(lambda: defaultdict(list))
+    data: Dict[str, Any] = orjson.loads(resp.content) if resp.content else {}
+    timetables = (data or {}).get("timetables") or []
 
+    uids: List[int] = []
+    dows: List[int] = []
+    starts: List[str] = []
+    ends: List[str] = []
     for item in timetables:
         uid = item.get("userId")
-        lectures = item.get("lectures") or []
         if uid is None:
             continue
-
-        per_dow: DefaultDict[int, list] = defaultdict(list)
-        for lec in lectures:
+        uid = int(uid)
+        for lec in item.get("lectures") or []:
             dow = lec.get("dayOfWeek")
             st = lec.get("startTime")
             et = lec.get("endTime")
             if dow is None or not st or not et:
                 continue
+            uids.append(uid)
+            dows.append(int(dow))
+            starts.append(st)
+            ends.append(et)
 
-            s_min = _clamp_minute(_hhmmss_to_min(st))
-            e_min = _clamp_minute(_hhmmss_to_min(et))
-            if e_min <= s_min:
-                continue
-
-            per_dow[dow].append({"start_min": s_min, "end_min": e_min})
-
-        # 병합해서 넣기
-        for dow, ivs in per_dow.items():
-            buckets[uid][dow] = _merge_intervals(ivs)
+    if not uids:
+        return _empty_interval_columns()
 
-    # dict로 변환
-    out: Dict[int, Dict[int, list]] = {}
-    for uid, per_dow in buckets.items():
-        out[uid] = dict(per_dow)
-    return out
+    limit = SLOTS_PER_DAY * SLOT_MIN
+    s_min = np.clip(_hhmmss_to_min_vec(starts), 0, limit)
+    e_min = np.clip(_hhmmss_to_min_vec(ends), 0, limit)
+    ok = e_min > s_min
+    cols = IntervalColumns(
+        user_id=np.asarray(uids, dtype=np.int64)[ok],
+        dow=np.asarray(dows, dtype=np.int8)[ok],
+        start_min=s_min[ok].astype(np.int16),
+        end_min=e_min[ok].astype(np.int16),
+    )
+    return merge_intervals_columnar(cols)
 
 def _format_time_hhmmss(t) -> str:
     """datetime.time → 'HH:MM:SS' 문자열 (PostgreSQL TIME 직렬화 용)"""
     return f"{t.hour:02d}:{t.minute:02d}:{t.second:02d}"
 
+def _heal_indexes(rows) -> None:
+    """누락된 공강 인덱스 채우기: 호출부 트랜잭션과 분리된 별도 세션에서 커밋 (실패해도 요청 바디는 그대로)"""
+    try:
+        with SessionLocal() as heal_db:
+            upsert_indexes(heal_db, rows)
+            heal_db.commit()
+    except Exception:
+        logging.exception("[MEAL_INDEX] failed to store missing index rows")
+
 def build_meal_last_end_request_body(
     db,
     df_candidates: pd.DataFrame,
@@ -105,23 +167,44 @@ def build_meal_last_end_request_body(
     if df_candidates.empty:
         return []
 
-    df_local = normalize_user_id(df_candidates)          # ← 추가
-    user_ids = df_local["user_id"].astype(int).tolist()  # ← 보장된 컬럼 사용
+    df_local = normalize_user_id(df_candidates, copy=False)  # 읽기 전용
+    user_ids = df_local["user_id"].tolist()
 
-    week_slots = fetch_allweek_slots_for_users(db, user_ids)
+    # 1) 공강 인덱스로 O(log) 조회 (empty_is=0 규약일 때만)
+    indexes = fetch_indexes_for_users(db, user_ids) if empty_is == 0 else {}
+    anchors: Dict[int, tuple] = {
+        uid: query_meal_anchor(indexes[uid], ref_time=ref_time,
+                               need_min=need_min, lookahead_min=lookahead_min)
+        for uid in user_ids if uid in indexes
+    }
+
+    # 2) 인덱스가 없는 사용자만 비트에서 직접 계산하고, 인덱스를 채워둔다
+    missing = [uid for uid in user_ids if uid not in anchors]
+    if missing:
+        week_slots = fetch_allweek_slots_for_users(db, missing)
+        heal_rows = []
+        for uid in missing:
+            bits_week = week_slots.get(uid)
+            if not bits_week:
+                continue
+            anchors[uid] = meal_anchor_or_last_end_allweek(
+                bits_week,
+                ref_time=ref_time,
+                need_min=need_min,
+                lookahead_min=lookahead_min,
+                empty_is=empty_is,
+            )
+            if empty_is == 0:
+                runs, all_free = build_free_runs(np.asarray(bits_week, dtype=bool).reshape(-1))
+                heal_rows.append((uid, runs, all_free))
+        if heal_rows:
+            _heal_indexes(heal_rows)
 
     payload: List[Dict] = []
     for uid in user_ids:
-        bits_week = week_slots.get(uid)
-        if not bits_week:
+        if uid not in anchors:
             continue
-        dow, t = meal_anchor_or_last_end_allweek(
-            bits_week,
-            ref_time=ref_time,
-            need_min=need_min,
-            lookahead_min=lookahead_min,
-            empty_is=empty_is,
-        )
+        dow, t = anchors[uid]
         if dow == -1:
             continue
         payload.append({
@@ -156,6 +239,13 @@ def post_users_locations(
         empty_is=empty_is,
     )
 
+    return post_locations_payload(payload, timeout_sec=timeout_sec)
+
+def post_locations_payload(payload: List[Dict], timeout_sec: int = 10) -> List[Dict]:
+    """
+    build_meal_last_end_request_body 결과(미리 계산해 둔 look-ahead 바디 포함)를
+    BACKEND_API_BASE로 POST하고 사용자 위치 리스트를 반환
+    """
     if not payload:
         return []  # 호출부에서 빈 df 처리
 
@@ -163,7 +253,7 @@ def post_users_locations(
     url = f"{settings.BACKEND_API_BASE}/api/timetable/users/locations"
     resp = requests.post(url, json=payload, timeout=timeout_sec)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
 
     # 3) 간단한 형태 검증
     if not isinstance(data, list):
@@ -191,16 +281,16 @@ def fetch_user_preferences(user_ids: List[int], timeout_sec: int = 10) -> pd.Dat
 
     resp = requests.post(url, json=payload, timeout=timeout_sec)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
 
-    records: List[Dict] = []
-    for item in data:
-        uid = int(item["userId"])
-        prefs = item.get("preferences", {})
-        record = {"user_id": uid}
-        for k_src, k_dst in PREF_KEY_MAP.items():
-            record[k_dst] = float(prefs.get(k_src, 0.0))
-        records.append(record)
-
-    df = pd.DataFrame(records)
-    return df
\ No newline at end of file
+    # 컬럼별 배열로 바로 생성 (행 dict 리스트를 거치지 않음): user_id int64, 선호도 float32
+    n = len(data)
+    cols: Dict[str, np.ndarray] = {
+        "user_id": np.fromiter((int(item["userId"]) for item in data), dtype=np.int64, count=n),
+    }
+    for k_src, k_dst in PREF_KEY_MAP.items():
+        cols[k_dst] = np.fromiter(
+            (float((item.get("preferences") or {}).get(k_src, 0.0)) for item in data),
+            dtype=np.float32, count=n,
+        )
+    return pd.DataFrame(cols)
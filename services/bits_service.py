@@ -1,7 +1,13 @@
 from typing import List, Dict
-from services.timetable_bits import SLOTS_PER_DAY, SLOT_MIN, to_nine_ints
+import numpy as np
+from services.timetable_bits import SLOTS_PER_DAY, SLOT_MIN, DAYS, to_nine_ints
 
 def intervals_to_nine_ints(intervals: List[Dict[str, int]]) -> List[int]:
+    """
+    한 (사용자, 요일)의 구간 목록 → 9개 정수 (스칼라 기준 구현).
+    운영 경로는 intervals_to_nine_ints_bulk를 쓰고, 이 함수는 슬롯 경계 규약의 기준으로 남겨
+    tests/test_bits_service.py에서 벌크 결과와 비트 단위로 비교한다.
+    """
     bits = [0] * SLOTS_PER_DAY
     for iv in intervals:
         s = max(0, min(SLOTS_PER_DAY, iv["start_min"] // SLOT_MIN))
@@ -11,3 +17,41 @@ def intervals_to_nine_ints(intervals: List[Dict[str, int]]) -> List[int]:
         for i in range(s, e):
             bits[i] = 1
     return to_nine_ints(bits)
+
+def intervals_to_busy_bulk(user_idx, dow, start_min, end_min, n_users: int) -> np.ndarray:
+    """
+    평탄화된 구간 배열 → (n_users, 7, 288) bool (True=수업)
+    - user_idx: 0..n_users-1 행 번호, dow: 0..6, start_min/end_min: 분 단위 [start, end)
+    - 슬롯 경계는 intervals_to_nine_ints와 동일(start floor, end ceil, 0..288 clamp)
+    - 행(user,dow)마다 차분 배열(+1 at s, -1 at e)을 누적합해서 겹치는 구간도 한 번에 처리
+    """
+    user_idx = np.asarray(user_idx, dtype=np.int64)
+    dow = np.asarray(dow, dtype=np.int64)
+    s = np.clip(np.asarray(start_min, dtype=np.int64) // SLOT_MIN, 0, SLOTS_PER_DAY)
+    e = np.clip((np.asarray(end_min, dtype=np.int64) + SLOT_MIN - 1) // SLOT_MIN, 0, SLOTS_PER_DAY)
+
+    ok = (e > s) & (dow >= 0) & (dow < DAYS) & (user_idx >= 0) & (user_idx < n_users)
+    row = (user_idx[ok] * DAYS + dow[ok]) * (SLOTS_PER_DAY + 1)
+
+    width = SLOTS_PER_DAY + 1  # e == 288 자리까지
+    size = n_users * DAYS * width
+    diff = np.zeros(size, dtype=np.int16)
+    np.add.at(diff, row + s[ok], 1)
+    np.add.at(diff, row + e[ok], -1)
+    diff = diff.reshape(n_users * DAYS, width)
+    busy = np.cumsum(diff[:, :SLOTS_PER_DAY], axis=1, dtype=np.int16) > 0
+    return busy.reshape(n_users, DAYS, SLOTS_PER_DAY)
+
+def pack_nine_ints_bulk(busy: np.ndarray) -> np.ndarray:
+    """(..., 288) bool → (..., 9) uint32 (LSB=낮은 index 슬롯, to_nine_ints와 동일 규약)"""
+    packed = np.packbits(busy, axis=-1, bitorder="little")  # (..., 36) uint8
+    return np.ascontiguousarray(packed).view("<u4").astype(np.uint32)
+
+def intervals_to_nine_ints_bulk(user_idx, dow, start_min, end_min, n_users: int, return_busy: bool = False):
+    """
+    평탄화된 구간 배열 → (n_users, 7, 9) uint32
+    return_busy=True: ((n_users, 7, 9), (n_users, 7, 288) bool) — 공강 인덱스처럼 비트맵도 필요한 호출자용
+    """
+    busy = intervals_to_busy_bulk(user_idx, dow, start_min, end_min, n_users)
+    nine = pack_nine_ints_bulk(busy)
+    return (nine, busy) if return_busy else nine
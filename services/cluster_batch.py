@@ -1,13 +1,28 @@
 from typing import Optional
+from dataclasses import asdict
+from datetime import datetime
+import json
+import time
+import os
+import tempfile
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from core.db import SessionLocal
-from services.backend_client import fetch_user_preferences, post_users_locations
+from services.backend_client import fetch_user_preferences, post_users_locations, post_locations_payload
 from services.data_util import normalize_user_id
-from services.snapshot_service import create_draft_run, warmup_to_redis, activate_run, fetch_cluster_rows
-from services.cluster_job import ClusterParams, run_clustering, to_cluster_member_rows, compute_k
+from services.snapshot_service import create_draft_run, warmup_to_redis, activate_run, fetch_cluster_rows, summarize_run, save_run_summary
+from services.snapshot_service import active_run_fingerprint, mark_run_reused
+from services.cluster_job import ClusterParams, run_clustering, to_cluster_member_columns, compute_k, input_fingerprint
+from services.cluster_job import FeatureScaler, fit_feature_scaler, preference_columns
+from core.redis_client import get_redis
 from services.timetable_service import anchor_to_10min_kst
+from services.snapshot_store import export_run_snapshot_safe
+from services.neighbor_index import build_neighbor_index_safe
+from services.spatial_index import build_spatial_index_safe
+from services.stream_assign import save_assignment_model
+from services.lookahead import load_staged
 from typing import List, Dict
 from core.config import settings
 import requests
@@ -37,12 +52,79 @@ def fetch_candidates() -> pd.DataFrame:
     
     return df
 
-def bulk_insert_cluster_member(db: Session, rows):
-    db.execute(text("""
-        INSERT INTO cluster_member (run_id, cluster_seq, user_id, rank_in_cluster, distance_to_center)
-        VALUES (:run_id, :cluster_seq, :user_id, :rank_in_cluster, :distance_to_center)
-    """), rows)
-    db.commit()
+_INSERT_CM_SQL = text("""
+    INSERT INTO cluster_member (run_id, cluster_seq, user_id, rank_in_cluster, distance_to_center)
+    VALUES (:run_id, :cluster_seq, :user_id, :rank_in_cluster, :distance_to_center)
+""")
+
+def _iter_chunks(cols: Dict[str, np.ndarray], chunk_rows: int):
+    n = len(cols["user_id"])
+    step = max(1, int(chunk_rows))
+    for i in range(0, n, step):
+        yield (cols["cluster_seq"][i:i + step].tolist(), cols["user_id"][i:i + step].tolist(),
+               cols["rank_in_cluster"][i:i + step].tolist(), cols["distance_to_center"][i:i + step].tolist())
+
+def _insert_chunks_batch(db: Session, run_id: int, cols: Dict[str, np.ndarray], chunk_rows: int) -> None:
+    # executemany → PyMySQL이 multi-row INSERT로 재작성. 청크마다 커밋해 트랜잭션/언두 크기를 제한
+    for cseq, uid, rank, dist in _iter_chunks(cols, chunk_rows):
+        db.execute(_INSERT_CM_SQL, [
+            {"run_id": run_id, "cluster_seq": c, "user_id": u, "rank_in_cluster": r, "distance_to_center": d}
+            for c, u, r, d in zip(cseq, uid, rank, dist)
+        ])
+        db.commit()
+
+def _insert_chunks_infile(db: Session, run_id: int, cols: Dict[str, np.ndarray], chunk_rows: int) -> None:
+    # PyMySQL은 LOCAL INFILE을 파일 경로로만 받으므로, 청크별 CSV를 임시 파일로 흘려 쓴다
+    for cseq, uid, rank, dist in _iter_chunks(cols, chunk_rows):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as f:
+            path = f.name
+            for c, u, r, d in zip(cseq, uid, rank, dist):
+                f.write(f"{run_id},{c},{u},{r},{d!r}\n")
+        try:
+            db.execute(text("""
+                LOAD DATA LOCAL INFILE :path
+                INTO TABLE cluster_member
+                FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n'
+                (run_id, cluster_seq, user_id, rank_in_cluster, distance_to_center)
+            """), {"path": path})
+            db.commit()
+        finally:
+            os.unlink(path)
+
+def bulk_insert_cluster_member(db: Session, run_id: int, cols: Dict[str, np.ndarray],
+                               mode: Optional[str] = None, chunk_rows: Optional[int] = None) -> None:
+    """
+    to_cluster_member_columns 결과를 청크 단위로 적재.
+    mode: 'batch'(기본, multi-row INSERT) | 'infile'(LOAD DATA LOCAL INFILE, 서버 local_infile=ON 필요)
+    """
+    mode = mode or settings.CM_INSERT_MODE
+    chunk_rows = chunk_rows or settings.CM_INSERT_CHUNK
+    if mode not in ("infile", "batch"):
+        raise ValueError(f"unknown CM_INSERT_MODE: {mode}")
+    try:
+        if mode == "infile":
+            _insert_chunks_infile(db, run_id, cols, chunk_rows)
+        else:
+            _insert_chunks_batch(db, run_id, cols, chunk_rows)
+    except Exception:
+        # 청크마다 커밋하므로 중간에 실패하면 앞 청크가 남는다 → 지우고 run을 failed로 (원래 예외는 그대로 전달)
+        _discard_partial_run(db, run_id)
+        raise
+
+def _discard_partial_run(db: Session, run_id: int) -> None:
+    try:
+        db.rollback()
+        while True:
+            res = db.execute(text("DELETE FROM cluster_member WHERE run_id = :rid LIMIT 10000"), {"rid": run_id})
+            db.commit()
+            if res.rowcount == 0:
+                break
+        db.execute(text("UPDATE run SET status='failed' WHERE run_id = :rid AND status = 'draft'"), {"rid": run_id})
+        db.commit()
+        logging.warning(f"[CYCLE] cluster_member insert failed: discarded partial rows, run={run_id} failed")
+    except Exception:
+        db.rollback()
+        logging.exception(f"[CYCLE] cleanup of partial run {run_id} failed")
 
 def enrich_df_with_locations(df_candidates: pd.DataFrame, locations: List[Dict]) -> pd.DataFrame:
     """
@@ -55,25 +137,65 @@ def enrich_df_with_locations(df_candidates: pd.DataFrame, locations: List[Dict])
         if "latitude" not in cols: cols.append("latitude")
         return pd.DataFrame(columns=cols)
 
-    df_candidates = normalize_user_id(df_candidates)  # ← 보장
-    loc_df = pd.DataFrame(locations).rename(columns={"userId": "user_id"})
-    # 혹시 응답이 숫자 문자열이면 안전 캐스팅
-    loc_df["user_id"] = loc_df["user_id"].astype(int)
+    df_candidates = normalize_user_id(df_candidates, copy=False)  # 이미 int64면 복사 없음
+    # 응답 dict 리스트 → 컬럼 배열 (숫자 문자열이어도 int/float 캐스팅)
+    n = len(locations)
+    loc_df = pd.DataFrame({
+        "user_id": np.fromiter((int(x["userId"]) for x in locations), dtype=np.int64, count=n),
+        "longitude": np.fromiter((float(x["longitude"]) for x in locations), dtype=np.float64, count=n),
+        "latitude": np.fromiter((float(x["latitude"]) for x in locations), dtype=np.float64, count=n),
+    })
 
     merged = df_candidates.merge(loc_df, on="user_id", how="inner")
     return merged
 
-def run_full_cycle(campus_id: int, algo: str = "kmeans-v1", note: Optional[str] = None):
+def campus_feature_scaler(campus_id: int, df: pd.DataFrame) -> FeatureScaler:
+    """
+    캠퍼스별 FeatureScaler를 Redis(scaler:campus:{cid})에 두고 사이클 간 재사용.
+    FEATURE_SCALER_REFIT_HOURS가 지났거나 선호도 컬럼이 바뀌면 현재 후보로 다시 적합.
+    """
+    key = f"scaler:campus:{campus_id}"
+    r = get_redis()
+    raw = r.get(key)
+    if raw:
+        try:
+            cached = FeatureScaler(**json.loads(raw))
+            fresh = time.time() - cached.fitted_at < settings.FEATURE_SCALER_REFIT_HOURS * 3600
+            if fresh and cached.pref_cols == preference_columns(df):
+                return cached
+        except (TypeError, ValueError):
+            logging.warning(f"[SCALER] invalid cached scaler for campus {campus_id}; refitting")
+    scaler = fit_feature_scaler(df)
+    r.set(key, json.dumps(asdict(scaler)))
+    logging.info(f"[SCALER] refit campus={campus_id} n={scaler.n_fit} loc_scale={scaler.loc_scale:.3f}km")
+    return scaler
+
+def run_full_cycle(campus_id: int, algo: str = "kmeans-v1", note: Optional[str] = None,
+                   ref_time: Optional[datetime] = None, fence_token: Optional[int] = None):
+    """
+    ref_time: 사이클 앵커 (None이면 지금 기준 10분 틱)
+    fence_token: 리더 락 펜싱 토큰 (services.cycle_lock). 더 큰 토큰이 이미 활성화했으면 StaleFenceError
+    """
     db = SessionLocal()
     try:
-        # 1) 후보 로드
-        df = fetch_candidates()
-        df = normalize_user_id(df)
-
         # ✨ 앵커 시간: '정각 기준 10분'으로
-        ref_time = anchor_to_10min_kst()
+        if ref_time is None:
+            ref_time = anchor_to_10min_kst()
 
-        locations = post_users_locations(db, df, ref_time)
+        # 1) 후보 로드 + 공강 기준 위치 요청 바디: look-ahead로 미리 계산돼 있으면 그대로 사용
+        staged = None
+        if settings.LOOKAHEAD_ANCHORS > 0:
+            try:
+                staged = load_staged(db, campus_id, ref_time)
+            except Exception:
+                logging.exception("[LOOKAHEAD] load failed; computing inputs in-cycle")
+        if staged is not None:
+            df, payload = staged
+            locations = post_locations_payload(payload)
+        else:
+            df = fetch_candidates()
+            df = normalize_user_id(df, copy=False)
+            locations = post_users_locations(db, df, ref_time)
 
         # ⑤ 위치를 df에 붙여: (user_id, longitude, latitude, 선호도 feature들)
         df = enrich_df_with_locations(df, locations)
@@ -83,6 +205,8 @@ def run_full_cycle(campus_id: int, algo: str = "kmeans-v1", note: Optional[str]
 
         # 2) 파라미터 기록
         params = ClusterParams(min_group_size=3, w_time=1.0, w_loc=0.5, w_pref=1.5, downsample=6)
+        if settings.FEATURE_SCALER:
+            params.scaler = campus_feature_scaler(campus_id, df)
         param_json = {
             "note": note,
             "min_group_size": params.min_group_size,
@@ -90,9 +214,21 @@ def run_full_cycle(campus_id: int, algo: str = "kmeans-v1", note: Optional[str]
             "w_loc": params.w_loc,
             "w_pref": params.w_pref,
             "downsample": params.downsample,
-            "cycle_anchor": ref_time.isoformat()
+            "cycle_anchor": ref_time.isoformat(),
+            "scaler": asdict(params.scaler) if params.scaler is not None else None,
         }
 
+        # 2.5) 입력이 활성 run과 같으면 재클러스터링/적재/워밍업 생략 → 활성 run 재사용
+        fingerprint = input_fingerprint(df, params, algo)
+        param_json["input_fingerprint"] = fingerprint
+        if settings.CYCLE_REUSE_UNCHANGED:
+            active_id, active_fp = active_run_fingerprint(db, campus_id)
+            if (active_id is not None and active_fp == fingerprint
+                    and get_redis().get(f"active:campus:{campus_id}") == f"run:{active_id}"):
+                mark_run_reused(db, active_id, ref_time.isoformat())
+                logging.info(f"[CYCLE] inputs unchanged → reuse run={active_id} ({fingerprint[:12]})")
+                return active_id
+
         run_id = create_draft_run(db, campus_id, algo, param_json)
 
         # 3.5) k 계산·기록·전달
@@ -108,15 +244,26 @@ def run_full_cycle(campus_id: int, algo: str = "kmeans-v1", note: Optional[str]
         params.force_k = int(k)
 
         # 4) 클러스터링
-        labels, dists, _X = run_clustering(df, params)
-        rows = to_cluster_member_rows(run_id, df, labels, dists)
+        labels, dists, X = run_clustering(df, params)
+        cols = to_cluster_member_columns(df["user_id"].to_numpy(), labels, dists)
+
+        if settings.SNAPSHOT_EXPORT:
+            export_run_snapshot_safe(run_id, campus_id, df, X, labels, dists, params,
+                                     extra_meta={"cycle_anchor": ref_time.isoformat(), "algo": algo})
+        # 활성화 전에 이웃 인덱스를 만들어 둬야 API가 활성 run의 인덱스를 항상 찾는다
+        build_neighbor_index_safe(run_id, df["user_id"].to_numpy(), X)
+        build_spatial_index_safe(run_id, df["user_id"].to_numpy(),
+                                 df["latitude"].to_numpy(), df["longitude"].to_numpy())
+        # 증분 배정용 중심 저장 (활성화 전)
+        save_assignment_model(run_id, labels, params, list(df.columns))
 
         # 5) 적재
-        bulk_insert_cluster_member(db, rows)
+        bulk_insert_cluster_member(db, run_id, cols)
+        save_run_summary(db, summarize_run(run_id, cols, params.reassigned))
 
         # 6) Redis 워밍업 + 활성화
         warmup_to_redis(run_id, fetch_cluster_rows(db, run_id))
-        activate_run(db, campus_id, run_id)
+        activate_run(db, campus_id, run_id, fence_token=fence_token)
 
         return run_id
     finally:
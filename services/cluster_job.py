@@ -1,12 +1,13 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 from sklearn.cluster import MiniBatchKMeans
-from sklearn.preprocessing import StandardScaler
+import hashlib
 import math
 import logging
+from services.spatial_index import project_local_km
 
 def compute_k(n: int, min_group_size: int, k_min: int = 2, k_max: int | None = None) -> int:
     if n <= 0:
@@ -34,6 +35,22 @@ def slots_to_vec(slots: List[int], downsample: int = 6) -> np.ndarray:
         raise ValueError(f"slots length invalid: {len(x)}")
     return x.reshape(-1, downsample).mean(axis=1).astype(np.float32)
 
+@dataclass
+class FeatureScaler:
+    """
+    캠퍼스별 특징 표준화 파라미터 (사이클 간 재사용, JSON 직렬화 가능).
+      위치  : 원점 기준 km 평면 좌표 / loc_scale (점들의 RMS 반경, 등방성 → 거리 비율 보존)
+      선호도: 행 정규화 비율의 컬럼별 (x - mean) / std
+    """
+    lat0: float = 0.0
+    lon0: float = 0.0
+    loc_scale: float = 1.0
+    pref_cols: List[str] = field(default_factory=list)
+    pref_mean: List[float] = field(default_factory=list)
+    pref_std: List[float] = field(default_factory=list)
+    fitted_at: float = 0.0
+    n_fit: int = 0
+
 @dataclass
 class ClusterParams:
     min_group_size: int = 3
@@ -42,11 +59,44 @@ class ClusterParams:
     w_pref: float = 1.5
     downsample: int = 6
     computed_k: int = 0
+    reassigned: int = 0        # 작은 군집에서 큰 군집으로 재배정된 포인트 수 (run_clustering이 채움)
+    centers: Optional[np.ndarray] = field(default=None, repr=False)  # KMeans 중심 (k,D), run_clustering이 채움
     random_state: int = 42
     n_init: int = 10
     force_k: Optional[int] = None
+    scaler: Optional[FeatureScaler] = None  # None이면 기존(원시 위경도) 특징
+
+def _location_columns(df) -> Optional[List[str]]:
+    """(위도, 경도) 컬럼명. 하위호환: lat/lng. 위치가 전혀 없으면 None"""
+    if all(c in df.columns for c in ("latitude", "longitude")):
+        return ["latitude", "longitude"]
+    if all(c in df.columns for c in ("lat", "lng")):
+        return ["lat", "lng"]
+    return None
+
+def _preference_sources(df, loc_cols: Optional[List[str]]) -> Dict[str, pd.Series]:
+    """선호도 컬럼 → 수치 Series. 스키마(dtype)로 한 번에 결정하고 object 컬럼만 숫자 변환 가능 여부를 확인"""
+    exclude = {"user_id", "latitude", "longitude"} | set(loc_cols or ())
+    out: Dict[str, pd.Series] = {}
+    for c in df.columns:
+        if c in exclude:
+            continue
+        col = df[c]
+        if pd.api.types.is_numeric_dtype(col.dtype):
+            out[c] = col
+        else:
+            conv = pd.to_numeric(col, errors="coerce")
+            if conv.isna().sum() > col.isna().sum():
+                continue  # 숫자로 변환 안 되면 선호도에서 제외
+            out[c] = conv
+    return out
 
-def build_feature_matrix(candidates_df, w_loc: float = 1.0, w_pref: float = 1.0):
+def preference_columns(df) -> List[str]:
+    """build_feature_matrix가 선호도로 쓸 컬럼 목록"""
+    return list(_preference_sources(df, _location_columns(df)))
+
+def build_feature_matrix(candidates_df, w_loc: float = 1.0, w_pref: float = 1.0,
+                         scaler: Optional[FeatureScaler] = None):
     """
     새 규칙:
       - 위치: 우선 'latitude','longitude' 사용.
@@ -54,63 +104,85 @@ def build_feature_matrix(candidates_df, w_loc: float = 1.0, w_pref: float = 1.0)
       - 선호도: 'user_id','latitude','longitude'를 제외한 나머지 수치형 컬럼 전체.
                (cat_ 프리픽스 의존성 제거)
       - 선호도는 각 행의 합이 1이 되도록 정규화(합이 0이면 균등분포).
+      - scaler가 있으면 위치는 국지 km 좌표 / loc_scale, 선호도는 컬럼별 표준화 (w_loc/w_pref가 같은 척도)
     반환:
-      X: [w_loc*lat, w_loc*lng, w_pref*pref...]로 이어붙인 행렬 (N x (2 + #pref))
+      X: [w_loc*lat, w_loc*lng, w_pref*pref...]로 이어붙인 float32 행렬 (N x (2 + #pref))
       pref_cols: 선호도에 사용된 컬럼 목록(학습/로깅용)
     """
-    df = candidates_df.copy()
-
-    # 1) 위치 컬럼 확보
-    has_latlon = all(c in df.columns for c in ("latitude", "longitude"))
-    has_legacy = all(c in df.columns for c in ("lat", "lng"))
-    if not has_latlon and has_legacy:
-        # 하위호환 매핑
-        df = df.rename(columns={"lat": "latitude", "lng": "longitude"})
-        has_latlon = True
-
-    loc = None
-    if has_latlon:
-        # 수치 변환 및 NaN 방지
-        loc = df[["latitude", "longitude"]].astype(float).to_numpy()
+    df = candidates_df  # 읽기 전용: 복사/컬럼 재할당 없이 필요한 열만 꺼낸다
+    n = len(df)
+
+    # 1) 위치 컬럼 확보 (하위호환: lat/lng), 위치가 전혀 없으면 0벡터(차원 유지)
+    loc_cols = _location_columns(df)
+
+    # 2) 선호도 컬럼
+    pref_src = _preference_sources(df, loc_cols)
+    pref_cols = list(pref_src)
+    if scaler is not None and scaler.pref_cols != pref_cols:
+        raise ValueError(f"scaler pref_cols {scaler.pref_cols} != input {pref_cols}")
+
+    # 3) 결과 행렬을 float32로 한 번만 할당하고 제자리에서 채운다
+    p = len(pref_cols)
+    X = np.empty((n, 2 + p), dtype=np.float32)
+    if not loc_cols:
+        X[:, :2] = 0.0
+    elif scaler is None:
+        for j, c in enumerate(loc_cols):
+            X[:, j] = df[c].to_numpy(dtype=np.float64, copy=False)
     else:
-        # 위치가 전혀 없으면 0벡터로 대체(차원 유지가 필요없다면 None로 두고 제외 가능)
-        loc = np.zeros((len(df), 2), dtype=float)
-
-    # 2) 선호도 컬럼: user_id/latitude/longitude 제외한 수치형
-    exclude = {"user_id", "latitude", "longitude"}
-    numeric_cols = [c for c in df.columns if c not in exclude]
-    # 수치형만 추려내기 (문자형 섞인 경우를 대비)
-    pref_candidates = []
-    for c in numeric_cols:
-        try:
-            df[c] = df[c].astype(float)
-            pref_candidates.append(c)
-        except Exception:
-            # 숫자로 변환 안 되면 선호도에서 제외
-            continue
+        north, east = project_local_km(df[loc_cols[0]].to_numpy(dtype=np.float64, copy=False),
+                                       df[loc_cols[1]].to_numpy(dtype=np.float64, copy=False),
+                                       scaler.lat0, scaler.lon0)
+        X[:, 0] = north
+        X[:, 1] = east
+        X[:, :2] /= scaler.loc_scale
+    X[:, :2] *= w_loc
 
-    pref_cols = pref_candidates
-    if pref_cols:
-        pref = df[pref_cols].to_numpy(dtype=float)
-        # 3) 행 정규화(합=1), 합이 0이면 균등분포
+    if p:
+        pref = X[:, 2:]
+        for j, c in enumerate(pref_cols):
+            pref[:, j] = pref_src[c].to_numpy(dtype=np.float32, copy=False)
+        # 행 정규화(합=1), 합이 0이면 균등분포
         row_sums = pref.sum(axis=1, keepdims=True)
-        zeros = (row_sums == 0.0)
+        zeros = (row_sums == 0.0).ravel()
         row_sums[zeros] = 1.0
-        pref = pref / row_sums
+        pref /= row_sums
         if zeros.any():
-            # 균등 분포 대치
-            k = pref.shape[1]
-            pref[zeros.ravel(), :] = 1.0 / k
-    else:
-        # 선호도 컬럼이 전혀 없다면 0차원으로 둠
-        pref = np.empty((len(df), 0), dtype=float)
-
-    # 4) 가중치 적용 및 결합
-    X_loc = w_loc * loc
-    X_pref = w_pref * pref
-    X = np.hstack([X_loc, X_pref])
+            pref[zeros, :] = 1.0 / p
+        if scaler is not None:
+            pref -= np.asarray(scaler.pref_mean, dtype=np.float32)
+            pref /= np.asarray(scaler.pref_std, dtype=np.float32)
+        pref *= w_pref
     return X, pref_cols
 
+def fit_feature_scaler(candidates_df) -> FeatureScaler:
+    """현재 후보로 FeatureScaler 적합 (원점 = 위치 평균, loc_scale = RMS 반경 km)"""
+    import time
+
+    df = candidates_df
+    X, pref_cols = build_feature_matrix(df)  # 선호도 비율(행 정규화)만 사용
+    scaler = FeatureScaler(pref_cols=list(pref_cols), fitted_at=time.time(), n_fit=len(df))
+
+    loc_cols = _location_columns(df)
+    if loc_cols and len(df):
+        lat = df[loc_cols[0]].to_numpy(dtype=np.float64, copy=False)
+        lon = df[loc_cols[1]].to_numpy(dtype=np.float64, copy=False)
+        scaler.lat0, scaler.lon0 = float(np.nanmean(lat)), float(np.nanmean(lon))
+        north, east = project_local_km(lat, lon, scaler.lat0, scaler.lon0)
+        rms = float(np.sqrt(np.nanmean(north * north + east * east)))
+        scaler.loc_scale = rms if rms > 1e-3 else 1.0  # 1m 미만 퍼짐 → 척도 없음
+
+    if pref_cols and len(df):
+        pref = X[:, 2:].astype(np.float64)
+        std = pref.std(axis=0)
+        std[std < 1e-6] = 1.0  # 상수 컬럼은 평행이동만
+        scaler.pref_mean = pref.mean(axis=0).tolist()
+        scaler.pref_std = std.tolist()
+    else:
+        scaler.pref_mean = [0.0] * len(pref_cols)
+        scaler.pref_std = [1.0] * len(pref_cols)
+    return scaler
+
 
 # def choose_k(n: int, params: ClusterParams) -> int:
 #     k = max(1, round(n / max(1, params.min_group_size)))
@@ -125,12 +197,13 @@ def run_clustering(df: pd.DataFrame, params: ClusterParams) -> Tuple[np.ndarray,
       dists:  (N,) 최종 중심거리
       X:      (N,D) 표준화 특징 (사후 재배정용)
     """
-    X, _ = build_feature_matrix(df, params.w_loc, params.w_pref)
+    X, _ = build_feature_matrix(df, params.w_loc, params.w_pref, scaler=params.scaler)
     n = len(df)
 
     min_group_size = int(getattr(params, "min_group_size", 6))
     k = int(getattr(params, "force_k", 0)) or compute_k(n, min_group_size, k_min=2, k_max=None)
     params.computed_k = int(k)
+    params.reassigned = 0
 
     feat_var = np.var(X, axis=0)
     logging.info(f"[CLUSTER] Using k={k}, n={n}, var(min={feat_var.min():.6f}, max={feat_var.max():.6f}, mean={feat_var.mean():.6f})")
@@ -147,6 +220,7 @@ def run_clustering(df: pd.DataFrame, params: ClusterParams) -> Tuple[np.ndarray,
     logging.info(f"[CLUSTER] Using k={k}, n={n}")
     raw_labels = kmeans.fit_predict(X)     # 0..k-1
     centers = kmeans.cluster_centers_
+    params.centers = centers
     dists = np.linalg.norm(X - centers[raw_labels], axis=1)
 
     if k >= 2 and len(set(raw_labels)) == 1:
@@ -186,6 +260,7 @@ def run_clustering(df: pd.DataFrame, params: ClusterParams) -> Tuple[np.ndarray,
             dd = np.linalg.norm(subX[:, None, :] - big_centers[None, :, :], axis=2)
             nearest_big = dd.argmin(axis=1)
             mapped_label = [big_list[j] for j in nearest_big]
+            params.reassigned += len(idxs)
             for p, new_lab in zip(idxs, mapped_label):
                 labels[p] = new_lab
                 # 거리 갱신
@@ -195,22 +270,67 @@ def run_clustering(df: pd.DataFrame, params: ClusterParams) -> Tuple[np.ndarray,
     labels = labels + 1
     return labels, dists, X
 
-def to_cluster_member_rows(run_id: int, df, labels, dists):
-    unique = sorted(set(labels))
-    label_to_seq = {lab: i+1 for i, lab in enumerate(unique)}  # 1..K
-
-    rows = []
-    # rank_in_cluster는 거리 오름차순으로 1..M
-    for lab in unique:
-        idxs = [i for i, L in enumerate(labels) if L == lab]
-        idxs_sorted = sorted(idxs, key=lambda i: float(dists[i]))
-        for rank, i in enumerate(idxs_sorted, start=1):
-            rows.append({
-                "run_id": run_id,
-                "cluster_seq": label_to_seq[lab],
-                "user_id": int(df.iloc[i]["user_id"]),
-                "rank_in_cluster": rank,
-                "distance_to_center": float(dists[i]),
-            })
-    return rows
+# 입력 지문에서 제외: run_clustering이 채우는 결과/파생 값
+_FINGERPRINT_SKIP_PARAMS = {"computed_k", "reassigned", "centers", "force_k"}
+# 스케일러는 적합 결과(평균/척도)만 비교 (적합 시각/표본 수 제외)
+_FINGERPRINT_SKIP_SCALER = {"fitted_at", "n_fit"}
+
+def input_fingerprint(df: pd.DataFrame, params: ClusterParams, algo: str = "") -> str:
+    """
+    클러스터링 입력 지문 (blake2b hex). 같은 지문이면 run_clustering 결과도 같다 (random_state 고정).
+      - 후보 id 집합 : user_id 오름차순 int64
+      - 위치/선호도  : 같은 행 순서로 정렬한 각 컬럼의 원시 바이트 (컬럼명 순)
+      - 파라미터/algo: 결과·파생 필드 제외
+    공강(시간표) 상태는 후보 집합과 backend가 돌려준 위치에 이미 반영돼 있다.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    uid = df["user_id"].to_numpy(dtype=np.int64)
+    order = np.argsort(uid, kind="stable")
+    h.update(b"user_id")
+    h.update(np.ascontiguousarray(uid[order]).tobytes())
+    for c in sorted(str(c) for c in df.columns if c != "user_id"):
+        col = df[c].to_numpy()
+        if col.dtype == object:
+            col = col.astype(str)
+        h.update(c.encode())
+        h.update(str(col.dtype).encode())
+        h.update(np.ascontiguousarray(col[order]).tobytes())
+    p = {k: v for k, v in vars(params).items() if k not in _FINGERPRINT_SKIP_PARAMS}
+    if params.scaler is not None:
+        p["scaler"] = sorted((k, v) for k, v in vars(params.scaler).items() if k not in _FINGERPRINT_SKIP_SCALER)
+    h.update(repr(sorted(p.items())).encode())
+    h.update(algo.encode())
+    return h.hexdigest()
+
+def to_cluster_member_columns(user_ids, labels, dists) -> Dict[str, np.ndarray]:
+    """
+    (user_id, label, dist) → cluster_member 컬럼 배열.
+    - cluster_seq: 라벨 오름차순으로 1..K
+    - rank_in_cluster: 클러스터 내 거리 오름차순 1..M (동률은 입력 순서 유지)
+    - 행 순서는 (cluster_seq, rank_in_cluster) → ix_run_cluster_rank 인덱스 순서와 같아 적재가 가볍다
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    labels = np.asarray(labels)
+    dists = np.asarray(dists, dtype=np.float64)
+    n = len(labels)
+    if n == 0:
+        return {
+            "cluster_seq": np.empty(0, dtype=np.int64),
+            "user_id": np.empty(0, dtype=np.int64),
+            "rank_in_cluster": np.empty(0, dtype=np.int64),
+            "distance_to_center": np.empty(0, dtype=np.float64),
+        }
 
+    _, seq0 = np.unique(labels, return_inverse=True)   # 0..K-1
+    seq0 = seq0.reshape(-1)
+    order = np.lexsort((dists, seq0))                  # stable: 동률은 원래 순서
+    seq_sorted = seq0[order]
+    starts = np.flatnonzero(np.r_[True, seq_sorted[1:] != seq_sorted[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes) + 1
+    return {
+        "cluster_seq": seq_sorted.astype(np.int64) + 1,
+        "user_id": user_ids[order],
+        "rank_in_cluster": rank.astype(np.int64),
+        "distance_to_center": dists[order],
+    }
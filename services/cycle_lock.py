@@ -0,0 +1,158 @@
+# services/cycle_lock.py
+"""
+레플리카 간 리더 락 (Redis) + 펜싱 토큰.
+
+모든 uvicorn 워커/파드가 같은 스케줄을 돌리므로, 틱마다 한 프로세스만 실제 작업을 하도록 한다.
+  lock:{name}         SET NX PX (값 = 무작위 토큰). 실행 중 ttl/3 마다 연장
+  fence:{name}        락 획득 시 INCR → 단조 증가 펜싱 토큰
+  cycle:done:campus:{cid}:{앵커 YYYYmmddHHMM}   앵커별 완료 마커 (값 = run_id)
+
+락이 만료된 뒤 늦게 끝난 이전 리더가 새 리더의 결과를 덮지 않도록, 활성화 시
+campus_latest.fence_token보다 작은 토큰은 거부된다 (snapshot_service.activate_run).
+"""
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from core.config import settings
+from core.redis_client import get_redis
+
+# 토큰이 일치할 때만 삭제/연장 (다른 리더의 락을 건드리지 않음)
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+_RENEW_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end
+return 0
+"""
+
+
+class LockNotAcquired(RuntimeError):
+    pass
+
+
+class LeaderLease:
+    def __init__(self, name: str, token: str, fence: int, ttl_ms: int):
+        self.name = name
+        self.token = token
+        self.fence = fence
+        self.ttl_ms = ttl_ms
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew_loop, name=f"lease-{name}", daemon=True)
+
+    @property
+    def key(self) -> str:
+        return f"lock:{self.name}"
+
+    def _renew_loop(self) -> None:
+        r = get_redis()
+        while not self._stop.wait(self.ttl_ms / 3000):
+            try:
+                if not r.eval(_RENEW_LUA, 1, self.key, self.token, self.ttl_ms):
+                    self.lost = True
+                    logging.warning(f"[LOCK] lease lost: {self.name} fence={self.fence}")
+                    return
+            except Exception:
+                logging.exception(f"[LOCK] renew failed: {self.name}")
+
+    def release(self) -> None:
+        self._stop.set()
+        try:
+            get_redis().eval(_RELEASE_LUA, 1, self.key, self.token)
+        except Exception:
+            logging.exception(f"[LOCK] release failed: {self.name}")  # TTL로 자연 만료
+
+
+def acquire(name: str, ttl_ms: Optional[int] = None) -> Optional[LeaderLease]:
+    """락 획득 시 연장 스레드가 도는 LeaderLease, 이미 다른 리더가 있으면 None"""
+    ttl_ms = int(ttl_ms or settings.CYCLE_LOCK_TTL_MS)
+    r = get_redis()
+    token = uuid.uuid4().hex
+    if not r.set(f"lock:{name}", token, nx=True, px=ttl_ms):
+        return None
+    lease = LeaderLease(name, token, int(r.incr(f"fence:{name}")), ttl_ms)
+    lease._thread.start()
+    return lease
+
+
+@contextmanager
+def leader_lock(name: str, ttl_ms: Optional[int] = None) -> Iterator[Optional[LeaderLease]]:
+    """with leader_lock("x") as lease: if lease is None → 다른 레플리카가 실행 중"""
+    lease = acquire(name, ttl_ms)
+    try:
+        yield lease
+    finally:
+        if lease is not None:
+            lease.release()
+
+
+def _done_key(campus_id: int, anchor: datetime) -> str:
+    return f"cycle:done:campus:{campus_id}:{anchor:%Y%m%d%H%M}"
+
+
+def run_cycle_exclusive(campus_id: int, algo: str = "kmeans-v1", note: Optional[str] = None,
+                        skip_if_done: bool = True, profile: Optional[str] = None) -> Dict:
+    """
+    앵커(10분 틱)당 한 레플리카만 run_full_cycle 실행.
+    반환 status: "done" | "already_done"(다른 레플리카가 이미 완료) | "locked"(다른 레플리카 실행 중)
+                | "lost"(실행 중 락 연장 실패 — 완료 마커를 남기지 않아 다음 틱에 다시 실행)
+    skip_if_done=False: 완료 마커를 무시 (관리자 수동 실행)
+    profile: "cprofile" | "sample" 이면 run_full_cycle을 프로파일해 PROFILE_DIR에 남김 (services.cycle_profile)
+    """
+    from services.cluster_batch import run_full_cycle  # 배치 의존성 지연 로드
+    from services.cycle_profile import profile_cycle
+    from services.timetable_service import anchor_to_10min_kst
+
+    anchor = anchor_to_10min_kst()
+    r = get_redis()
+    done_key = _done_key(campus_id, anchor)
+    if skip_if_done and r.exists(done_key):
+        return {"status": "already_done", "anchor": anchor.isoformat(), "run_id": int(r.get(done_key) or 0)}
+
+    with leader_lock(f"cycle:campus:{campus_id}") as lease:
+        if lease is None:
+            return {"status": "locked", "anchor": anchor.isoformat()}
+        # 락 대기 사이 다른 레플리카가 끝냈을 수 있음
+        if skip_if_done and r.exists(done_key):
+            return {"status": "already_done", "anchor": anchor.isoformat(), "run_id": int(r.get(done_key) or 0)}
+
+        with profile_cycle(campus_id, profile) as prof:
+            run_id = run_full_cycle(campus_id, algo=algo, note=note, ref_time=anchor, fence_token=lease.fence)
+            status = "lost" if lease.lost else "done"
+            if prof is not None:
+                prof.run_id, prof.status = run_id, status
+        if status == "lost":
+            # 락이 만료돼 다른 레플리카가 같은 앵커를 돌리고 있을 수 있음 → 완료 마커는 그쪽에 맡긴다
+            logging.warning(f"[CYCLE] lease lost during run: campus={campus_id} run_id={run_id} fence={lease.fence}")
+        else:
+            r.set(done_key, run_id, ex=settings.CYCLE_DONE_TTL_SEC)
+        out = {"status": status, "anchor": anchor.isoformat(), "run_id": run_id, "fence": lease.fence}
+        if prof is not None:
+            out["profile"] = os.path.basename(prof.path) if prof.path else None
+        return out
+
+
+def run_cycle_with_dirty(campus_id: int, algo: str = "kmeans-v1", note: Optional[str] = None,
+                         skip_if_done: bool = True, profile: Optional[str] = None) -> Dict:
+    """
+    오토사이클 한 번: dirty 시간표가 남아 있으면 재계산(리더 락) 후 run_cycle_exclusive.
+    스케줄러 틱 / 관리자 수동 실행 / 배치 워커 잡이 같은 경로를 쓴다.
+    """
+    from sqlalchemy import text
+
+    from core.db import SessionLocal
+    from services.dirty_recompute import recompute_dirty_bits
+
+    with SessionLocal() as db:
+        dirty = db.execute(text("SELECT COUNT(*) FROM timetable_bit WHERE is_dirty=1")).scalar_one()
+    if dirty:
+        with leader_lock("dirty_recompute") as lease:
+            if lease is not None:
+                recompute_dirty_bits()
+    return run_cycle_exclusive(campus_id, algo=algo, note=note, skip_if_done=skip_if_done, profile=profile)
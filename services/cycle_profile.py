@@ -0,0 +1,176 @@
+# services/cycle_profile.py
+"""
+run_full_cycle 함수 단위 프로파일 (opt-in).
+
+사이클 한 번을 프로파일러로 감싸 run별 디렉터리에 남긴다.
+  {PROFILE_DIR}/run_{run_id}_{시각}/          (사이클이 예외로 끝나면 failed_{시각}/)
+    cycle.pstats      mode=cprofile : cProfile 결과 (python -m pstats, snakeviz)
+    cycle.txt         mode=cprofile : 누적 시간 상위 함수 요약
+    cycle.collapsed   mode=sample   : 스택 샘플 collapsed 포맷 (flamegraph.pl, speedscope, py-spy raw 호환)
+    meta.json         campus_id, mode, run_id, status, elapsed_sec ...
+
+cprofile은 모든 호출을 계측하므로 사이클이 느려진다(수십 %). sample은 CYCLE_PROFILE_SAMPLE_MS 간격으로
+사이클 스레드의 스택만 떠서 부하가 작지만 짧은 함수는 잘 안 보인다.
+오래된 디렉터리는 PROFILE_KEEP 개만 남기고 지운다.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from core.config import settings
+
+MODES = ("cprofile", "sample")
+
+
+class _StackSampler(threading.Thread):
+    """대상 스레드의 파이썬 스택을 주기적으로 떠서 collapsed 스택별 횟수를 센다"""
+
+    def __init__(self, thread_id: int, interval_sec: float):
+        super().__init__(name="cycle-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval_sec = interval_sec
+        self.counts: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_sec):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class CycleProfile:
+    """profile_cycle()이 넘겨주는 핸들: 호출자가 run_id를 채우면 디렉터리 이름에 쓰인다"""
+
+    def __init__(self, campus_id: int, mode: str):
+        self.campus_id = campus_id
+        self.mode = mode
+        self.run_id: Optional[int] = None
+        self.status = "failed"
+        self.path: Optional[str] = None
+
+
+def _write(prof: CycleProfile, started: datetime, elapsed: float, profiler, sampler) -> str:
+    stamp = started.strftime("%Y%m%d%H%M%S")
+    name = f"run_{prof.run_id}_{stamp}" if prof.run_id is not None else f"failed_{stamp}"
+    d = os.path.join(settings.PROFILE_DIR, name)
+    os.makedirs(d, exist_ok=True)
+
+    if profiler is not None:
+        profiler.dump_stats(os.path.join(d, "cycle.pstats"))
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(60)
+        with open(os.path.join(d, "cycle.txt"), "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+    if sampler is not None:
+        with open(os.path.join(d, "cycle.collapsed"), "w", encoding="utf-8") as f:
+            for stack, n in sampler.counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+    with open(os.path.join(d, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "campus_id": prof.campus_id,
+            "run_id": prof.run_id,
+            "mode": prof.mode,
+            "status": prof.status,
+            "started_at": started.isoformat(),
+            "elapsed_sec": round(elapsed, 3),
+            "samples": sum(sampler.counts.values()) if sampler is not None else None,
+        }, f)
+    _prune()
+    return d
+
+
+def _prune() -> None:
+    keep = max(1, settings.PROFILE_KEEP)
+    for e in list_profiles()[keep:]:
+        shutil.rmtree(os.path.join(settings.PROFILE_DIR, e["name"]), ignore_errors=True)
+
+
+@contextmanager
+def profile_cycle(campus_id: int, mode: Optional[str]):
+    """
+    with profile_cycle(cid, "cprofile") as prof:
+        prof.run_id = run_full_cycle(...); prof.status = "done"
+    mode가 None/""이면 아무것도 하지 않는다 (prof는 None)
+    """
+    if not mode:
+        yield None
+        return
+    if mode not in MODES:
+        raise ValueError(f"unknown profile mode: {mode} (expected one of {MODES})")
+
+    prof = CycleProfile(campus_id, mode)
+    profiler = sampler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+    else:
+        sampler = _StackSampler(threading.get_ident(), max(1, settings.CYCLE_PROFILE_SAMPLE_MS) / 1000)
+
+    started = datetime.now()
+    t0 = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    if sampler is not None:
+        sampler.start()
+    try:
+        yield prof
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        try:
+            prof.path = _write(prof, started, time.perf_counter() - t0, profiler, sampler)
+            logging.info(f"[PROFILE] cycle profile written: {prof.path}")
+        except Exception:
+            logging.exception("[PROFILE] failed to write cycle profile")
+
+
+def list_profiles() -> List[Dict]:
+    """최신순 프로파일 목록 (meta.json + 파일 목록)"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    out = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        d = os.path.join(settings.PROFILE_DIR, name)
+        meta_path = os.path.join(d, "meta.json")
+        if not os.path.isfile(meta_path):
+            continue
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        files = {fn: os.path.getsize(os.path.join(d, fn)) for fn in sorted(os.listdir(d)) if fn != "meta.json"}
+        out.append({"name": name, **meta, "files": files})
+    out.sort(key=lambda e: e.get("started_at", ""), reverse=True)
+    return out
+
+
+def profile_file_path(name: str, filename: str) -> Optional[str]:
+    """PROFILE_DIR 밖을 가리키지 않는 기존 파일 경로만 반환"""
+    if os.sep in name or os.sep in filename or name.startswith(".") or filename.startswith("."):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, name, filename)
+    return path if os.path.isfile(path) else None
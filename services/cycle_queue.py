@@ -0,0 +1,137 @@
+# services/cycle_queue.py
+"""
+사이클 잡 큐 (Redis). 웹/스케줄러 프로세스는 잡을 넣기만 하고, 실행은 배치 워커(worker.py)가 한다.
+
+  jobs:cycle                       (List)  대기 중인 job_id (LPUSH → 워커가 BLMOVE로 꺼냄)
+  jobs:cycle:processing:{worker}   (List)  워커가 꺼내 실행 중인 job_id (워커 재시작 시 다시 큐로)
+  jobs:cycle:pending:{campus_id}   (String) 같은 캠퍼스에 이미 대기 중인 job_id (중복 enqueue 방지)
+  job:{job_id}                     (Hash)  status/campus_id/note/profile/시각/run_id/error ... (CYCLE_JOB_TTL_SEC)
+  jobs:recent                      (ZSet)  job_id → enqueue 시각 (목록 조회용, 최근 CYCLE_JOB_KEEP개)
+
+status: queued → running → done | skipped(다른 레플리카가 실행 중/완료) | lost(실행 중 리더 락 상실) | failed
+이 모듈은 API 워커에서도 임포트하므로 배치 의존성(pandas/sklearn)을 불러오지 않는다.
+"""
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from core.config import settings
+from core.redis_client import get_redis
+
+QUEUE_KEY = "jobs:cycle"
+RECENT_KEY = "jobs:recent"
+
+
+def job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def processing_key(worker_id: str) -> str:
+    return f"{QUEUE_KEY}:processing:{worker_id}"
+
+
+def _pending_key(campus_id: int) -> str:
+    return f"{QUEUE_KEY}:pending:{campus_id}"
+
+
+def enqueue_cycle(campus_id: int, note: Optional[str] = None, profile: Optional[str] = None,
+                  skip_if_done: bool = True) -> Dict:
+    """
+    반환: {"job_id", "status", "deduplicated"}
+    같은 캠퍼스 잡이 아직 대기 중이면 새로 넣지 않고 그 잡을 돌려준다 (10분 틱이 밀려도 한 번만 실행).
+    """
+    r = get_redis()
+    job_id = uuid.uuid4().hex[:16]
+    ttl = settings.CYCLE_JOB_TTL_SEC
+    if not r.set(_pending_key(campus_id), job_id, nx=True, ex=ttl):
+        existing = r.get(_pending_key(campus_id))
+        if existing and r.exists(job_key(existing)):
+            return {"job_id": existing, "status": r.hget(job_key(existing), "status"), "deduplicated": True}
+        r.set(_pending_key(campus_id), job_id, ex=ttl)  # 잡 해시가 만료된 고아 마커
+
+    now = time.time()
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(job_key(job_id), mapping={
+        "job_id": job_id,
+        "kind": "cycle",
+        "status": "queued",
+        "campus_id": int(campus_id),
+        "note": note or "",
+        "profile": profile or "",
+        "skip_if_done": int(skip_if_done),
+        "enqueued_at": now,
+    })
+    pipe.expire(job_key(job_id), ttl)
+    pipe.zadd(RECENT_KEY, {job_id: now})
+    pipe.zremrangebyrank(RECENT_KEY, 0, -settings.CYCLE_JOB_KEEP - 1)
+    pipe.lpush(QUEUE_KEY, job_id)
+    pipe.execute()
+    return {"job_id": job_id, "status": "queued", "deduplicated": False}
+
+
+def mark_running(job_id: str, worker_id: str) -> Optional[Dict]:
+    """워커가 실행 직전에 호출. 반환: 잡 해시 (만료돼 없으면 None)"""
+    r = get_redis()
+    job = r.hgetall(job_key(job_id))
+    if not job:
+        return None
+    r.hset(job_key(job_id), mapping={"status": "running", "worker": worker_id, "started_at": time.time()})
+    # 실행이 시작되면 다음 틱의 잡을 받을 수 있게 대기 마커 해제 (내 잡일 때만)
+    _release_pending(int(job["campus_id"]), job_id)
+    return job
+
+
+def _release_pending(campus_id: int, job_id: str) -> None:
+    r = get_redis()
+    if r.get(_pending_key(campus_id)) == job_id:
+        r.delete(_pending_key(campus_id))
+
+
+def mark_finished(job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None) -> None:
+    r = get_redis()
+    job = r.hgetall(job_key(job_id))
+    now = time.time()
+    fields = {"status": status, "finished_at": now}
+    if job.get("started_at"):
+        fields["duration_sec"] = round(now - float(job["started_at"]), 3)
+        fields["queue_wait_sec"] = round(float(job["started_at"]) - float(job.get("enqueued_at", job["started_at"])), 3)
+    if result:
+        for k in ("run_id", "anchor"):
+            if result.get(k) is not None:
+                fields[k] = result[k]
+        fields["cycle_status"] = result.get("status", "")
+        if result.get("profile"):
+            fields["profile_name"] = result["profile"]
+    if error:
+        fields["error"] = error[:2000]
+    r.hset(job_key(job_id), mapping=fields)
+    if job.get("campus_id"):
+        _release_pending(int(job["campus_id"]), job_id)
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    job = get_redis().hgetall(job_key(job_id))
+    return _decode(job) if job else None
+
+
+def list_jobs(limit: int = 50) -> List[Dict]:
+    """최근 잡 (enqueue 역순). 해시가 만료된 잡은 건너뜀"""
+    r = get_redis()
+    ids = r.zrevrange(RECENT_KEY, 0, max(0, limit - 1))
+    pipe = r.pipeline(transaction=False)
+    for job_id in ids:
+        pipe.hgetall(job_key(job_id))
+    return [_decode(job) for job in pipe.execute() if job]
+
+
+def queue_stats() -> Dict:
+    r = get_redis()
+    return {"queued": r.llen(QUEUE_KEY)}
+
+
+_NUMERIC = {"campus_id": int, "run_id": int, "skip_if_done": int, "enqueued_at": float, "started_at": float,
+            "finished_at": float, "duration_sec": float, "queue_wait_sec": float}
+
+
+def _decode(job: Dict[str, str]) -> Dict:
+    return {k: (_NUMERIC[k](v) if k in _NUMERIC and v != "" else v) for k, v in job.items()}
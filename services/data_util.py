@@ -1,11 +1,16 @@
+import numpy as np
 import pandas as pd
 
-def normalize_user_id(df: pd.DataFrame) -> pd.DataFrame:
+def normalize_user_id(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     df의 사용자 식별 컬럼을 'user_id'로 정규화한다.
     허용 별칭: 'user_id', 'userId', 'uid', 'id', 'userID'
+    copy=False: 이미 int64 'user_id'가 있으면 df를 그대로 돌려준다(복사 없음).
+                캐스팅이 필요하면 복사본을 만들어 호출자의 df는 건드리지 않는다.
     """
     if "user_id" in df.columns:
+        if not copy and df["user_id"].dtype == np.int64:
+            return df
         out = df.copy()
     else:
         alias = None
@@ -15,9 +20,9 @@ def normalize_user_id(df: pd.DataFrame) -> pd.DataFrame:
                 break
         if alias is None:
             raise ValueError("candidates df must contain 'user_id' (or one of: userId, uid, id, userID)")
-        out = df.rename(columns={alias: "user_id"}).copy()
+        out = df.rename(columns={alias: "user_id"})
 
     # 정수형으로 캐스팅(문자열/float로 들어오더라도 정규화)
-    out["user_id"] = out["user_id"].astype(int)
+    if out["user_id"].dtype != np.int64:
+        out["user_id"] = out["user_id"].astype(np.int64)
     return out
-    
\ No newline at end of file
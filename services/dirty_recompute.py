@@ -1,35 +1,68 @@
 # service/dirty_recompute.py
+import logging
+from typing import List
 from sqlalchemy import text
 from core.db import SessionLocal
-from services.backend_client import get_intervals_bulk
-from services.bits_service import intervals_to_nine_ints
+import numpy as np
+from services.backend_client import get_intervals_columnar
+from services.bits_service import intervals_to_nine_ints_bulk
+from services.meal_window_index import build_free_runs, upsert_indexes
+from services.lookahead import bump_timetable_version
 
-def recompute_dirty_bits(batch_size: int = 500):
+# VALUES는 전부 바인딩 파라미터 → executemany가 multi-row INSERT로 재작성됨
+_UPSERT_BITS_SQL = text("""
+  INSERT INTO timetable_bit
+    (user_id, day_of_week, slot1,slot2,slot3,slot4,slot5,slot6,slot7,slot8,slot9, is_dirty)
+  VALUES (:u,:d,:s1,:s2,:s3,:s4,:s5,:s6,:s7,:s8,:s9,:dirty)
+  ON DUPLICATE KEY UPDATE
+    slot1=VALUES(slot1),slot2=VALUES(slot2),slot3=VALUES(slot3),slot4=VALUES(slot4),slot5=VALUES(slot5),
+    slot6=VALUES(slot6),slot7=VALUES(slot7),slot8=VALUES(slot8),slot9=VALUES(slot9),
+    is_dirty=0, updated_at=CURRENT_TIMESTAMP
+""")
+
+def _rows_for_chunk(chunk, user_id: np.ndarray) -> np.ndarray:
+    """구간의 user_id → chunk 내 행 번호 (chunk에 없는 사용자는 -1)"""
+    ids = np.asarray(chunk, dtype=np.int64)
+    order = np.argsort(ids)
+    pos = np.searchsorted(ids[order], user_id)
+    pos = np.minimum(pos, len(ids) - 1)
+    return np.where(ids[order][pos] == user_id, order[pos], -1)
+
+def recompute_dirty_bits(batch_size: int = 500) -> List[int]:
+    """dirty 사용자의 비트/공강 인덱스를 다시 계산. 반환: 재계산한 user_id 목록"""
     with SessionLocal() as db:
         users = [r[0] for r in db.execute(
             text("SELECT DISTINCT user_id FROM timetable_bit WHERE is_dirty=1")
         ).all()]
         if not users:
-            return
+            return []
 
         for i in range(0, len(users), batch_size):
             chunk = users[i:i+batch_size]
-            all_iv = get_intervals_bulk(chunk)  # {uid:{dow:[{start_min,end_min}, ...]}}
+            cols = get_intervals_columnar(chunk)  # user_id/dow/start_min/end_min 배열
+
+            # (chunk, 7, 288) 비트맵 → (chunk, 7, 9) 정수를 한 번에 계산
+            nine, busy = intervals_to_nine_ints_bulk(_rows_for_chunk(chunk, cols.user_id), cols.dow,
+                                                     cols.start_min, cols.end_min, n_users=len(chunk),
+                                                     return_busy=True)
+            nine = nine.tolist()
 
-            for uid in chunk:
-                per_day = all_iv.get(uid) or all_iv.get(str(uid)) or {}
+            params = []
+            index_rows = []
+            for j, uid in enumerate(chunk):
                 for dow in range(7):
-                    iv = per_day.get(dow) or per_day.get(str(dow)) or []
-                    nine = intervals_to_nine_ints(iv) if iv else [0]*9
-                    db.execute(text("""
-                      INSERT INTO timetable_bit
-                        (user_id, day_of_week, slot1,slot2,slot3,slot4,slot5,slot6,slot7,slot8,slot9, is_dirty)
-                      VALUES (:u,:d,:s1,:s2,:s3,:s4,:s5,:s6,:s7,:s8,:s9,0)
-                      ON DUPLICATE KEY UPDATE
-                        slot1=:s1,slot2=:s2,slot3=:s3,slot4=:s4,slot5=:s5,
-                        slot6=:s6,slot7=:s7,slot8=:s8,slot9=:s9,
-                        is_dirty=0, updated_at=CURRENT_TIMESTAMP
-                    """), {"u": uid, "d": dow,
-                           "s1": nine[0], "s2": nine[1], "s3": nine[2], "s4": nine[3], "s5": nine[4],
-                           "s6": nine[5], "s7": nine[6], "s8": nine[7], "s9": nine[8]})
+                    s = nine[j][dow]
+                    params.append({"u": uid, "d": dow, "dirty": 0,
+                                   "s1": s[0], "s2": s[1], "s3": s[2], "s4": s[3], "s5": s[4],
+                                   "s6": s[5], "s7": s[6], "s8": s[7], "s9": s[8]})
+                runs, all_free = build_free_runs(busy[j].reshape(-1))
+                index_rows.append((uid, runs, all_free))
+            db.execute(_UPSERT_BITS_SQL, params)
+            # 비트와 같은 트랜잭션으로 공강 인덱스 갱신
+            upsert_indexes(db, index_rows)
             db.commit()
+            try:
+                bump_timetable_version(chunk)  # look-ahead 스테이징 보정용
+            except Exception:
+                logging.exception("[LOOKAHEAD] timetable version bump failed")
+    return users
@@ -0,0 +1,128 @@
+# services/dirty_writer.py
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from core.config import settings
+from core.db import SessionLocal
+
+# executemany + 파라미터 바인딩 → PyMySQL이 multi-row INSERT로 재작성한다(문장 길이 상한 내에서).
+# ⚠️ VALUES 튜플은 전부 바인딩 파라미터여야 재작성됨 (리터럴이 섞이면 행 단위 실행으로 떨어짐)
+_UPSERT_DIRTY_SQL = text("""
+    INSERT INTO timetable_bit (user_id, day_of_week, is_dirty)
+    VALUES (:u, :d, :dirty)
+    ON DUPLICATE KEY UPDATE is_dirty=1, updated_at=CURRENT_TIMESTAMP
+""")
+
+
+def upsert_dirty(db, user_ids: Iterable[int], batch_users: int, committed: Optional[Set[int]] = None) -> int:
+    """
+    user_ids × 7요일을 is_dirty=1로 upsert.
+    - 중복 제거 + (user_id, day_of_week) 정렬: 같은 순서로 락을 잡아 데드락 위험을 줄인다.
+    - batch_users 명 단위로 잘라 배치마다 커밋(문장/트랜잭션 크기 상한).
+    - committed: 주어지면 커밋된 배치의 사용자를 채운다 (중간 배치가 실패해도 앞 배치는 이미 반영됨)
+    반환: 처리한 사용자 수
+    """
+    uids = sorted({int(u) for u in user_ids})
+    step = max(1, int(batch_users))
+    for i in range(0, len(uids), step):
+        chunk = uids[i:i + step]
+        db.execute(_UPSERT_DIRTY_SQL, [{"u": u, "d": d, "dirty": 1} for u in chunk for d in range(7)])
+        db.commit()
+        if committed is not None:
+            committed.update(chunk)
+    return len(uids)
+
+
+class DirtyCoalescer:
+    """
+    /dirty, /dirty/bulk 요청을 짧은 윈도우(flush_ms) 동안 모아 중복 제거 후 한 번에 적재한다.
+    - submit()은 Future를 돌려주고, 해당 mark가 커밋되면 완료된다(실패 시 예외 전달).
+    - 같은 윈도우의 동일 사용자 mark는 한 번만 쓰인다 → 같은 행에 대한 락 경합 제거.
+    """
+
+    def __init__(self, flush_ms: int, batch_users: int):
+        self.flush_sec = max(0, flush_ms) / 1000.0
+        self.batch_users = batch_users
+        self._cv = threading.Condition()
+        self._pending: Set[int] = set()
+        self._waiters: List[Tuple[Future, Set[int]]] = []  # (Future, 그 요청의 사용자)
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def submit(self, user_ids: Iterable[int]) -> Future:
+        fut: Future = Future()
+        uids = {int(u) for u in user_ids}
+        with self._cv:
+            if self._stopped:
+                raise RuntimeError("dirty coalescer is stopped")
+            self._pending.update(uids)
+            self._waiters.append((fut, uids))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="dirty-coalescer", daemon=True)
+                self._thread.start()
+            self._cv.notify()
+        return fut
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cv:
+            self._stopped = True
+            self._cv.notify()
+            th = self._thread
+        if th is not None:
+            th.join(timeout)
+
+    def _take(self):
+        # 첫 mark 도착 후 flush_sec 만큼 더 모은 뒤 통째로 가져간다
+        with self._cv:
+            while not self._pending and not self._stopped:
+                self._cv.wait()
+            # submit()의 notify로 일찍 깨어나도 윈도우 끝까지 기다린다
+            deadline = time.monotonic() + self.flush_sec
+            while not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cv.wait(remaining)
+            pending, waiters = self._pending, self._waiters
+            self._pending, self._waiters = set(), []
+            return pending, waiters
+
+    def _loop(self):
+        while True:
+            pending, waiters = self._take()
+            if pending:
+                self._flush(pending, waiters)
+            else:
+                for fut, _uids in waiters:
+                    fut.set_result(0)
+            with self._cv:
+                if self._stopped and not self._pending:
+                    return
+
+    def _flush(self, pending: Set[int], waiters: List[Tuple[Future, Set[int]]]):
+        committed: Set[int] = set()
+        try:
+            with SessionLocal() as db:
+                n = upsert_dirty(db, pending, self.batch_users, committed=committed)
+            logging.info(f"[DIRTY] flushed users={n} requests={len(waiters)}")
+        except Exception as e:
+            # 앞 배치에서 이미 커밋된 요청은 성공으로, 커밋되지 않은 사용자가 있는 요청만 실패로 돌려준다
+            failed = [fut for fut, uids in waiters if not uids <= committed]
+            logging.exception(f"[DIRTY] flush failed: committed users={len(committed)}/{len(pending)} "
+                              f"failed requests={len(failed)}/{len(waiters)}")
+            for fut, uids in waiters:
+                if uids <= committed:
+                    fut.set_result(len(uids))
+                else:
+                    fut.set_exception(e)
+            return
+        for fut, _uids in waiters:
+            fut.set_result(n)
+
+
+dirty_coalescer = DirtyCoalescer(settings.DIRTY_FLUSH_MS, settings.DIRTY_BATCH_USERS)
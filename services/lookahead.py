@@ -0,0 +1,134 @@
+# services/lookahead.py
+"""
+다가올 사이클 앵커의 입력을 미리 계산해 두는 look-ahead 스테이징.
+
+앵커(anchor_to_10min_kst)는 미리 알 수 있고, 후보 집합(timetable_bit 사용자 + 선호도)과
+공강 기준 요청 바디(build_meal_last_end_request_body)는 시간표에만 의존한다.
+다음 LOOKAHEAD_ANCHORS개 앵커의 이 둘을 Redis에 올려 두면, 틱에는 위치 조회와
+클러스터링만 남는다.
+
+  stage:campus:{cid}:{YYYYmmddHHMM}  orjson {"version", "staged_at", "candidates": {col: [...]}, "payload": [...]}
+  tt:version                         시간표 버전 (dirty 재계산 커밋마다 INCR)
+  tt:changed                         ZSet uid → 마지막으로 바뀐 버전 (최근 LOOKAHEAD_KEEP_VERSIONS개만)
+
+스테이징 이후 시간표가 바뀐 사용자만 틱에서 다시 계산해 바디에 끼워 넣는다.
+선호도는 스테이징 시점 값이다 (최대 LOOKAHEAD_ANCHORS*10분 전).
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+import pandas as pd
+
+from core.config import settings
+from core.redis_client import get_redis
+
+TT_VERSION_KEY = "tt:version"
+TT_CHANGED_KEY = "tt:changed"
+
+# post_users_locations 기본값과 같아야 한다
+_NEED_MIN = 30
+_LOOKAHEAD_MIN = 90
+
+
+def _stage_key(campus_id: int, anchor: datetime) -> str:
+    return f"stage:campus:{campus_id}:{anchor:%Y%m%d%H%M}"
+
+
+def bump_timetable_version(user_ids: List[int]) -> int:
+    """시간표(비트/공강 인덱스) 커밋 직후 호출. 반환: 새 버전"""
+    r = get_redis()
+    version = int(r.incr(TT_VERSION_KEY))
+    if user_ids:
+        pipe = r.pipeline(transaction=False)
+        pipe.zadd(TT_CHANGED_KEY, {str(int(u)): version for u in user_ids})
+        pipe.zremrangebyscore(TT_CHANGED_KEY, "-inf", version - settings.LOOKAHEAD_KEEP_VERSIONS)
+        pipe.execute()
+    return version
+
+
+def _current_version() -> int:
+    return int(get_redis().get(TT_VERSION_KEY) or 0)
+
+
+def stage_anchor(campus_id: int, anchor: datetime) -> int:
+    """anchor의 후보/요청 바디를 계산해 스테이징. 반환: 바디 사용자 수"""
+    from core.db import SessionLocal
+    from services.backend_client import build_meal_last_end_request_body
+    from services.cluster_batch import fetch_candidates
+
+    version = _current_version()  # 계산 전에 읽는다 (계산 중 바뀐 사용자는 틱에서 보정)
+    df = fetch_candidates()
+    with SessionLocal() as db:
+        payload = build_meal_last_end_request_body(db, df, ref_time=anchor,
+                                                   need_min=_NEED_MIN, lookahead_min=_LOOKAHEAD_MIN)
+    doc = {
+        "version": version,
+        "staged_at": time.time(),
+        "candidates": {str(c): df[c].tolist() for c in df.columns},
+        "payload": payload,
+    }
+    ttl = max(60, int((anchor - datetime.now(anchor.tzinfo)).total_seconds()) + 600)
+    get_redis().set(_stage_key(campus_id, anchor), orjson.dumps(doc), ex=ttl)
+    return len(payload)
+
+
+def stage_upcoming(campus_id: int, count: Optional[int] = None) -> Dict[str, int]:
+    """현재 앵커 다음 count개를 스테이징 (같은 시간표 버전으로 이미 있으면 건너뜀)"""
+    from services.timetable_service import anchor_to_10min_kst
+
+    count = settings.LOOKAHEAD_ANCHORS if count is None else count
+    base = anchor_to_10min_kst()
+    r = get_redis()
+    version = _current_version()
+    out: Dict[str, int] = {}
+    for i in range(1, count + 1):
+        anchor = base + timedelta(minutes=10 * i)
+        raw = r.get(_stage_key(campus_id, anchor))
+        if raw and orjson.loads(raw)["version"] == version:
+            continue
+        out[anchor.isoformat()] = stage_anchor(campus_id, anchor)
+    return out
+
+
+def load_staged(db, campus_id: int, anchor: datetime) -> Optional[Tuple[pd.DataFrame, List[Dict]]]:
+    """
+    스테이징된 (후보 df, 위치 요청 바디). 없거나 너무 오래됐으면 None → 호출부가 전체 계산.
+    스테이징 이후 시간표가 바뀐 사용자는 여기서 바디를 다시 계산한다.
+    """
+    from services.backend_client import build_meal_last_end_request_body, fetch_user_preferences
+
+    r = get_redis()
+    raw = r.get(_stage_key(campus_id, anchor))
+    if not raw:
+        return None
+    doc = orjson.loads(raw)
+    staged_v = int(doc["version"])
+    current_v = _current_version()
+    if current_v - staged_v >= settings.LOOKAHEAD_KEEP_VERSIONS:
+        return None  # 변경 이력이 잘려 보정 불가
+
+    df = pd.DataFrame(doc["candidates"])
+    if df.empty:
+        return None
+    # fetch_user_preferences와 같은 dtype (user_id int64, 선호도 float32) → 입력 지문 일치
+    df = df.astype({c: (np.int64 if c == "user_id" else np.float32) for c in df.columns})
+    payload: List[Dict] = doc["payload"]
+
+    if current_v > staged_v:
+        changed = sorted(int(u) for u in r.zrangebyscore(TT_CHANGED_KEY, f"({staged_v}", "+inf"))
+        if changed:
+            # 스테이징 후 처음 생긴 사용자는 선호도부터 가져온다
+            new_ids = np.setdiff1d(np.asarray(changed, dtype=np.int64), df["user_id"].to_numpy())
+            if len(new_ids):
+                df = pd.concat([df, fetch_user_preferences(new_ids.tolist())], ignore_index=True)
+            sub = df[df["user_id"].isin(changed)]
+            fresh = build_meal_last_end_request_body(db, sub, ref_time=anchor,
+                                                     need_min=_NEED_MIN, lookahead_min=_LOOKAHEAD_MIN)
+            changed_set = set(changed)
+            payload = [p for p in payload if p["userId"] not in changed_set] + fresh
+        logging.info(f"[LOOKAHEAD] staged v{staged_v} → v{current_v}: recomputed {len(changed)} users")
+    return df, payload
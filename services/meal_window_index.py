@@ -0,0 +1,156 @@
+# services/meal_window_index.py
+"""
+사용자별 '다음 공강 창' 인덱스.
+
+주간(7일 × 288슬롯 = 2016슬롯)을 원형으로 보고, 빈 슬롯(공강)이 이어지는 구간마다
+(공강 시작, 공강 끝) 쌍을 정렬해 저장한다. 공강 시작 직전 슬롯이 곧 '마지막 강의 종료'이므로
+meal_anchor_or_last_end_allweek 결과를 앵커마다 이진 탐색 한 번으로 구할 수 있다.
+
+- 주 경계(일→월)를 넘는 공강은 end가 2016을 넘는 값으로 저장 (end < 4032, uint16)
+- 저장 형식: free_runs = (R,2) uint16 little-endian 바이트, all_free = 주 전체가 공강
+- timetable_bit가 바뀌는 곳(recompute_dirty_bits)에서 함께 갱신한다.
+"""
+from datetime import datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from services.timetable_bits import SLOTS_PER_DAY, SLOT_MIN, DAYS
+
+WEEK_SLOTS = DAYS * SLOTS_PER_DAY  # 2016
+
+_EMPTY_RUNS = np.empty((0, 2), dtype=np.int64)
+_MAX_STEPS = WEEK_SLOTS  # meal_anchor_or_last_end_allweek의 역탐색 상한
+
+
+class MealWindowIndex:
+    __slots__ = ("starts", "ends", "all_free")
+
+    def __init__(self, runs: np.ndarray, all_free: bool):
+        runs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+        if len(runs):
+            # 주 경계를 넘는 창까지 찾도록 앞/뒤 한 주씩 복제 (정렬 유지됨)
+            ext = np.concatenate([runs - WEEK_SLOTS, runs, runs + WEEK_SLOTS])
+        else:
+            ext = _EMPTY_RUNS
+        self.starts = ext[:, 0]
+        self.ends = ext[:, 1]
+        self.all_free = bool(all_free)
+
+    @classmethod
+    def from_bytes(cls, blob: Optional[bytes], all_free: bool) -> "MealWindowIndex":
+        runs = np.frombuffer(blob, dtype="<u2").reshape(-1, 2) if blob else _EMPTY_RUNS
+        return cls(runs, all_free)
+
+
+def nine_ints_to_week_bits(nine_by_dow: Sequence[Sequence[int]]) -> np.ndarray:
+    """[[slot1..slot9] × 7] → (2016,) bool (True=수업)"""
+    arr = np.asarray(nine_by_dow, dtype="<u4").reshape(DAYS, 9)
+    bits = np.unpackbits(arr.view(np.uint8), axis=1, bitorder="little")
+    return bits[:, :SLOTS_PER_DAY].reshape(-1).astype(bool)
+
+
+def build_free_runs(week_busy: np.ndarray) -> Tuple[np.ndarray, bool]:
+    """
+    (2016,) bool → (free_runs (R,2) uint16, all_free)
+    free_runs[i] = [공강 시작 슬롯, 공강 끝 슬롯(exclusive)]
+    """
+    busy = np.asarray(week_busy, dtype=bool).reshape(-1)
+    if not busy.any():
+        return np.empty((0, 2), dtype=np.uint16), True
+    if busy.all():
+        return np.empty((0, 2), dtype=np.uint16), False
+
+    free = ~busy
+    starts = np.flatnonzero(free & np.roll(busy, 1))
+    ends = np.flatnonzero(free & np.roll(busy, -1)) + 1
+    if ends[0] <= starts[0]:
+        # 첫 end는 주 경계를 넘어온 공강의 끝 → 마지막 start와 짝지음
+        ends = np.concatenate([ends[1:], ends[:1] + WEEK_SLOTS])
+    return np.stack([starts, ends], axis=1).astype(np.uint16), False
+
+
+def query_meal_anchor(
+    idx: MealWindowIndex,
+    *,
+    ref_time: datetime,
+    lookahead_min: int,
+    need_min: int,
+) -> Tuple[int, time] | Tuple[int, int]:
+    """
+    meal_anchor_or_last_end_allweek(..., empty_is=0)와 같은 결과를 인덱스로 계산.
+    원본의 역탐색 상한(MAX_STEPS, 요일 넘김도 한 스텝)까지 그대로 따른다: 공강이 거의 한 주 내내
+    이어져 경계까지 닿지 못하면 원본처럼 상한 지점의 요일 + 00:00을 돌려준다.
+    """
+    start_idx = (ref_time.hour * 60 + ref_time.minute) // SLOT_MIN
+    start_idx = max(0, min(SLOTS_PER_DAY - 1, start_idx))
+    H = max(1, lookahead_min // SLOT_MIN)
+    need = max(1, need_min // SLOT_MIN)
+
+    dow_today = ref_time.weekday()
+    p0 = dow_today * SLOTS_PER_DAY + start_idx
+    # 탐색 범위: 오늘 남은 슬롯 + 내일 하루
+    hi = p0 + min(H, 2 * SLOTS_PER_DAY - start_idx)
+
+    if idx.all_free:
+        if hi - p0 < need:
+            return (-1, -1)
+        return _exhausted_scan(p0)
+
+    i = int(np.searchsorted(idx.ends, p0, side="right"))  # end > p0 인 첫 공강
+    n = len(idx.starts)
+    while i < n and idx.starts[i] < hi:
+        s = max(int(idx.starts[i]), p0)
+        e = min(int(idx.ends[i]), hi)
+        if e - s >= need:
+            run_start = int(idx.starts[i])
+            # 앵커(s) 직전부터 경계(run_start-1)까지: 슬롯 스텝 + 요일 넘김 스텝이 상한 안인가
+            if (s - run_start) + (s // SLOTS_PER_DAY - (run_start - 1) // SLOTS_PER_DAY) >= _MAX_STEPS:
+                return _exhausted_scan(s)
+            end_dow = ((run_start - 1) % WEEK_SLOTS) // SLOTS_PER_DAY
+            end_minutes = (run_start % SLOTS_PER_DAY) * SLOT_MIN
+            return (end_dow, time(hour=end_minutes // 60, minute=end_minutes % 60))
+        i += 1
+    return (-1, -1)
+
+
+def _exhausted_scan(anchor: int) -> Tuple[int, time]:
+    """원본 역탐색이 경계를 못 찾고 _MAX_STEPS를 다 쓴 경우의 반환값 (드묾: 한 주 대부분이 공강)"""
+    cur_dow, cur_idx = divmod(anchor, SLOTS_PER_DAY)
+    cur_idx -= 1
+    steps = 0
+    while steps < _MAX_STEPS:
+        if cur_idx < 0:
+            cur_dow -= 1
+            cur_idx = SLOTS_PER_DAY - 1
+        else:
+            cur_idx -= 1
+        steps += 1
+    return (cur_dow % DAYS, time(0, 0))
+
+
+def upsert_indexes(db, rows: List[Tuple[int, np.ndarray, bool]]) -> None:
+    """rows: [(user_id, free_runs, all_free)] — 커밋은 호출부 책임"""
+    if not rows:
+        return
+    db.execute(text("""
+        INSERT INTO meal_window_index (user_id, free_runs, all_free)
+        VALUES (:u, :runs, :all_free)
+        ON DUPLICATE KEY UPDATE
+          free_runs=VALUES(free_runs), all_free=VALUES(all_free), updated_at=CURRENT_TIMESTAMP
+    """), [
+        {"u": int(uid), "runs": runs.astype("<u2").tobytes(), "all_free": 1 if all_free else 0}
+        for uid, runs, all_free in rows
+    ])
+
+
+def fetch_indexes_for_users(db, user_ids: List[int]) -> Dict[int, MealWindowIndex]:
+    if not user_ids:
+        return {}
+    rows = db.execute(text("""
+        SELECT user_id, free_runs, all_free
+        FROM meal_window_index
+        WHERE user_id IN :uids
+    """), {"uids": tuple(user_ids)}).fetchall()
+    return {int(uid): MealWindowIndex.from_bytes(blob, bool(all_free)) for uid, blob, all_free in rows}
@@ -0,0 +1,91 @@
+# services/neighbor_index.py
+"""
+"나와 비슷한 사람" k-최근접 이웃 인덱스.
+
+run_full_cycle에서 특징 행렬 X(run_clustering 결과)로 KD-tree를 만들어 각 사용자의
+상위 KNN_MAX_K 이웃을 미리 계산하고, 스냅샷 디렉터리에 .npy로 저장한다.
+
+  {SNAPSHOT_DIR}/run_{run_id}/knn_users.npy      (N,)   int64   정렬된 user_id
+  {SNAPSHOT_DIR}/run_{run_id}/knn_neighbors.npy  (N,K)  int64   이웃 user_id (거리 오름차순)
+  {SNAPSHOT_DIR}/run_{run_id}/knn_dist.npy       (N,K)  float32 이웃 거리
+
+API 워커는 파일을 mmap으로 열고, 조회는 searchsorted 한 번 + 행 슬라이스 (sub-ms).
+"""
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from services.snapshot_paths import run_snapshot_dir
+
+_FILES = ("knn_users", "knn_neighbors", "knn_dist")
+
+
+def _path(run_id: int, name: str) -> str:
+    return os.path.join(run_snapshot_dir(run_id), f"{name}.npy")
+
+
+def build_neighbor_index(run_id: int, user_ids: np.ndarray, X: np.ndarray, k: Optional[int] = None) -> int:
+    """
+    반환: 저장한 이웃 수 K (사용자 수가 적으면 N-1로 줄어듦)
+    """
+    from sklearn.neighbors import KDTree
+
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    X = np.asarray(X, dtype=np.float32)
+    n = len(user_ids)
+    k = min(int(k or settings.KNN_MAX_K), max(0, n - 1))
+
+    if k > 0:
+        tree = KDTree(X)
+        dist, idx = tree.query(X, k=k + 1)  # 자기 자신 포함
+        # 자기 자신 제거 (동일 특징 중복이 있으면 0번째가 자신이 아닐 수 있으므로 마스크로 처리)
+        keep = idx != np.arange(n)[:, None]
+        keep[keep.sum(axis=1) > k, -1] = False  # 자신이 결과에 없던 행은 마지막 하나 버림
+        nbr = idx[keep].reshape(n, k)
+        nbr_dist = dist[keep].reshape(n, k).astype(np.float32)
+    else:
+        nbr = np.empty((n, 0), dtype=np.int64)
+        nbr_dist = np.empty((n, 0), dtype=np.float32)
+
+    order = np.argsort(user_ids, kind="stable")
+    arrays = {
+        "knn_users": user_ids[order],
+        "knn_neighbors": user_ids[nbr[order]],
+        "knn_dist": nbr_dist[order],
+    }
+    os.makedirs(run_snapshot_dir(run_id), exist_ok=True)
+    for name, arr in arrays.items():
+        tmp = _path(run_id, name) + ".tmp.npy"
+        np.save(tmp, arr)
+        os.replace(tmp, _path(run_id, name))
+    return k
+
+
+def build_neighbor_index_safe(*args, **kwargs) -> Optional[int]:
+    try:
+        return build_neighbor_index(*args, **kwargs)
+    except Exception:
+        logging.exception("[KNN] index build failed")
+        return None
+
+
+@lru_cache(maxsize=4)
+def _open_index(run_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return tuple(np.load(_path(run_id, name), mmap_mode="r") for name in _FILES)
+
+
+def nearest_neighbors(run_id: int, user_id: int, top_k: int) -> Optional[List[Tuple[int, float]]]:
+    """
+    반환: [(user_id, distance)] 거리 오름차순, 사용자가 인덱스에 없으면 None
+    인덱스 파일이 없으면 FileNotFoundError
+    """
+    users, nbrs, dists = _open_index(int(run_id))
+    pos = int(np.searchsorted(users, user_id))
+    if pos >= len(users) or int(users[pos]) != int(user_id):
+        return None
+    k = min(int(top_k), nbrs.shape[1])
+    return [(int(u), float(d)) for u, d in zip(nbrs[pos, :k], dists[pos, :k])]
@@ -0,0 +1,128 @@
+# services/retention_service.py
+"""
+스냅샷 보존 정책.
+
+cluster_member는 run_id RANGE 파티션(경계 = RETENTION_PARTITION_RUNS 배수)으로 나뉜다.
+- ensure_partitions: pmax를 쪼개 앞으로 쓸 파티션을 미리 만들어 둔다 (pmax는 늘 비어 있게)
+- purge_expired: 보존 기간이 지난 run 범위의 파티션을 DROP PARTITION으로 한 번에 제거하고
+                 run 행 / Redis 키를 정리한다.
+활성 run(campus_latest, status='active')보다 작은 경계까지만 지우므로 포인터가 끊기지 않는다.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.db import SessionLocal
+from services.snapshot_service import purge_run_keys, run_cluster_counts
+from services.snapshot_store import remove_run_snapshot
+
+
+def _partitions(db: Session) -> List[Tuple[str, Optional[int]]]:
+    """[(partition_name, upper_bound or None(MAXVALUE))] — 파티션이 없으면 []"""
+    rows = db.execute(text("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cluster_member'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)).all()
+    return [(name, None if desc == "MAXVALUE" else int(desc)) for name, desc in rows]
+
+
+def ensure_partitions(db: Session) -> List[int]:
+    """
+    MAX(run_id) + RETENTION_PARTITION_RUNS * RETENTION_PARTITIONS_AHEAD 까지 파티션 생성.
+    반환: 새로 만든 경계 목록
+    """
+    parts = _partitions(db)
+    if not parts:
+        logging.warning("[RETENTION] cluster_member is not partitioned; skip ensure_partitions")
+        return []
+
+    step = max(1, settings.RETENTION_PARTITION_RUNS)
+    top = max([b for _, b in parts if b is not None] or [0])
+    max_rid = int(db.execute(text("SELECT COALESCE(MAX(run_id), 0) FROM run")).scalar_one())
+    target = max_rid + step * max(1, settings.RETENTION_PARTITIONS_AHEAD)
+
+    new_bounds: List[int] = []
+    while top <= target:
+        top = (top // step + 1) * step
+        new_bounds.append(top)
+    if not new_bounds:
+        return []
+
+    defs = ", ".join(f"PARTITION p{b} VALUES LESS THAN ({b})" for b in new_bounds)
+    db.execute(text(f"""
+        ALTER TABLE cluster_member REORGANIZE PARTITION pmax INTO (
+          {defs}, PARTITION pmax VALUES LESS THAN MAXVALUE
+        )
+    """))
+    logging.info(f"[RETENTION] partitions added: {new_bounds}")
+    return new_bounds
+
+
+def _keep_from(db: Session, hours: int) -> Optional[int]:
+    """보존해야 하는 가장 작은 run_id (보존 기간 내 run, 활성 포인터 중 최소)"""
+    return db.execute(text("""
+        SELECT MIN(run_id) FROM (
+          SELECT MIN(run_id) AS run_id FROM run WHERE created_at >= NOW() - INTERVAL :h HOUR
+          UNION ALL SELECT MIN(active_run_id) FROM campus_latest
+          UNION ALL SELECT MIN(run_id) FROM run WHERE status = 'active'
+        ) t
+    """), {"h": int(hours)}).scalar()
+
+
+def purge_expired(db: Session, hours: Optional[int] = None) -> Dict:
+    hours = settings.RETENTION_HOURS if hours is None else hours
+    keep_from = _keep_from(db, hours)
+    if keep_from is None:
+        return {"dropped_partitions": [], "purged_runs": 0}
+
+    parts = _partitions(db)
+    dropped: List[str] = []
+    if parts:
+        # 경계 <= keep_from 인 파티션은 전부 만료 run만 담고 있다
+        expired = [(name, b) for name, b in parts if b is not None and b <= keep_from]
+        if not expired:
+            return {"dropped_partitions": [], "purged_runs": 0}
+
+        dropped = [name for name, _ in expired]
+        purge_upto = max(b for _, b in expired)
+        db.execute(text(f"ALTER TABLE cluster_member DROP PARTITION {', '.join(dropped)}"))
+    else:
+        # 파티션 미적용 DB: 배치 DELETE로 대체
+        purge_upto = int(keep_from)
+        while True:
+            res = db.execute(text("DELETE FROM cluster_member WHERE run_id < :upto LIMIT 10000"),
+                             {"upto": purge_upto})
+            db.commit()
+            if res.rowcount == 0:
+                break
+
+    run_ids = [int(x) for (x,) in db.execute(text("""
+        SELECT run_id FROM run
+        WHERE run_id < :upto AND run_id NOT IN (SELECT active_run_id FROM campus_latest)
+    """), {"upto": purge_upto}).all()]
+    # run_summary는 run 삭제 시 함께 지워지므로(ON DELETE CASCADE) 군집 수를 먼저 읽어 둔다
+    cluster_counts = run_cluster_counts(db, run_ids)
+    if run_ids:
+        db.execute(text("DELETE FROM run WHERE run_id IN :rids"), {"rids": tuple(run_ids)})
+    db.commit()
+
+    for rid in run_ids:
+        purge_run_keys(rid, cluster_counts.get(rid))
+        remove_run_snapshot(rid)
+
+    logging.info(f"[RETENTION] dropped={dropped} purged_runs={len(run_ids)} upto={purge_upto}")
+    return {"dropped_partitions": dropped, "purged_runs": len(run_ids), "purged_upto": purge_upto}
+
+
+def run_retention() -> Dict:
+    with SessionLocal() as db:
+        added = ensure_partitions(db)
+        result = purge_expired(db)
+    result["added_partitions"] = added
+    return result
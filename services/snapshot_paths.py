@@ -0,0 +1,9 @@
+# services/snapshot_paths.py
+"""run별 스냅샷 디렉터리 경로 (무거운 의존성 없이 API 워커에서도 쓰도록 분리)"""
+import os
+
+from core.config import settings
+
+
+def run_snapshot_dir(run_id: int) -> str:
+    return os.path.join(settings.SNAPSHOT_DIR, f"run_{int(run_id)}")
@@ -1,17 +1,15 @@
-from typing import Optional, Iterable, Tuple
+from typing import TYPE_CHECKING, Optional, Iterable, Tuple, Dict
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-import redis
 import json
+import orjson
 from core.config import settings
 from core.db import SessionLocal
+from core.redis_client import get_redis
+from services.active_run import ACTIVE_CHANNEL, active_key
 
-r = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    password=settings.REDIS_PASSWORD,
-    decode_responses=True,
-)
+if TYPE_CHECKING:
+    import numpy as np
 
 def create_draft_run(db: Session, campus_id: int, algo: str, param_json: Optional[dict]) -> int:
     if param_json is None:
@@ -51,13 +49,28 @@ def fetch_cluster_rows(db: Session, run_id: int, batch_size: int = 5000) -> Iter
             yield int(uid), int(cseq), (int(rank) if rank is not None else None), (float(dist) if dist is not None else None)
         offset += batch_size
 
+ME_PAYLOAD_MAX = 100  # /cluster-member/me topK 상한
+
+
+def me_payloads(members: Iterable[int]) -> Dict[int, bytes]:
+    """
+    한 군집의 멤버 → {uid: /me 응답 JSON bytes}
+    (오름차순, 본인 제외, 최대 ME_PAYLOAD_MAX — API가 그대로 내려보낼 수 있는 형태)
+    """
+    ms = sorted({int(u) for u in members})
+    head = ms[:ME_PAYLOAD_MAX + 1]  # 본인이 빠져도 ME_PAYLOAD_MAX개가 남도록 하나 더
+    return {u: orjson.dumps([m for m in head if m != u][:ME_PAYLOAD_MAX]) for u in ms}
+
+
 def warmup_to_redis(run_id: int, rows: Iterable[Tuple[int,int,Optional[int],Optional[float]]]) -> None:
     """
     cm:run:{rid}  (Hash) user_id -> cluster_seq
     cl:run:{rid}:cid:{cluster_seq} (ZSet or Set)
+    me:run:{rid}  (Hash) user_id -> /me 응답 JSON (FAST_JSON=1일 때)
     """
-    pipe = r.pipeline(transaction=True)
+    pipe = get_redis().pipeline(transaction=True)
     cm_key = f"cm:run:{run_id}"
+    groups: Dict[int, list] = {}
 
     # 성능을 위해 일정 개수마다 EXEC
     BULK = 2000
@@ -69,13 +82,78 @@ def warmup_to_redis(run_id: int, rows: Iterable[Tuple[int,int,Optional[int],Opti
             pipe.zadd(cl_key, {str(uid): float(dist)})
         else:
             pipe.sadd(cl_key, str(uid))
+        if settings.FAST_JSON:
+            groups.setdefault(int(cseq), []).append(int(uid))
         count += 1
         if count % BULK == 0:
             pipe.execute()
     if count % BULK != 0:
         pipe.execute()
 
-def activate_run(db: Session, campus_id: int, run_id: int) -> None:
+    # 군집 멤버가 다 모인 뒤 사용자별 응답을 미리 인코딩
+    me_key = f"me:run:{run_id}"
+    pending = 0
+    for members in groups.values():
+        payloads = me_payloads(members)
+        pipe.hset(me_key, mapping=payloads)
+        pending += len(payloads)
+        if pending >= BULK:
+            pipe.execute()
+            pending = 0
+    if pending:
+        pipe.execute()
+
+def run_cluster_counts(db: Session, run_ids: Iterable[int]) -> Dict[int, int]:
+    """run_id -> cluster_count (run_summary). 요약이 없는 run은 결과에서 빠진다"""
+    run_ids = tuple(int(x) for x in run_ids)
+    if not run_ids:
+        return {}
+    rows = db.execute(text("SELECT run_id, cluster_count FROM run_summary WHERE run_id IN :rids"),
+                      {"rids": run_ids}).all()
+    return {int(rid): int(k) for rid, k in rows}
+
+def purge_run_keys(run_id: int, cluster_count: Optional[int] = None) -> None:
+    """
+    run의 Redis 키(cm:run:{rid}, me:run:{rid}, cl:run:{rid}:cid:*) 삭제
+    cluster_count: 군집 수 K를 알면 cl 키를 1..K로 바로 만든다 (cluster_seq는 1..K 연속).
+                   모르면(요약 없는 run) 키 공간 SCAN으로 찾는다
+    """
+    r = get_redis()
+    keys = [f"cm:run:{run_id}", f"me:run:{run_id}"]
+    if cluster_count is not None:
+        keys.extend(f"cl:run:{run_id}:cid:{seq}" for seq in range(1, int(cluster_count) + 1))
+    else:
+        keys.extend(r.scan_iter(match=f"cl:run:{run_id}:cid:*", count=1000))
+    for i in range(0, len(keys), 500):
+        r.unlink(*keys[i:i + 500])
+
+def active_run_fingerprint(db: Session, campus_id: int) -> Tuple[Optional[int], Optional[str]]:
+    """(활성 run_id, param_json.input_fingerprint) — 활성 run이 없으면 (None, None)"""
+    row = db.execute(text("""
+        SELECT r.run_id, JSON_UNQUOTE(JSON_EXTRACT(r.param_json, '$.input_fingerprint'))
+        FROM campus_latest cl JOIN run r ON r.run_id = cl.active_run_id
+        WHERE cl.campus_id = :cid
+    """), {"cid": campus_id}).first()
+    if not row:
+        return None, None
+    return int(row[0]), row[1]
+
+def mark_run_reused(db: Session, run_id: int, anchor_iso: str) -> None:
+    """입력이 같아 재사용된 사이클 기록 (새 run/멤버 행 없이 활성 run에 마커만)"""
+    db.execute(text("""
+        UPDATE run
+        SET param_json = JSON_SET(param_json,
+              '$.last_reused_anchor', :anchor,
+              '$.reuse_count', COALESCE(JSON_EXTRACT(param_json, '$.reuse_count'), 0) + 1)
+        WHERE run_id = :rid
+    """), {"rid": run_id, "anchor": anchor_iso})
+    db.commit()
+
+class StaleFenceError(RuntimeError):
+    """리더 락을 잃은 이전 리더의 활성화 시도 (더 큰 펜싱 토큰이 이미 기록됨)"""
+
+
+def activate_run(db: Session, campus_id: int, run_id: int, fence_token: Optional[int] = None) -> None:
     # 트랜잭션 시작 (Session이 autocommit=False 가정)
     # 1) 대상 run 잠금 및 상태 확인
     status = db.execute(
@@ -86,6 +164,16 @@ def activate_run(db: Session, campus_id: int, run_id: int) -> None:
     if status not in ("draft", "active"):
         raise ValueError(f"invalid status for activation: {status}")
 
+    # 1.5) 펜싱: 포인터 행을 잠그고 더 최신 리더가 이미 활성화했는지 확인 (수동 활성화는 토큰 없음)
+    if fence_token is not None:
+        current = db.execute(
+            text("SELECT fence_token FROM campus_latest WHERE campus_id = :cid FOR UPDATE"),
+            {"cid": campus_id}
+        ).scalar()
+        if current is not None and int(current) > int(fence_token):
+            db.rollback()
+            raise StaleFenceError(f"stale fence token {fence_token} < {current} (campus {campus_id})")
+
     # 2) 같은 캠퍼스의 기존 active 모두 내리기
     db.execute(
         text("""
@@ -105,21 +193,64 @@ def activate_run(db: Session, campus_id: int, run_id: int) -> None:
     # 4) campus_latest 갱신
     db.execute(
         text("""
-        INSERT INTO campus_latest (campus_id, active_run_id)
-        VALUES (:cid, :rid)
+        INSERT INTO campus_latest (campus_id, active_run_id, fence_token)
+        VALUES (:cid, :rid, :fence)
         ON DUPLICATE KEY UPDATE
           active_run_id=VALUES(active_run_id),
+          fence_token=GREATEST(fence_token, VALUES(fence_token)),
           updated_at=CURRENT_TIMESTAMP
         """),
-        {"cid": campus_id, "rid": run_id}
+        {"cid": campus_id, "rid": run_id, "fence": int(fence_token or 0)}
     )
 
     db.commit()
 
     # 5) 커밋 후 Redis 스위치
-    r.set(f"active:campus:{campus_id}", f"run:{run_id}")
+    # 포인터 교체와 변경 알림을 한 MULTI로 → 읽기 캐시(services.active_run)가 즉시 갱신
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.set(active_key(campus_id), f"run:{run_id}")
+    pipe.publish(ACTIVE_CHANNEL, f"{campus_id}:{run_id}")
+    pipe.execute()
     
+def summarize_run(run_id: int, cols: Dict[str, "np.ndarray"], reassigned: int = 0) -> dict:
+    """
+    to_cluster_member_columns 결과로 run 통계를 계산 (run_stats 응답 형식 + 확장 필드).
+    """
+    import numpy as np  # 배치 경로 전용 (API 워커 임포트 비용 절감)
+
+    seqs = cols["cluster_seq"]
+    dists = cols["distance_to_center"]
+    uniq, sizes = np.unique(seqs, return_counts=True)
+    hist_size, hist_cnt = np.unique(sizes, return_counts=True)
+    return {
+        "run_id": run_id,
+        "total_members": int(len(seqs)),
+        "clusters": [{"cluster_seq": int(c), "members": int(m)} for c, m in zip(uniq, sizes)],
+        "cluster_count": int(len(uniq)),
+        "size_histogram": {str(int(k)): int(v) for k, v in zip(hist_size, hist_cnt)},
+        "mean_distance": float(dists.mean()) if len(dists) else None,
+        "max_distance": float(dists.max()) if len(dists) else None,
+        "reassigned": int(reassigned),
+    }
+
+def save_run_summary(db: Session, summary: dict) -> None:
+    db.execute(text("""
+        INSERT INTO run_summary (run_id, total_members, cluster_count, summary_json)
+        VALUES (:rid, :total, :k, CAST(:js AS JSON))
+        ON DUPLICATE KEY UPDATE
+          total_members=VALUES(total_members), cluster_count=VALUES(cluster_count),
+          summary_json=VALUES(summary_json)
+    """), {"rid": summary["run_id"], "total": summary["total_members"],
+           "k": summary["cluster_count"], "js": json.dumps(summary, ensure_ascii=False)})
+    db.commit()
+
 def run_stats(db: Session, run_id: int) -> dict:
+    # 1) 클러스터링 시점에 저장한 요약이 있으면 PK 조회 한 번으로 응답
+    js = db.execute(text("SELECT summary_json FROM run_summary WHERE run_id=:rid"), {"rid": run_id}).scalar()
+    if js is not None:
+        return json.loads(js) if isinstance(js, (str, bytes)) else js
+
+    # 2) 요약 없는 run(이전 버전/수동 적재)은 기존 GROUP BY 경로
     total = db.execute(text("SELECT COUNT(*) FROM cluster_member WHERE run_id=:rid"), {"rid": run_id}).scalar_one()
     clusters = db.execute(text("""
         SELECT cluster_seq, COUNT(*) AS members
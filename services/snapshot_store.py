@@ -0,0 +1,189 @@
+# services/snapshot_store.py
+"""
+run별 오프라인 분석용 스냅샷 (Arrow IPC 파일).
+
+  {SNAPSHOT_DIR}/run_{run_id}/snapshot.arrow
+    - user_id, 입력 컬럼(latitude, longitude, 선호도...)   : run_clustering 입력 df
+    - f0..f{D-1}                                           : build_feature_matrix 결과 X (float32)
+    - label, cluster_seq, distance                         : run_clustering 결과
+    - schema metadata "solmeal": run_id/campus_id/params/pref_cols 등 JSON
+
+로더는 pa.memory_map으로 열어 MySQL 없이 run_clustering 재실행(replay)이나 run 간 비교를 한다.
+(SNAPSHOT_COMPRESSION=none 이면 컬럼 버퍼가 mmap 영역을 그대로 가리킨다)
+"""
+import json
+import logging
+import os
+import shutil
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from core.config import settings
+from services.cluster_job import ClusterParams, FeatureScaler, run_clustering
+from services.snapshot_paths import run_snapshot_dir
+
+_META_KEY = b"solmeal"
+_FEATURE_PREFIX = "f"
+
+
+def _snapshot_path(run_id: int) -> str:
+    return os.path.join(run_snapshot_dir(run_id), "snapshot.arrow")
+
+
+def export_run_snapshot(
+    run_id: int,
+    campus_id: int,
+    df: pd.DataFrame,
+    X: np.ndarray,
+    labels: np.ndarray,
+    dists: np.ndarray,
+    params: ClusterParams,
+    extra_meta: Optional[dict] = None,
+) -> str:
+    """run_clustering 입력/출력을 Arrow IPC 파일로 저장. 반환: 파일 경로"""
+    X = np.asarray(X, dtype=np.float32)
+    labels = np.asarray(labels)
+    _, seq0 = np.unique(labels, return_inverse=True)  # to_cluster_member_columns와 같은 규칙
+
+    columns: Dict[str, pa.Array] = {}
+    for c in df.columns:
+        columns[str(c)] = pa.array(df[c].to_numpy())
+    for j in range(X.shape[1]):
+        columns[f"{_FEATURE_PREFIX}{j}"] = pa.array(X[:, j])
+    columns["label"] = pa.array(labels.astype(np.int32))
+    columns["cluster_seq"] = pa.array(seq0.reshape(-1).astype(np.int32) + 1)
+    columns["distance"] = pa.array(np.asarray(dists, dtype=np.float64))
+
+    meta = {
+        "run_id": int(run_id),
+        "campus_id": int(campus_id),
+        "input_columns": [str(c) for c in df.columns],
+        "feature_dim": int(X.shape[1]),
+        "params": {k: v for k, v in asdict(params).items() if k != "centers"},
+    }
+    if extra_meta:
+        meta.update(extra_meta)
+    table = pa.table(columns).replace_schema_metadata({_META_KEY: json.dumps(meta, default=str)})
+
+    os.makedirs(run_snapshot_dir(run_id), exist_ok=True)
+    path = _snapshot_path(run_id)
+    tmp = path + ".tmp"
+    compression = None if settings.SNAPSHOT_COMPRESSION == "none" else settings.SNAPSHOT_COMPRESSION
+    with pa.OSFile(tmp, "wb") as sink:
+        with ipc.new_file(sink, table.schema, options=ipc.IpcWriteOptions(compression=compression)) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)  # 완성된 파일만 보이도록
+    return path
+
+
+@dataclass
+class RunSnapshot:
+    run_id: int
+    meta: dict
+    table: pa.Table
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        return self.table.column("user_id").to_numpy()
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.table.column("label").to_numpy()
+
+    @property
+    def cluster_seq(self) -> np.ndarray:
+        return self.table.column("cluster_seq").to_numpy()
+
+    @property
+    def distances(self) -> np.ndarray:
+        return self.table.column("distance").to_numpy()
+
+    def features(self) -> np.ndarray:
+        """(N, D) float32 특징 행렬"""
+        cols = [self.table.column(f"{_FEATURE_PREFIX}{j}").to_numpy() for j in range(self.meta["feature_dim"])]
+        return np.column_stack(cols) if cols else np.empty((self.table.num_rows, 0), dtype=np.float32)
+
+    def frame(self) -> pd.DataFrame:
+        """run_clustering 입력 df 복원"""
+        return self.table.select(self.meta["input_columns"]).to_pandas()
+
+    def params(self, **overrides) -> ClusterParams:
+        p = dict(self.meta["params"])
+        p.update(overrides)
+        if isinstance(p.get("scaler"), dict):
+            p["scaler"] = FeatureScaler(**p["scaler"])
+        return ClusterParams(**p)
+
+
+def load_run_snapshot(run_id: int) -> RunSnapshot:
+    with pa.memory_map(_snapshot_path(run_id), "r") as source:
+        table = ipc.open_file(source).read_all()
+    meta = json.loads(table.schema.metadata[_META_KEY])
+    return RunSnapshot(run_id=int(run_id), meta=meta, table=table)
+
+
+def replay_clustering(run_id: int, **param_overrides):
+    """
+    저장된 입력으로 run_clustering 재실행. 파라미터는 run 당시 값 + overrides.
+    반환: run_clustering과 동일 (labels, dists, X)
+    """
+    snap = load_run_snapshot(run_id)
+    return run_clustering(snap.frame(), snap.params(**param_overrides))
+
+
+def compare_runs(run_a: int, run_b: int) -> dict:
+    """두 run의 군집 배정 비교 (공통 사용자 기준 ARI, 군집이 바뀐 사용자 수 등)"""
+    from sklearn.metrics import adjusted_rand_score
+
+    a = load_run_snapshot(run_a)
+    b = load_run_snapshot(run_b)
+    sa = pd.Series(a.cluster_seq, index=a.user_ids)
+    sb = pd.Series(b.cluster_seq, index=b.user_ids)
+    common = sa.index.intersection(sb.index)
+    la = sa.loc[common].to_numpy()
+    lb = sb.loc[common].to_numpy()
+
+    # 같은 군집이었던 '짝'이 유지됐는지: 사용자별로 a에서의 군집이 b에서 주로 어디로 갔는지 기준
+    moved = 0
+    if len(common):
+        pair = pd.DataFrame({"a": la, "b": lb})
+        major = pair.groupby("a")["b"].agg(lambda s: s.value_counts().index[0])
+        moved = int((pair["b"].to_numpy() != major.loc[pair["a"]].to_numpy()).sum())
+
+    return {
+        "run_a": int(run_a),
+        "run_b": int(run_b),
+        "only_a": int(len(sa.index.difference(sb.index))),
+        "only_b": int(len(sb.index.difference(sa.index))),
+        "common": int(len(common)),
+        "moved": moved,
+        "ari": float(adjusted_rand_score(la, lb)) if len(common) else None,
+    }
+
+
+def remove_run_snapshot(run_id: int) -> None:
+    shutil.rmtree(run_snapshot_dir(run_id), ignore_errors=True)
+
+
+def list_snapshot_runs() -> List[int]:
+    if not os.path.isdir(settings.SNAPSHOT_DIR):
+        return []
+    out = []
+    for name in os.listdir(settings.SNAPSHOT_DIR):
+        if name.startswith("run_") and os.path.exists(os.path.join(settings.SNAPSHOT_DIR, name, "snapshot.arrow")):
+            out.append(int(name[4:]))
+    return sorted(out)
+
+
+def export_run_snapshot_safe(*args, **kwargs) -> Optional[str]:
+    """사이클을 막지 않도록 실패는 로그만 남긴다"""
+    try:
+        return export_run_snapshot(*args, **kwargs)
+    except Exception:
+        logging.exception("[SNAPSHOT] export failed")
+        return None
@@ -0,0 +1,135 @@
+# services/spatial_index.py
+"""
+후보 위치 격자(grid) 인덱스 — "이 지점 반경 X m 안에 누가 있나".
+
+run_full_cycle에서 후보 좌표를 캠퍼스 중심 기준 국지 평면(m)에 투영하고 GEO_CELL_M 크기 정사각 셀로
+버킷팅한 뒤, 셀 키((행, 열) → int64) 순으로 정렬한 배열을 스냅샷 디렉터리에 저장한다.
+
+  {SNAPSHOT_DIR}/run_{run_id}/geo_keys.npy   (N,) int64   정렬된 셀 키
+  {SNAPSHOT_DIR}/run_{run_id}/geo_users.npy  (N,) int64   같은 순서의 user_id
+  {SNAPSHOT_DIR}/run_{run_id}/geo_lat.npy    (N,) float64
+  {SNAPSHOT_DIR}/run_{run_id}/geo_lon.npy    (N,) float64
+  {SNAPSHOT_DIR}/run_{run_id}/geo_meta.json  lat0, lon0, cell_m
+
+키가 (행, 열) 순이라 한 셀 행의 연속 구간은 정렬 배열의 연속 구간이다.
+반경 조회 = 덮는 셀 행마다 searchsorted 2번 + 후보만 haversine으로 정확히 거른다 (전체 스캔 없음).
+"""
+import json
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from services.snapshot_paths import run_snapshot_dir
+
+EARTH_RADIUS_KM = 6371.0088
+
+_FILES = ("geo_keys", "geo_users", "geo_lat", "geo_lon")
+_COL_OFFSET = 1 << 31  # 열 번호(음수 가능)를 하위 32비트 부호 없는 값으로
+
+
+def project_local_km(lat, lon, lat0: float, lon0: float) -> Tuple[np.ndarray, np.ndarray]:
+    """위경도(도) → 원점(lat0, lon0) 기준 국지 평면 좌표 (north_km, east_km). 캠퍼스 반경에선 오차 무시 가능"""
+    rad = np.pi / 180.0
+    north = (np.asarray(lat, dtype=np.float64) - lat0) * (rad * EARTH_RADIUS_KM)
+    east = (np.asarray(lon, dtype=np.float64) - lon0) * (rad * EARTH_RADIUS_KM * math.cos(lat0 * rad))
+    return north, east
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    rad = np.pi / 180.0
+    p1, p2 = np.asarray(lat1) * rad, np.asarray(lat2) * rad
+    dphi = p2 - p1
+    dlmb = (np.asarray(lon2) - np.asarray(lon1)) * rad
+    a = np.sin(dphi / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * 1000 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell_rc(lat, lon, lat0: float, lon0: float, cell_m: float) -> Tuple[np.ndarray, np.ndarray]:
+    north, east = project_local_km(lat, lon, lat0, lon0)
+    return (np.floor(north * 1000 / cell_m).astype(np.int64),
+            np.floor(east * 1000 / cell_m).astype(np.int64))
+
+
+def _pack(row, col) -> np.ndarray:
+    return (np.asarray(row, dtype=np.int64) << 32) | (np.asarray(col, dtype=np.int64) + _COL_OFFSET)
+
+
+def _path(run_id: int, name: str) -> str:
+    return os.path.join(run_snapshot_dir(run_id), name)
+
+
+def build_spatial_index(run_id: int, user_ids, lat, lon, cell_m: Optional[int] = None) -> int:
+    """반환: 인덱싱한 사용자 수"""
+    cell_m = float(cell_m or settings.GEO_CELL_M)
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ok = np.isfinite(lat) & np.isfinite(lon)
+    user_ids, lat, lon = user_ids[ok], lat[ok], lon[ok]
+    lat0 = float(lat.mean()) if len(lat) else 0.0
+    lon0 = float(lon.mean()) if len(lon) else 0.0
+
+    keys = _pack(*_cell_rc(lat, lon, lat0, lon0, cell_m))
+    order = np.argsort(keys, kind="stable")
+    arrays = {"geo_keys": keys[order], "geo_users": user_ids[order],
+              "geo_lat": lat[order], "geo_lon": lon[order]}
+
+    os.makedirs(run_snapshot_dir(run_id), exist_ok=True)
+    for name, arr in arrays.items():
+        tmp = _path(run_id, f"{name}.tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, _path(run_id, f"{name}.npy"))
+    with open(_path(run_id, "geo_meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"lat0": lat0, "lon0": lon0, "cell_m": cell_m}, f)
+    return int(len(user_ids))
+
+
+def build_spatial_index_safe(*args, **kwargs) -> Optional[int]:
+    try:
+        return build_spatial_index(*args, **kwargs)
+    except Exception:
+        logging.exception("[GEO] index build failed")
+        return None
+
+
+@lru_cache(maxsize=4)
+def _open_index(run_id: int):
+    with open(_path(run_id, "geo_meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = tuple(np.load(_path(run_id, f"{name}.npy"), mmap_mode="r") for name in _FILES)
+    return meta, arrays
+
+
+def within_radius(run_id: int, lat: float, lon: float, radius_m: float,
+                  limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """
+    반환: [(user_id, 거리 m)] 거리 오름차순
+    인덱스 파일이 없으면 FileNotFoundError
+    """
+    meta, (keys, users, lats, lons) = _open_index(int(run_id))
+    cell_m = float(meta["cell_m"])
+    r0, c0 = _cell_rc(lat, lon, meta["lat0"], meta["lon0"], cell_m)
+    r0, c0 = int(r0), int(c0)
+    # 투영 왜곡 여유로 한 칸 더
+    span = int(math.ceil(radius_m / cell_m)) + 1
+
+    rows = np.arange(r0 - span, r0 + span + 1, dtype=np.int64)
+    lo = np.searchsorted(keys, _pack(rows, c0 - span), side="left")
+    hi = np.searchsorted(keys, _pack(rows, c0 + span), side="right")
+    idx = np.concatenate([np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist()) if b > a] or
+                         [np.empty(0, dtype=np.int64)])
+    if not len(idx):
+        return []
+
+    d = haversine_m(lat, lon, lats[idx], lons[idx])
+    hit = d <= radius_m
+    idx, d = idx[hit], d[hit]
+    order = np.argsort(d, kind="stable")
+    if limit is not None:
+        order = order[:int(limit)]
+    return [(int(u), float(m)) for u, m in zip(users[idx[order]], d[order])]
@@ -0,0 +1,210 @@
+# services/stream_assign.py
+"""
+증분(스트리밍) 배정.
+
+풀 사이클 사이에 입력이 바뀐 사용자(시간표 dirty 재계산, 새 위치)를 활성 run의
+기존 군집 중심 중 가장 가까운 곳에 바로 배정하고 Redis(cm:run / cl:run) 키를 제자리에서 고친다.
+풀 재클러스터링은 주기적 통합 용도로만 남는다.
+
+중심/특징 정의는 run_full_cycle이 활성화 전에 스냅샷 디렉터리에 저장한다.
+  {SNAPSHOT_DIR}/run_{run_id}/centers.npy   (K,D) float32, i행 = cluster_seq i+1
+  {SNAPSHOT_DIR}/run_{run_id}/assign.json   input_columns, w_loc, w_pref, scaler(run 당시 FeatureScaler)
+"""
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from redis.exceptions import WatchError
+
+from core.db import SessionLocal
+from services.backend_client import fetch_user_preferences, post_users_locations
+from services.cluster_job import ClusterParams, FeatureScaler, build_feature_matrix
+from services.data_util import normalize_user_id
+from core.redis_client import get_redis
+from services.snapshot_paths import run_snapshot_dir
+from services.snapshot_service import me_payloads
+from services.timetable_service import anchor_to_10min_kst
+
+_PATCH_RETRIES = 10
+_NEAREST_CHUNK_ELEMS = 4_000_000  # 청크당 (rows,K) float64 ≈ 32MB
+
+
+@dataclass
+class AssignmentModel:
+    centers: np.ndarray        # (K,D), i행 = cluster_seq i+1
+    input_columns: List[str]   # run_clustering 입력 df 컬럼 순서 (특징 순서 재현용)
+    w_loc: float
+    w_pref: float
+    scaler: Optional[FeatureScaler] = None  # 중심과 같은 좌표계로 특징을 만들기 위해 run의 스케일러 사용
+
+
+def save_assignment_model(run_id: int, labels: np.ndarray, params: ClusterParams, input_columns: List[str]) -> None:
+    """run_clustering 직후 호출: 최종 라벨(1-based)별 KMeans 중심을 cluster_seq 순으로 저장"""
+    uniq = np.unique(np.asarray(labels))                      # to_cluster_member_columns와 같은 seq 규칙
+    centers = np.asarray(params.centers, dtype=np.float32)[uniq - 1]
+    d = run_snapshot_dir(run_id)
+    os.makedirs(d, exist_ok=True)
+    tmp = os.path.join(d, "centers.tmp.npy")
+    np.save(tmp, centers)
+    os.replace(tmp, os.path.join(d, "centers.npy"))
+    with open(os.path.join(d, "assign.json"), "w", encoding="utf-8") as f:
+        json.dump({"input_columns": list(input_columns), "w_loc": params.w_loc, "w_pref": params.w_pref,
+                   "scaler": asdict(params.scaler) if params.scaler is not None else None}, f)
+
+
+@lru_cache(maxsize=4)
+def load_assignment_model(run_id: int) -> AssignmentModel:
+    d = run_snapshot_dir(run_id)
+    with open(os.path.join(d, "assign.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return AssignmentModel(
+        centers=np.load(os.path.join(d, "centers.npy")),
+        input_columns=meta["input_columns"],
+        w_loc=float(meta["w_loc"]),
+        w_pref=float(meta["w_pref"]),
+        scaler=FeatureScaler(**meta["scaler"]) if meta.get("scaler") else None,
+    )
+
+
+def assign_to_centers(model: AssignmentModel, df: pd.DataFrame):
+    """df(입력 컬럼 포함) → (cluster_seq (N,), distance (N,))"""
+    frame = df.reindex(columns=model.input_columns, fill_value=0.0)
+    X, _ = build_feature_matrix(frame, model.w_loc, model.w_pref, scaler=model.scaler)
+    nearest, dist = nearest_centers(X, model.centers)
+    return nearest + 1, dist
+
+
+def nearest_centers(X: np.ndarray, centers: np.ndarray):
+    """
+    X (N,D), centers (K,D) → (가장 가까운 중심 인덱스 (N,), 유클리드 거리 (N,)).
+    (N,K,D) 차분 배열 없이 ‖x‖² − 2x·c + ‖c‖² (행렬곱)로 N을 나눠 계산한다.
+    K ≈ n/6이라 한 번에 (N,K)를 만들면 틱마다 수 GB가 될 수 있어, 청크당 (rows,K)는 _NEAREST_CHUNK_ELEMS 이하.
+    거리는 고른 중심과의 차분으로 다시 계산해 전개식의 반올림 오차를 남기지 않는다.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    C = np.asarray(centers, dtype=np.float64)
+    n = len(X)
+    nearest = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return nearest, np.empty(0, dtype=np.float64)
+    c2 = np.einsum("ij,ij->i", C, C)
+    rows = max(1, _NEAREST_CHUNK_ELEMS // max(1, len(C)))
+    for s in range(0, n, rows):
+        xb = X[s:s + rows]
+        d2 = c2[None, :] - 2.0 * (xb @ C.T)   # ‖x‖²는 행마다 상수라 argmin에 영향 없음
+        nearest[s:s + rows] = d2.argmin(axis=1)
+    dist = np.linalg.norm(X - C[nearest], axis=1)
+    return nearest, dist
+
+
+def _patch_redis(run_id: int, assign: Dict[int, tuple], remove: List[int]) -> None:
+    """
+    cm:run:{rid} / cl:run:{rid}:cid:{seq}를 제자리에서 갱신.
+    assign: {uid: (cluster_seq, dist)}, remove: 더 이상 후보가 아닌 uid
+    me:run:{rid}(미리 인코딩한 /me 응답)가 있으면 멤버가 바뀐 군집의 사용자 응답도 같은 트랜잭션에서 다시 쓴다.
+    이전 군집과 군집 멤버는 WATCH 아래에서 읽어, 동시에 도는 다른 패치와 겹치면 다시 읽고 재시도한다
+    (사용자가 두 cl:run 집합에 남거나 /me 응답이 오래된 멤버로 쓰이지 않도록).
+    """
+    if not assign and not remove:
+        return
+    r = get_redis()
+    with r.pipeline(transaction=True) as pipe:
+        for _ in range(_PATCH_RETRIES):
+            try:
+                _patch_once(pipe, r, run_id, assign, remove)
+                return
+            except WatchError:
+                continue  # 읽은 뒤 다른 패치/워밍업이 cm/cl/me 키를 바꿈 → 처음부터 다시 읽는다
+    raise RuntimeError(f"cm:run:{run_id} patch conflicted {_PATCH_RETRIES} times")
+
+
+def _patch_once(pipe, r, run_id: int, assign: Dict[int, tuple], remove: List[int]) -> None:
+    """
+    WATCH cm:run:{rid} → 이전 군집 읽기 → WATCH 영향받는 cl 키 + me:run:{rid} → 멤버 읽기 → MULTI 쓰기.
+    읽은 키 중 하나라도 EXEC 전에 바뀌면 WatchError (me:run 응답이 오래된 멤버로 다시 쓰이지 않음)
+    """
+    cm_key = f"cm:run:{run_id}"
+    me_key = f"me:run:{run_id}"
+    uids = list(assign) + list(remove)
+    pipe.watch(cm_key)
+    old = dict(zip(uids, pipe.hmget(cm_key, [str(u) for u in uids])))
+    touched = sorted({int(s) for s in old.values() if s is not None} | {int(s) for s, _ in assign.values()})
+    pipe.watch(me_key, *[f"cl:run:{run_id}:cid:{seq}" for seq in touched])
+
+    # 영향받는 군집(이전/새 군집)의 패치 후 멤버 구성
+    # (WATCH는 어느 연결의 변경이든 감지하므로 멤버는 별도 파이프라인으로 한 번에 읽는다)
+    groups: Dict[int, set] = {}
+    if pipe.exists(me_key):
+        read = r.pipeline(transaction=False)
+        for seq in touched:
+            read.zrange(f"cl:run:{run_id}:cid:{seq}", 0, -1)
+        groups = {seq: {int(u) for u in ms} for seq, ms in zip(touched, read.execute())}
+        for uid in uids:
+            if old.get(uid) is not None:
+                groups[int(old[uid])].discard(uid)
+        for uid, (seq, _dist) in assign.items():
+            groups[int(seq)].add(uid)
+
+    pipe.multi()
+    for uid in uids:
+        prev = old.get(uid)
+        if prev is not None:
+            # run_full_cycle은 거리를 항상 기록하므로 cl 키는 ZSet
+            pipe.zrem(f"cl:run:{run_id}:cid:{prev}", str(uid))
+    for uid, (seq, dist) in assign.items():
+        pipe.hset(cm_key, str(uid), int(seq))
+        pipe.zadd(f"cl:run:{run_id}:cid:{seq}", {str(uid): float(dist)})
+    for uid in remove:
+        if old.get(uid) is not None:
+            pipe.hdel(cm_key, str(uid))
+    if groups:
+        for members in groups.values():
+            if members:
+                pipe.hset(me_key, mapping=me_payloads(members))
+        if remove:
+            pipe.hdel(me_key, *[str(u) for u in remove])
+    pipe.execute()
+
+
+def reassign_users(campus_id: int, user_ids: List[int]) -> Dict:
+    """
+    입력이 바뀐 user_ids를 활성 run에 증분 배정.
+    - 공강 조건/위치는 풀 사이클과 같은 경로(post_users_locations)로 다시 판단
+    - 조건을 벗어난 사용자는 군집에서 제거
+    """
+    user_ids = sorted({int(u) for u in user_ids})
+    if not user_ids:
+        return {"assigned": 0, "removed": 0}
+
+    run_key = get_redis().get(f"active:campus:{campus_id}")
+    if not run_key or not run_key.startswith("run:"):
+        return {"assigned": 0, "removed": 0, "skipped": "no active run"}
+    run_id = int(run_key.split(":")[1])
+
+    try:
+        model = load_assignment_model(run_id)
+    except FileNotFoundError:
+        return {"run_id": run_id, "assigned": 0, "removed": 0, "skipped": "no assignment model"}
+
+    from services.cluster_batch import enrich_df_with_locations  # 순환 임포트 방지
+
+    df = normalize_user_id(fetch_user_preferences(user_ids), copy=False)
+    with SessionLocal() as db:
+        locations = post_users_locations(db, df, anchor_to_10min_kst())
+    df = enrich_df_with_locations(df, locations)
+
+    assign: Dict[int, tuple] = {}
+    if not df.empty:
+        seqs, dists = assign_to_centers(model, df)
+        for uid, seq, dist in zip(df["user_id"].tolist(), seqs.tolist(), dists.tolist()):
+            assign[int(uid)] = (int(seq), float(dist))
+    remove = [u for u in user_ids if u not in assign]
+
+    _patch_redis(run_id, assign, remove)
+    logging.info(f"[STREAM] run={run_id} assigned={len(assign)} removed={len(remove)}")
+    return {"run_id": run_id, "assigned": len(assign), "removed": len(remove)}
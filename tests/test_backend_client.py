@@ -0,0 +1,115 @@
+"""
+backend_client의 컬럼형 시간표 경로(_hhmmss_to_min_vec, merge_intervals_columnar, get_intervals_columnar)가
+이전 요일별 정렬·병합 경로(get_intervals_bulk / _merge_intervals)와 같은 구간을 내는지 비교한다.
+"""
+import random
+from collections import defaultdict
+
+import numpy as np
+import orjson
+import pytest
+
+from services import backend_client
+from services.backend_client import (IntervalColumns, _hhmmss_to_min, _hhmmss_to_min_vec,
+                                     get_intervals_columnar, merge_intervals_columnar)
+from services.timetable_bits import SLOT_MIN, SLOTS_PER_DAY
+
+LIMIT = SLOTS_PER_DAY * SLOT_MIN
+
+
+def _merge_reference(intervals):
+    """이전 _merge_intervals: start 정렬 후 cur.start <= prev.end 이면 병합"""
+    if not intervals:
+        return []
+    ints = sorted(intervals, key=lambda x: x[0])
+    merged = [list(ints[0])]
+    for s, e in ints[1:]:
+        if s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return [tuple(x) for x in merged]
+
+
+def _bulk_reference(timetables):
+    """이전 get_intervals_bulk의 파싱/clamp/병합 → {(uid, dow): [(start, end), ...]}"""
+    out = {}
+    for item in timetables:
+        per_dow = defaultdict(list)
+        for lec in item["lectures"]:
+            s = max(0, min(LIMIT, _hhmmss_to_min(lec["startTime"])))
+            e = max(0, min(LIMIT, _hhmmss_to_min(lec["endTime"])))
+            if e > s:
+                per_dow[lec["dayOfWeek"]].append((s, e))
+        for dow, ivs in per_dow.items():
+            out[(item["userId"], dow)] = _merge_reference(ivs)
+    return out
+
+
+def _columns_to_dict(cols: IntervalColumns):
+    out = defaultdict(list)
+    for u, d, s, e in zip(cols.user_id.tolist(), cols.dow.tolist(), cols.start_min.tolist(), cols.end_min.tolist()):
+        out[(u, d)].append((s, e))
+    return dict(out)
+
+
+def _fmt(m: int, short: bool = False) -> str:
+    h, mm = divmod(m, 60)
+    return f"{h}:{mm:02d}:00" if short else f"{h:02d}:{mm:02d}:00"
+
+
+def test_hhmmss_vec_matches_scalar():
+    values = ["00:00:00", "09:00:00", "9:00:00", "23:59:59", "24:00:00", "7:05:30", "12:30:59", "0:0:0", "10:5:00"]
+    assert _hhmmss_to_min_vec(values).tolist() == [_hhmmss_to_min(v) for v in values]
+
+
+def test_merge_nested_adjacent_unsorted():
+    # (uid, dow, start, end) — 정렬되지 않은 입력
+    rows = [
+        (2, 0, 600, 660), (1, 3, 120, 180), (1, 3, 60, 120),   # 인접(끝 == 시작) → 병합
+        (1, 3, 30, 400), (1, 3, 100, 200),                      # 포함(중첩) 구간
+        (1, 3, 401, 500),                                       # 1분 떨어짐 → 별도
+        (2, 0, 540, 600), (2, 1, 540, 600), (1, 0, 0, 1440),
+    ]
+    cols = IntervalColumns(
+        user_id=np.array([r[0] for r in rows], dtype=np.int64),
+        dow=np.array([r[1] for r in rows], dtype=np.int8),
+        start_min=np.array([r[2] for r in rows], dtype=np.int16),
+        end_min=np.array([r[3] for r in rows], dtype=np.int16),
+    )
+    got = _columns_to_dict(merge_intervals_columnar(cols))
+    assert got == {
+        (1, 0): [(0, 1440)],
+        (1, 3): [(30, 400), (401, 500)],
+        (2, 0): [(540, 660)],
+        (2, 1): [(540, 600)],
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columnar_matches_bulk_reference(monkeypatch, seed):
+    rnd = random.Random(seed)
+    timetables = []
+    for uid in rnd.sample(range(1, 10_000), 30):              # 여러 사용자 × 요일
+        lectures = []
+        for _ in range(rnd.randint(0, 25)):
+            s = rnd.randrange(0, LIMIT + 30, 5)
+            e = s + rnd.choice([-5, 0, 5, 30, 50, 75, 90, 180, 600])   # 역전/빈 구간, 1440 초과 포함
+            e = max(0, e)
+            lectures.append({"dayOfWeek": rnd.randrange(7), "startTime": _fmt(s, rnd.random() < 0.3),
+                             "endTime": _fmt(e, rnd.random() < 0.3)})
+        rnd.shuffle(lectures)                                  # 정렬되지 않은 입력
+        timetables.append({"userId": uid, "lectures": lectures})
+
+    class _Resp:
+        content = orjson.dumps({"success": True, "timetables": timetables})
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(backend_client.requests, "post", lambda *a, **k: _Resp())
+    cols = get_intervals_columnar([t["userId"] for t in timetables])
+    assert _columns_to_dict(cols) == _bulk_reference(timetables)
+    # (user_id, dow, start_min) 순 정렬 보장
+    key = list(zip(cols.user_id.tolist(), cols.dow.tolist(), cols.start_min.tolist()))
+    assert key == sorted(key)
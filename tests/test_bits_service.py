@@ -0,0 +1,70 @@
+"""
+bits_service.intervals_to_nine_ints_bulk가 스칼라 기준 구현(intervals_to_nine_ints / to_nine_ints)과
+비트 단위로 같은지 비교한다.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from services.bits_service import intervals_to_nine_ints, intervals_to_nine_ints_bulk
+from services.timetable_bits import DAYS, SLOTS_PER_DAY, to_nine_ints
+
+
+def _reference(user_idx, dow, start_min, end_min, n_users):
+    """(user, dow)별로 모아 스칼라 변환. 범위 밖 user_idx/dow 구간은 버린다"""
+    per = {}
+    for u, d, s, e in zip(user_idx, dow, start_min, end_min):
+        if 0 <= u < n_users and 0 <= d < DAYS:
+            per.setdefault((u, d), []).append({"start_min": s, "end_min": e})
+    return [[intervals_to_nine_ints(per.get((u, d), [])) for d in range(DAYS)] for u in range(n_users)]
+
+
+def _check(user_idx, dow, start_min, end_min, n_users):
+    got = intervals_to_nine_ints_bulk(np.array(user_idx, dtype=np.int64), np.array(dow, dtype=np.int64),
+                                      np.array(start_min, dtype=np.int64), np.array(end_min, dtype=np.int64),
+                                      n_users)
+    assert got.shape == (n_users, DAYS, 9)
+    assert got.tolist() == _reference(user_idx, dow, start_min, end_min, n_users)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_overlapping(seed):
+    rnd = random.Random(seed)
+    n_users, rows = 20, ([], [], [], [])
+    for _ in range(400):
+        s = rnd.randrange(-30, 1460)
+        e = s + rnd.randrange(-20, 400)        # 빈/역전 구간 포함, 겹침 다수
+        for col, v in zip(rows, (rnd.randrange(-2, n_users + 2), rnd.randrange(-1, DAYS + 1), s, e)):
+            col.append(v)                        # 범위 밖 user_idx/dow 포함
+    _check(*rows, n_users)
+
+
+def test_boundaries():
+    cases = [
+        (0, 1440),      # 하루 전체
+        (0, 1),         # 첫 슬롯 (end ceil)
+        (1435, 1440),   # 마지막 슬롯: e == 288
+        (1439, 2000),   # 1440 넘는 끝 → 288로 clamp
+        (-10, 3),       # 0 미만 시작 → 0으로 clamp
+        (5, 5),         # 빈 구간
+        (300, 299),     # 역전 구간
+        (7, 8),         # 한 슬롯 안쪽 (floor/ceil)
+        (60, 120), (120, 180),   # 맞닿은 구간
+    ]
+    n = len(cases)
+    _check(list(range(n)), [i % DAYS for i in range(n)], [s for s, _ in cases], [e for _, e in cases], n)
+
+
+def test_full_day_matches_to_nine_ints():
+    got = intervals_to_nine_ints_bulk([0], [3], [0], [1440], 1)
+    assert got[0, 3].tolist() == to_nine_ints([1] * SLOTS_PER_DAY)
+    assert got[0, [0, 1, 2, 4, 5, 6]].sum() == 0
+
+
+def test_return_busy():
+    nine, busy = intervals_to_nine_ints_bulk([0, 1], [0, 6], [0, 1435], [10, 1440], 2, return_busy=True)
+    assert busy.shape == (2, DAYS, SLOTS_PER_DAY)
+    assert np.flatnonzero(busy[0, 0]).tolist() == [0, 1]
+    assert np.flatnonzero(busy[1, 6]).tolist() == [SLOTS_PER_DAY - 1]
+    assert nine.tolist() == intervals_to_nine_ints_bulk([0, 1], [0, 6], [0, 1435], [10, 1440], 2).tolist()
@@ -0,0 +1,61 @@
+"""
+meal_window_index.query_meal_anchor가 원본 meal_anchor_or_last_end_allweek(empty_is=0)와
+같은 결과를 내는지 무작위 시간표로 비교한다.
+"""
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from services.meal_window_index import MealWindowIndex, build_free_runs, query_meal_anchor
+from services.timetable_service import SLOTS_PER_DAY, meal_anchor_or_last_end_allweek
+
+WEEK = 7 * SLOTS_PER_DAY
+
+
+def _random_week(rnd: random.Random) -> np.ndarray:
+    kind = rnd.random()
+    busy = np.zeros(WEEK, dtype=bool)
+    if kind < 0.05:
+        return busy                                   # 주 전체 공강
+    if kind < 0.08:
+        return ~busy                                  # 주 전체 수업
+    if kind < 0.25:
+        busy[rnd.sample(range(WEEK), rnd.randint(1, 3))] = True   # 수업 슬롯 1~3개 (긴 공강)
+        return busy
+    for _ in range(rnd.randint(1, 25)):               # 일반 시간표: 수업 블록
+        s = rnd.randrange(WEEK)
+        busy[s:s + rnd.randint(6, 36)] = True
+    return busy
+
+
+def _compare(rnd: random.Random, busy: np.ndarray) -> None:
+    bits_by_dow = [busy[d * SLOTS_PER_DAY:(d + 1) * SLOTS_PER_DAY].astype(int).tolist() for d in range(7)]
+    runs, all_free = build_free_runs(busy)
+    idx = MealWindowIndex(runs, all_free)
+
+    ref = datetime(2026, 10, 19) + timedelta(minutes=rnd.randrange(7 * 24 * 60))
+    lookahead = rnd.choice([10, 30, 60, 120, 240, 24 * 60, 48 * 60])
+    need = rnd.choice([5, 10, 30, 60, 90])
+
+    expected = meal_anchor_or_last_end_allweek(bits_by_dow, ref_time=ref, lookahead_min=lookahead, need_min=need)
+    got = query_meal_anchor(idx, ref_time=ref, lookahead_min=lookahead, need_min=need)
+    assert got == expected, (ref, lookahead, need, np.flatnonzero(busy)[:10])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_query_matches_bit_scan(seed):
+    rnd = random.Random(seed)
+    for _ in range(5000):
+        _compare(rnd, _random_week(rnd))
+
+
+def test_single_busy_slot_weeks():
+    """원본 역탐색 상한(MAX_STEPS)에 걸리는 경우: 수업 슬롯 하나짜리 주"""
+    rnd = random.Random(42)
+    for slot in range(0, WEEK, 7):
+        busy = np.zeros(WEEK, dtype=bool)
+        busy[slot] = True
+        for _ in range(3):
+            _compare(rnd, busy)
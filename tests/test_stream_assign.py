@@ -0,0 +1,39 @@
+"""
+stream_assign.nearest_centers가 (N,K) 전체 거리 행렬의 argmin과 같은 라벨/거리를 내는지 비교한다.
+"""
+import numpy as np
+import pytest
+
+from services import stream_assign
+from services.stream_assign import nearest_centers
+
+
+def _brute(X, C):
+    dd = np.linalg.norm(X[:, None, :] - C[None, :, :], axis=2)
+    nearest = dd.argmin(axis=1)
+    return nearest, dd[np.arange(len(X)), nearest]
+
+
+@pytest.mark.parametrize("n,k,d", [(1, 1, 3), (500, 83, 6), (2000, 333, 10), (37, 400, 4)])
+def test_matches_brute_force(monkeypatch, n, k, d):
+    monkeypatch.setattr(stream_assign, "_NEAREST_CHUNK_ELEMS", 5000)  # 여러 청크로 나뉘게
+    rng = np.random.default_rng(n + k)
+    C = rng.normal(size=(k, d)).astype(np.float32)   # centers.npy는 float32
+    X = rng.normal(size=(n, d)) * 1.5
+    got_idx, got_dist = nearest_centers(X, C)
+    exp_idx, exp_dist = _brute(X, C.astype(np.float64))
+    np.testing.assert_array_equal(got_idx, exp_idx)
+    np.testing.assert_allclose(got_dist, exp_dist, rtol=1e-12, atol=1e-12)
+
+
+def test_points_on_centers():
+    C = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+    X = np.vstack([C[[2, 0, 1]], [[9.0, 1.0]]])
+    idx, dist = nearest_centers(X, C)
+    assert idx.tolist() == [2, 0, 1, 1]
+    np.testing.assert_allclose(dist, [0.0, 0.0, 0.0, np.sqrt(2.0)])
+
+
+def test_empty():
+    idx, dist = nearest_centers(np.empty((0, 3)), np.ones((4, 3)))
+    assert idx.shape == (0,) and dist.shape == (0,)
@@ -0,0 +1,131 @@
+# worker.py
+"""
+배치 워커 프로세스 (사이클 잡 실행 전용).
+
+  python worker.py        # CYCLE_EXECUTOR=queue 일 때 스케줄러/관리자 API가 넣은 잡을 실행
+
+Redis 큐(services.cycle_queue)에서 잡을 꺼내 ProcessPoolExecutor의 자식 프로세스에서
+run_cycle_with_dirty(dirty 재계산 → run_cycle_exclusive)를 돌린다.
+- 동시에 도는 잡은 CYCLE_WORKERS개까지. 자리가 없으면 큐에서 꺼내지 않는다 (다른 워커가 가져갈 수 있게)
+- 자식은 spawn으로 띄워 부모의 Redis/DB 연결을 물려받지 않고, CYCLE_WORKER_MAX_TASKS마다 새로 뜬다
+- 꺼낸 잡은 jobs:cycle:processing:{WORKER_ID}에 두었다가 끝나면 지운다.
+  워커가 죽었다 다시 뜨면(같은 WORKER_ID) 남은 잡을 큐 앞쪽으로 되돌린다.
+  WORKER_ID 기본값은 hostname(컨테이너 ID) — 레플리카마다 다르고 같은 컨테이너의 재시작에는 유지된다.
+  hostname을 고정하면 레플리카끼리 서로의 실행 중 잡을 큐로 되돌리므로 고정하지 않는다
+- SIGTERM/SIGINT: 새 잡은 받지 않고 실행 중인 잡이 끝날 때까지 기다린 뒤 종료
+
+여러 워커/레플리카가 떠 있어도 같은 캠퍼스 사이클은 리더 락(services.cycle_lock)으로 한 곳에서만 실행된다.
+"""
+import logging
+import multiprocessing as mp
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+
+from core.config import settings
+from core.redis_client import get_redis
+from services.cycle_queue import QUEUE_KEY, mark_finished, mark_running, processing_key
+
+
+def execute_job(job_id: str, worker_id: str) -> str:
+    """자식 프로세스에서 실행. 반환: 최종 status"""
+    from services.cycle_lock import run_cycle_with_dirty  # 배치 의존성은 자식에서만 로드
+
+    job = mark_running(job_id, worker_id)
+    if job is None:
+        return "expired"
+    try:
+        result = run_cycle_with_dirty(
+            int(job["campus_id"]),
+            algo="kmeans-v1",
+            note=job.get("note") or None,
+            skip_if_done=bool(int(job.get("skip_if_done", 1))),
+            profile=job.get("profile") or None,
+        )
+    except Exception as e:
+        logging.exception(f"[WORKER] job {job_id} failed")
+        mark_finished(job_id, "failed", error=f"{type(e).__name__}: {e}")
+        return "failed"
+    status = result["status"] if result["status"] in ("done", "lost") else "skipped"
+    mark_finished(job_id, status, result=result)
+    logging.info(f"[WORKER] job {job_id} {status}: {result}")
+    return status
+
+
+def _child_init():
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C는 부모가 받아 정상 종료를 조율
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_child_init,
+        max_tasks_per_child=max(1, settings.CYCLE_WORKER_MAX_TASKS),
+    )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    worker_id = os.getenv("WORKER_ID") or socket.gethostname()
+    workers = max(1, settings.CYCLE_WORKERS)
+    processing = processing_key(worker_id)
+    # BLMOVE 대기는 소켓 타임아웃보다 짧아야 한다
+    block_sec = max(0.1, settings.REDIS_SOCKET_TIMEOUT_MS / 2000)
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    r = get_redis()
+    requeued = 0
+    while r.lmove(processing, QUEUE_KEY, "RIGHT", "RIGHT"):
+        requeued += 1
+    logging.info(f"[WORKER] {worker_id} started: workers={workers} requeued={requeued}")
+
+    pool = _new_pool(workers)
+    running: Dict[Future, str] = {}
+
+    def reap(done) -> None:
+        nonlocal pool
+        broken = False
+        for fut in done:
+            job_id = running.pop(fut)
+            try:
+                fut.result()
+            except BrokenProcessPool as e:
+                # 자식이 비정상 종료(OOM kill 등): 같은 풀의 잡은 모두 실패 처리 후 풀 재생성
+                broken = True
+                mark_finished(job_id, "failed", error=f"worker process died: {e}")
+            except Exception as e:
+                mark_finished(job_id, "failed", error=f"{type(e).__name__}: {e}")
+            r.lrem(processing, 1, job_id)
+        if broken:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = _new_pool(workers)
+
+    try:
+        while not stop.is_set():
+            reap([f for f in running if f.done()])
+            if len(running) >= workers:
+                wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                continue
+            job_id = r.blmove(QUEUE_KEY, processing, block_sec, "RIGHT", "LEFT")
+            if job_id:
+                running[pool.submit(execute_job, job_id, worker_id)] = job_id
+    finally:
+        if running:
+            logging.info(f"[WORKER] waiting for {len(running)} running job(s)")
+            wait(running)
+            reap(list(running))
+        pool.shutdown(wait=True)
+        logging.info(f"[WORKER] {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    main()